@@ -2,28 +2,26 @@
 import os
 import sys
 import time
-import select
+import uuid
 import subprocess
 from datetime import date, datetime
-from typing import Optional, Dict, Any
+from typing import Dict
 
 import pandas as pd
-import psycopg2
-import psycopg2.extensions
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
 
+from gcm import anomaly, charts, export, geogrid, tracing
+from gcm.data import int_yyyymmdd, load_meta
+from gcm import data as gcm_data
+from gcm.db import AsyncDB
+from gcm.slot_monitor import SlotMonitor, format_bytes
+from gcm.snapshot import SnapshotStore
+from gcm.figcache import FigureCache
+from gcm.resultcache import ResultCache
+from gcm.notify import DebouncedListener
 
-st.set_page_config(page_title="Global Conflict Monitor", layout="wide")
-
-# db config
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_NAME = os.getenv("DB_NAME", "gdelt")
-DB_USER = os.getenv("DB_USER", "flink_user")
-DB_PASS = os.getenv("DB_PASS", "flink_pass")
 
-NOTIFY_CHANNEL = "view_updated"
+st.set_page_config(page_title="Global Conflict Monitor", layout="wide")
 
 # benchmark scripts
 APPEND_SH = os.getenv("APPEND_SH", "./scripts/load-gdelt-append.sh")
@@ -124,6 +122,11 @@ st.markdown(
         border: 1px solid rgba(34,197,94,0.35);
         color: rgba(34,197,94,0.95);
       }
+      .chip-alarm{
+        background: rgba(239,68,68,0.14);
+        border: 1px solid rgba(239,68,68,0.45);
+        color: rgba(248,113,113,0.98);
+      }
       .dot{
         width: 8px; height: 8px; border-radius: 50%;
         background: rgba(34,197,94,0.95);
@@ -187,97 +190,86 @@ st.markdown(
 )
 
 
-def get_db_conn():
-    return psycopg2.connect(
-        host=DB_HOST,
-        database=DB_NAME,
-        user=DB_USER,
-        password=DB_PASS,
-    )
+# session state
+if "last_refresh_time" not in st.session_state:
+    st.session_state.last_refresh_time = datetime.now()
 
+if "last_polled_versions" not in st.session_state:
+    st.session_state.last_polled_versions = None
 
-def qdf(sql: str, params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
-    conn = get_db_conn()
-    try:
-        return pd.read_sql(sql, conn, params=params)
-    finally:
-        conn.close()
+if "last_poll_check_ts" not in st.session_state:
+    st.session_state.last_poll_check_ts = 0.0
 
+if "processing_time" not in st.session_state:
+    st.session_state.processing_time = None
+if "last_batch_size" not in st.session_state:
+    st.session_state.last_batch_size = 0
+if "last_operation" not in st.session_state:
+    st.session_state.last_operation = "None"
+if "last_throughput" not in st.session_state:
+    st.session_state.last_throughput = None
+# tags this session's in-flight queries so a rerun can supersede them
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
-def int_yyyymmdd(d: date) -> int:
-    return int(d.strftime("%Y%m%d"))
 
+# per-render query trace (sidebar performance panel + metrics log)
+trace = tracing.start_render()
 
-def setup_listener():
-    # postgres listen/notify for real-time updates
-    try:
-        conn = get_db_conn()
-        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
-        cur = conn.cursor()
-        cur.execute(f"LISTEN {NOTIFY_CHANNEL};")
-        return conn
-    except Exception:
-        return None
 
+@st.cache_resource
+def get_snapshot_store(_adb: AsyncDB):
+    # arrow snapshot from scripts/export_snapshot.py, shared across sessions;
+    # None without one and the dashboard reads postgres directly
+    store = SnapshotStore(adb=_adb)
+    return store if store.load() else None
 
-def check_notifications() -> bool:
-    if st.session_state.get("listener_conn") is None:
-        st.session_state.listener_conn = setup_listener()
-        return False
 
-    conn = st.session_state.listener_conn
-    try:
-        ready = select.select([conn], [], [], 0)
-        if ready == ([conn], [], []):
-            conn.poll()
+@st.cache_resource
+def get_result_cache() -> ResultCache:
+    # frame sets shared across sessions, bounded by entry count and bytes
+    return ResultCache()
 
-        if conn.notifies:
-            conn.notifies.clear()
-            return True
 
-        return False
+results = get_result_cache()
 
-    except Exception:
-        try:
-            conn.close()
-        except Exception:
-            pass
-        st.session_state.listener_conn = setup_listener()
-        return False
 
+@st.cache_resource
+def get_listener(_cache: ResultCache) -> DebouncedListener:
+    # one LISTEN connection per process; notification bursts are debounced
+    # (NOTIFY_MIN_DELAY_S / NOTIFY_MAX_DELAY_S) into one shared cache bump
+    return DebouncedListener(on_fire=lambda tables: _cache.bump())
 
-# session state
-if "listener_conn" not in st.session_state:
-    st.session_state.listener_conn = setup_listener()
 
-if "data_version" not in st.session_state:
-    st.session_state.data_version = 0
+listener = get_listener(results)
+if "seen_generation" not in st.session_state:
+    st.session_state.seen_generation = listener.generation
 
-if "last_refresh_time" not in st.session_state:
-    st.session_state.last_refresh_time = datetime.now()
 
-if "last_polled_max_date" not in st.session_state:
-    st.session_state.last_polled_max_date = None
+@st.cache_resource
+def get_db() -> AsyncDB:
+    # one connection pool for every session; queries carry a statement timeout
+    return AsyncDB()
 
-if "last_poll_check_ts" not in st.session_state:
-    st.session_state.last_poll_check_ts = 0.0
 
-if "processing_time" not in st.session_state:
-    st.session_state.processing_time = None
-if "last_batch_size" not in st.session_state:
-    st.session_state.last_batch_size = 0
-if "last_operation" not in st.session_state:
-    st.session_state.last_operation = "None"
-if "last_throughput" not in st.session_state:
-    st.session_state.last_throughput = None
+adb = get_db()
+
+# re-emptied while a query waits: streamlit checks for a newer rerun on every
+# delta it sends, so a stale run stops here and its queries are cancelled
+_query_tick = st.empty()
+query = gcm_data.pooled_qdf(adb, poll=_query_tick.empty)
 
+store = get_snapshot_store(adb)
+if store is not None:
+    try:
+        # apply changes since the snapshot's table versions (throttled across sessions)
+        if store.refresh():
+            results.bump()
+    except Exception:
+        pass
 
 # get date range from aggregated data
-meta = qdf("""
-    SELECT MIN(event_date) AS min_event_date,
-           MAX(event_date) AS max_event_date
-    FROM daily_event_volume_by_quadclass;
-""")
+meta = store.load_meta() if store is not None else load_meta(query)
 
 if meta.empty or pd.isna(meta.loc[0, "min_event_date"]) or pd.isna(meta.loc[0, "max_event_date"]):
     st.error("No data found in daily_event_volume_by_quadclass. Check that Flink aggregations are running.")
@@ -354,7 +346,7 @@ with st.sidebar:
         st.session_state.last_operation = "INSERT"
         st.session_state.last_throughput = (int(ins_lines) / elapsed) if elapsed > 0 else None
 
-        st.session_state.data_version += 1
+        results.bump()
         st.session_state.last_refresh_time = datetime.now()
         st.rerun()
 
@@ -381,7 +373,7 @@ with st.sidebar:
         st.session_state.last_operation = "UPDATE"
         st.session_state.last_throughput = (int(upd_n) / elapsed) if elapsed > 0 else None
 
-        st.session_state.data_version += 1
+        results.bump()
         st.session_state.last_refresh_time = datetime.now()
         st.rerun()
 
@@ -408,7 +400,7 @@ with st.sidebar:
         st.session_state.last_operation = "DELETE"
         st.session_state.last_throughput = (int(del_n) / elapsed) if elapsed > 0 else None
 
-        st.session_state.data_version += 1
+        results.bump()
         st.session_state.last_refresh_time = datetime.now()
         st.rerun()
 
@@ -422,13 +414,75 @@ with st.sidebar:
             f"Throughput: {tp_txt}"
         )
 
+    st.markdown("---")
+    st.markdown("## Export")
+    # streamed to a file in fixed-size chunks; never held as one frame
+    exp_name = st.selectbox("Dataset", list(export.EXPORTS), index=0)
+    exp_fmt = st.radio("Format", export.FORMATS, horizontal=True)
+    if st.button("Export range", use_container_width=True):
+        exp_bar = st.progress(0.0, text="Starting export...")
+        exp_total = {"rows": 0}
+
+        def exp_estimate(n: int):
+            exp_total["rows"] = max(n, 1)
+
+        def exp_progress(p: export.ExportProgress):
+            done = min(p.rows / exp_total["rows"], 0.99) if exp_total["rows"] else 0.0
+            exp_bar.progress(done, text=(
+                f"{p.rows:,} rows • {format_bytes(p.bytes)} • "
+                f"{p.rows_per_sec:,.0f} rows/s • {format_bytes(p.bytes_per_sec)}/s"
+            ))
+
+        try:
+            done = export.export_file(
+                exp_name, exp_fmt, int_yyyymmdd(start_d), int_yyyymmdd(end_d),
+                progress=exp_progress, estimate=exp_estimate,
+            )
+            exp_bar.progress(1.0, text=f"{done.rows:,} rows in {done.seconds:,.1f}s")
+            st.session_state.export_done = done
+        except Exception as e:
+            exp_bar.empty()
+            st.session_state.export_done = None
+            st.error(f"Export failed: {e}")
+
+    exp_done = st.session_state.get("export_done")
+    if exp_done is not None and os.path.exists(exp_done.path):
+        st.caption(
+            f"{os.path.basename(exp_done.path)} • {exp_done.rows:,} rows • {format_bytes(exp_done.bytes)} • "
+            f"{exp_done.rows_per_sec:,.0f} rows/s"
+        )
+        if exp_done.bytes <= export.EXPORT_INLINE_MB * 1024 * 1024:
+            # a download button holds the whole file and re-reads it on every
+            # rerun, so it only exists between asking for it and downloading
+            if st.session_state.get("export_offer") == exp_done.path:
+                with open(exp_done.path, "rb") as f:
+                    st.download_button(
+                        "Download", f, file_name=os.path.basename(exp_done.path), use_container_width=True,
+                        on_click=lambda: st.session_state.pop("export_offer", None),
+                    )
+            elif st.button("Prepare download", use_container_width=True):
+                st.session_state.export_offer = exp_done.path
+                st.rerun()
+        else:
+            st.caption(f"Too large to download here; saved to {exp_done.path}")
+            if export.EXPORT_API_URL and exp_done.span is not None:
+                st.link_button("Stream csv.gz from the API", export.api_url(exp_done.name, *exp_done.span),
+                               use_container_width=True)
+
+    st.markdown("---")
+    st.markdown("## Performance")
+    show_perf = st.toggle("Query timings", value=False)
+    perf_box = st.container()
+
 
 start_int = int_yyyymmdd(start_d)
 end_int = int_yyyymmdd(end_d)
 
 
-# check for data changes via notify or polling
-got_notify = check_notifications()
+# check for data changes via notify or polling; the listener has already
+# bumped the shared caches, this session only notes that it fired
+got_notify = listener.generation != st.session_state.seen_generation
+st.session_state.seen_generation = listener.generation
 
 polled_new = False
 now_ts = time.time()
@@ -436,155 +490,100 @@ now_ts = time.time()
 if live_refresh and (now_ts - st.session_state.last_poll_check_ts) >= poll_seconds:
     st.session_state.last_poll_check_ts = now_ts
     try:
-        max_now = qdf("SELECT MAX(event_date) AS m FROM daily_event_volume_by_quadclass;")
-        cur_max = int(max_now.loc[0, "m"]) if not max_now.empty and pd.notna(max_now.loc[0, "m"]) else None
-        if cur_max is not None and st.session_state.last_polled_max_date is not None:
-            if cur_max != st.session_state.last_polled_max_date:
+        # table_versions lookups; also catches updates to existing dates
+        cur_versions = gcm_data.load_versions(query=query)
+        if st.session_state.last_polled_versions is not None:
+            if cur_versions != st.session_state.last_polled_versions:
                 polled_new = True
-        st.session_state.last_polled_max_date = cur_max
+        st.session_state.last_polled_versions = cur_versions
     except Exception:
         pass
 
 # invalidate cache if new data detected
+if polled_new:
+    results.bump()
 if got_notify or polled_new:
-    st.session_state.data_version += 1
     st.session_state.last_refresh_time = datetime.now()
 
 
-@st.cache_data(show_spinner=False, ttl=3600)
-def load_all(version: int, start_i: int, end_i: int, topn: int) -> Dict[str, pd.DataFrame]:
-    out: Dict[str, pd.DataFrame] = {}
-
-    out["kpis"] = qdf(
-        """
-        SELECT
-          SUM(total_events) AS total_events,
-          SUM(CASE WHEN quad_class IN (3,4) THEN total_events ELSE 0 END) AS conflict_events,
-          AVG(avg_goldstein) AS mean_goldstein
-        FROM daily_event_volume_by_quadclass
-        WHERE event_date BETWEEN %(s)s AND %(e)s;
-        """,
-        params={"s": start_i, "e": end_i},
-    )
-
-    out["trend"] = qdf(
-        """
-        SELECT
-          to_date(event_date::text, 'YYYYMMDD') AS event_day,
-          SUM(total_events) AS total_events,
-          SUM(CASE WHEN quad_class IN (3,4) THEN total_events ELSE 0 END) AS conflict_events,
-          AVG(avg_goldstein) AS mean_goldstein
-        FROM daily_event_volume_by_quadclass
-        WHERE event_date BETWEEN %(s)s AND %(e)s
-        GROUP BY 1
-        ORDER BY 1;
-        """,
-        params={"s": start_i, "e": end_i},
-    )
-
-    out["actors"] = qdf(
-        """
-        SELECT
-          source_actor AS iso3,
-          SUM(total_events) AS total_events,
-          AVG(avg_goldstein) AS mean_goldstein
-        FROM top_actors
-        WHERE event_date BETWEEN %(s)s AND %(e)s
-          AND source_actor IS NOT NULL
-          AND char_length(source_actor) = 3
-        GROUP BY 1
-        HAVING SUM(total_events) > 0
-        ORDER BY total_events DESC
-        LIMIT 250;
-        """,
-        params={"s": start_i, "e": end_i},
-    )
-
-    out["dyads"] = qdf(
-        """
-        SELECT
-          source_actor,
-          target_actor,
-          SUM(total_events) AS total_events,
-          AVG(avg_goldstein) AS mean_goldstein
-        FROM dyad_interactions
-        WHERE event_date BETWEEN %(s)s AND %(e)s
-          AND source_actor IS NOT NULL
-          AND target_actor IS NOT NULL
-        GROUP BY 1,2
-        ORDER BY total_events DESC
-        LIMIT %(n)s;
-        """,
-        params={"s": start_i, "e": end_i, "n": topn},
-    )
-
-    out["cameo"] = qdf(
-        """
-        SELECT
-          cameo_code,
-          SUM(total_events) AS total_events,
-          AVG(avg_goldstein) AS mean_goldstein
-        FROM daily_cameo_metrics
-        WHERE event_date BETWEEN %(s)s AND %(e)s
-          AND cameo_code IS NOT NULL
-        GROUP BY 1
-        ORDER BY total_events DESC
-        LIMIT %(n)s;
-        """,
-        params={"s": start_i, "e": end_i, "n": topn},
-    )
-
-    out["quad_dist"] = qdf(
-        """
-        SELECT
-          quad_class,
-          SUM(total_events) AS total_events,
-          AVG(avg_goldstein) AS avg_goldstein
-        FROM daily_event_volume_by_quadclass
-        WHERE event_date BETWEEN %(s)s AND %(e)s
-        GROUP BY 1
-        ORDER BY 1;
-        """,
-        params={"s": start_i, "e": end_i},
-    )
-
-    out["quad_time"] = qdf(
-        """
-        SELECT
-          to_date(event_date::text, 'YYYYMMDD') AS event_day,
-          quad_class,
-          SUM(total_events) AS total_events
-        FROM daily_event_volume_by_quadclass
-        WHERE event_date BETWEEN %(s)s AND %(e)s
-        GROUP BY 1,2
-        ORDER BY 1,2;
-        """,
-        params={"s": start_i, "e": end_i},
-    )
-
-    return out
+def load_all(start_i: int, end_i: int, topn: int) -> Dict[str, object]:
+    n0 = len(trace.records)
+    with tracing.cache_scope("load_all"):
+        if store is not None:
+            frames = store.load_all(start_i, end_i, topn,
+                                    key=("load_all", st.session_state.session_id), poll=_query_tick.empty)
+        else:
+            # all frames in parallel; a newer rerun of this session supersedes them
+            frames = adb.call(
+                gcm_data.aload_all(adb, start_i, end_i, topn),
+                key=("load_all", st.session_state.session_id),
+                poll=_query_tick.empty,
+            )
+    # what compact dtypes saved on this frame set, kept for the perf panel
+    saved = sum(r.saved_bytes for r in trace.records[n0:])
+    return {"frames": frames, "saved_bytes": saved}
 
 
-data = load_all(st.session_state.data_version, start_int, end_int, top_n)
+loaded, cache_hit = results.get_or_load(
+    ("load_all", start_int, end_int, top_n),
+    lambda: load_all(start_int, end_int, top_n),
+)
+data: Dict[str, pd.DataFrame] = loaded["frames"]
+if cache_hit:
+    trace.add_cache_hits(data, {"s": start_int, "e": end_int, "n": top_n})
 
 kpis = data["kpis"]
+distinct = data["distinct"]
 trend = data["trend"]
+bands = data["goldstein_bands"]
 actors = data["actors"]
 dyads = data["dyads"]
 cameo = data["cameo"]
 quad_dist = data["quad_dist"]
 quad_time = data["quad_time"]
+rolling = data["rolling"]
 
 total_events = int(kpis.loc[0, "total_events"] or 0)
 conflict_events = int(kpis.loc[0, "conflict_events"] or 0)
 mean_goldstein = float(kpis.loc[0, "mean_goldstein"] or 0.0)
 conflict_rate = (conflict_events / total_events * 100.0) if total_events else 0.0
+distinct_actors = int(distinct.loc[0, "distinct_actors"] or 0) if not distinct.empty else 0
+distinct_dyads = int(distinct.loc[0, "distinct_dyads"] or 0) if not distinct.empty else 0
+
+
+@st.cache_resource
+def get_figure_cache() -> FigureCache:
+    # shared across sessions; an unchanged rerun reuses every figure
+    return FigureCache()
+
+
+figs = get_figure_cache()
 
 
+@st.cache_resource
+def get_slot_monitor() -> SlotMonitor:
+    # shared across sessions so the lag history is one time series
+    return SlotMonitor()
+
+
+try:
+    slot = get_slot_monitor().latest(max_age=max(refresh_seconds, 5))
+except Exception:
+    slot = None
+
 chips = [
     f'<div class="chip"><span class="k">Latest</span> {max_date.isoformat()}</div>',
     f'<div class="chip"><span class="k">Refresh</span> {st.session_state.last_refresh_time.strftime("%H:%M:%S")}</div>',
 ]
+if slot is not None:
+    lag_txt = format_bytes(slot.flush_lag_bytes)
+    if slot.lag_seconds is not None:
+        lag_txt += f" • {slot.lag_seconds:,.0f}s"
+    if not slot.exists:
+        lag_txt = "no slot"
+    cls = "chip chip-alarm" if slot.alarm else "chip"
+    title = slot.alarm or f"retained WAL {format_bytes(slot.retained_wal_bytes)}"
+    chips.append(f'<div class="{cls}" title="{title}"><span class="k">CDC lag</span> {lag_txt}</div>')
 if is_live:
     chips.append('<div class="chip chip-live"><span class="dot"></span> LIVE</div>')
 
@@ -604,6 +603,9 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+if slot is not None and slot.alarm:
+    st.warning(f"CDC replication alarm: {slot.alarm}")
+
 
 def kpi_card(label: str, value: str, hint: str):
     st.markdown(
@@ -618,13 +620,19 @@ def kpi_card(label: str, value: str, hint: str):
     )
 
 
-k1, k2, k3, k4 = st.columns(4)
+hll_hint = f"HLL estimate ±{gcm_data.HLL_ERROR * 100:.1f}%"
+
+k1, k2, k3, k5, k6, k4 = st.columns(6)
 with k1:
     kpi_card("Total events", f"{total_events:,}", "All quad classes")
 with k2:
     kpi_card("Conflict events", f"{conflict_events:,}", "Quad 3 & 4")
 with k3:
     kpi_card("Conflict rate", f"{conflict_rate:.1f}%", "Conflict / total")
+with k5:
+    kpi_card("Distinct actors", f"≈{distinct_actors:,}", hll_hint)
+with k6:
+    kpi_card("Active dyads", f"≈{distinct_dyads:,}", hll_hint)
 with k4:
     if st.session_state.processing_time is None:
         kpi_card("Avg Goldstein", f"{mean_goldstein:.2f}", "Tone (unweighted)")
@@ -648,43 +656,7 @@ with left:
     if actors.empty:
         st.info("No ISO-3 actor rows available in this period.")
     else:
-        if map_metric == "Avg Goldstein":
-            fig_map = px.choropleth(
-                actors,
-                locations="iso3",
-                locationmode="ISO-3",
-                color="mean_goldstein",
-                hover_name="iso3",
-                hover_data={"total_events": ":,", "mean_goldstein": ":.2f", "iso3": False},
-                color_continuous_scale="RdBu_r",
-                color_continuous_midpoint=0,
-                template="plotly_dark",
-            )
-        else:
-            fig_map = px.choropleth(
-                actors,
-                locations="iso3",
-                locationmode="ISO-3",
-                color="total_events",
-                hover_name="iso3",
-                hover_data={"total_events": ":,", "mean_goldstein": ":.2f", "iso3": False},
-                color_continuous_scale="Viridis",
-                template="plotly_dark",
-            )
-
-        fig_map.update_layout(
-            height=350,
-            margin=dict(l=0, r=0, t=0, b=0),
-            paper_bgcolor="rgba(0,0,0,0)",
-            geo=dict(
-                bgcolor="rgba(0,0,0,0)",
-                landcolor="rgba(30,41,59,0.55)",
-                showcountries=True,
-                countrycolor="rgba(148,163,184,0.22)",
-                showframe=False,
-                projection_type="natural earth",
-            ),
-        )
+        fig_map = figs.get("map", charts.build_map, actors, map_metric=map_metric)
         st.plotly_chart(fig_map, use_container_width=True)
 
 with right:
@@ -693,39 +665,12 @@ with right:
     if trend.empty:
         st.info("No data in this range.")
     else:
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=trend["event_day"], y=trend["total_events"],
-            mode="lines", name="Total",
-            fill="tozeroy"
-        ))
-        fig.add_trace(go.Scatter(
-            x=trend["event_day"], y=trend["conflict_events"],
-            mode="lines", name="Conflict"
-        ))
-        fig.add_trace(go.Scatter(
-            x=trend["event_day"], y=trend["mean_goldstein"],
-            mode="lines", name="Goldstein",
-            line=dict(dash="dot"),
-            yaxis="y2"
-        ))
-
-        fig.update_layout(
-            template="plotly_dark",
-            height=350,
-            margin=dict(l=16, r=16, t=10, b=10),
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-            hovermode="x unified",
-            legend=dict(orientation="h", y=1.12),
-            yaxis=dict(title="Events"),
-            yaxis2=dict(title="Goldstein", overlaying="y", side="right"),
-        )
+        fig = figs.get("trend", charts.build_trend, trend, bands)
         st.plotly_chart(fig, use_container_width=True)
 
 
 st.markdown('<div class="sp-18"></div>', unsafe_allow_html=True)
-tab1, tab2, tab3 = st.tabs(["Interactions", "QuadClass", "CAMEO"])
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["Interactions", "QuadClass", "CAMEO", "Event density", "Alerts"])
 
 with tab1:
     a, b = st.columns([1.2, 1])
@@ -735,24 +680,12 @@ with tab1:
         if dyads.empty:
             st.info("No dyad data available for this range.")
         else:
-            top_actors_list = pd.concat([dyads["source_actor"], dyads["target_actor"]]).value_counts().head(12).index.tolist()
-            hm = dyads[dyads["source_actor"].isin(top_actors_list) & dyads["target_actor"].isin(top_actors_list)].copy()
-            
-            if hm.empty:
+            pivot = figs.get("dyad_pivot", charts.dyad_pivot, dyads)
+
+            if pivot.empty:
                 st.info("Not enough overlap for a heatmap. Try a broader range.")
             else:
-                pivot = hm.pivot_table(index="source_actor", columns="target_actor", values="total_events", aggfunc="sum", fill_value=0)
-                fig_hm = go.Figure(data=go.Heatmap(
-                    z=pivot.values, x=pivot.columns, y=pivot.index,
-                    colorscale="Plasma",
-                    hovertemplate="From %{y} → %{x}<br>Events: %{z:,}<extra></extra>",
-                    colorbar=dict(title="Events")
-                ))
-                fig_hm.update_layout(
-                    template="plotly_dark", height=380,
-                    margin=dict(l=16, r=16, t=10, b=10),
-                    paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
-                )
+                fig_hm = figs.get("heatmap", charts.build_heatmap, pivot)
                 st.plotly_chart(fig_hm, use_container_width=True)
     
     with b:
@@ -767,26 +700,7 @@ with tab2:
         if quad_dist.empty:
             st.info("No quadclass distribution for this range.")
         else:
-            quad_labels = {
-                1: "Q1 Verbal Coop",
-                2: "Q2 Material Coop",
-                3: "Q3 Verbal Conflict",
-                4: "Q4 Material Conflict"
-            }
-            qd = quad_dist.copy()
-            qd["quad_label"] = qd["quad_class"].map(quad_labels).fillna(qd["quad_class"].astype(str))
-            
-            fig_qd = px.bar(
-                qd, x="quad_label", y="total_events",
-                template="plotly_dark",
-                hover_data={"total_events": ":,", "avg_goldstein": ":.2f"},
-            )
-            fig_qd.update_layout(
-                height=380,
-                margin=dict(l=16, r=16, t=10, b=10),
-                paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
-                xaxis_title="", yaxis_title="Events",
-            )
+            fig_qd = figs.get("quad_bar", charts.build_quad_bar, quad_dist)
             st.plotly_chart(fig_qd, use_container_width=True)
 
     with c2:
@@ -794,58 +708,177 @@ with tab2:
         if quad_time.empty:
             st.info("No quadclass time series for this range.")
         else:
-            quad_labels = {
-                1: "Q1 Verbal Coop",
-                2: "Q2 Material Coop",
-                3: "Q3 Verbal Conflict",
-                4: "Q4 Material Conflict"
-            }
-            qt = quad_time.copy()
-            qt["quad_label"] = qt["quad_class"].map(quad_labels).fillna("Q" + qt["quad_class"].astype(str))
-            
-            fig_area = px.area(
-                qt,
-                x="event_day",
-                y="total_events",
-                color="quad_label",
-                template="plotly_dark",
-                color_discrete_map={
-                    "Q1 Verbal Coop": "#22c55e",
-                    "Q2 Material Coop": "#3b82f6",
-                    "Q3 Verbal Conflict": "#f59e0b",
-                    "Q4 Material Conflict": "#ef4444"
-                }
-            )
-            fig_area.update_layout(
-                height=380,
-                margin=dict(l=16, r=16, t=10, b=30),
-                paper_bgcolor="rgba(0,0,0,0)",
-                plot_bgcolor="rgba(0,0,0,0)",
-                xaxis=dict(title="", tickangle=-35),
-                yaxis=dict(title="Events"),
-                legend=dict(title="", orientation="h", y=1.12),
-                hovermode="x unified"
-            )
+            fig_area = figs.get("quad_area", charts.build_quad_area, quad_time)
             st.plotly_chart(fig_area, use_container_width=True)
 
+    r1, r2 = st.columns([1, 1])
+
+    with r1:
+        st.subheader("Rolling Conflict Share")
+        if rolling.empty:
+            st.info("No rolling metrics yet. Run scripts/refresh_rolling.py.")
+        else:
+            fig_roll = figs.get("rolling", charts.build_rolling, rolling)
+            st.plotly_chart(fig_roll, use_container_width=True)
+
+    with r2:
+        st.subheader("Rolling Conflict Share by Country")
+        if actors.empty:
+            st.info("No ISO-3 actor rows available in this period.")
+        else:
+            country = st.selectbox("Country", actors["iso3"].tolist(), index=0)
+            actor_rolling, _ = results.get_or_load(
+                ("actor_rolling", country, start_int, end_int),
+                lambda: gcm_data.load_actor_rolling(country, start_int, end_int, query=query),
+            )
+            if actor_rolling.empty:
+                st.info("No rolling metrics for this country yet.")
+            else:
+                fig_ar = figs.get("actor_rolling", charts.build_rolling, actor_rolling)
+                st.plotly_chart(fig_ar, use_container_width=True)
+
 with tab3:
     st.subheader("Top CAMEO Codes")
     if cameo.empty:
         st.info("No CAMEO data available for this range.")
     else:
-        fig_bar = px.bar(
-            cameo.sort_values("total_events", ascending=True).tail(top_n),
-            x="total_events", y="cameo_code", orientation="h",
-            template="plotly_dark",
-            hover_data={"total_events": ":,", "mean_goldstein": ":.2f"},
+        fig_bar = figs.get("cameo_bar", charts.build_cameo_bar, cameo, top_n=top_n)
+        st.plotly_chart(fig_bar, use_container_width=True)
+
+with tab4:
+    st.subheader("Event Density")
+    zoom = st.select_slider(
+        "Grid cell",
+        options=list(range(len(geogrid.ZOOM_DEG))),
+        value=1,
+        format_func=geogrid.zoom_label,
+    )
+    # reads one level of the geo_grid_daily pyramid, never raw events
+    grid, _ = results.get_or_load(
+        ("geo_grid", start_int, end_int, zoom),
+        lambda: geogrid.load_grid(start_int, end_int, zoom, query=query),
+    )
+    if grid.empty:
+        st.info("No geocoded events in this range.")
+    else:
+        fig_geo = figs.get("density", charts.build_density, grid, map_metric=map_metric)
+        st.plotly_chart(fig_geo, use_container_width=True)
+        if len(grid) >= geogrid.GEO_MAX_CELLS:
+            st.caption(f"Showing the {geogrid.GEO_MAX_CELLS:,} densest cells; use a coarser grid for the full picture.")
+
+    # drill-down: raw events around a point or inside a box, via the geo_cell index
+    with st.expander("Search events by location"):
+        with st.form("geo_search"):
+            mode = st.radio("Search", ["Radius", "Bounding box"], horizontal=True)
+            g1, g2, g3, g4 = st.columns(4)
+            if mode == "Radius":
+                lat = g1.number_input("Latitude", -90.0, 90.0, 50.45, step=0.5)
+                lon = g2.number_input("Longitude", -180.0, 180.0, 30.52, step=0.5)
+                km = g3.number_input("Radius (km)", 1.0, 5000.0, 200.0, step=25.0)
+            else:
+                south = g1.number_input("South", -90.0, 90.0, 44.0, step=0.5)
+                west = g2.number_input("West", -180.0, 180.0, 22.0, step=0.5)
+                north = g3.number_input("North", -90.0, 90.0, 52.5, step=0.5)
+                east = g4.number_input("East", -180.0, 180.0, 40.5, step=0.5)
+            submitted = st.form_submit_button("Search")
+
+        if submitted:
+            t0 = time.perf_counter()
+            try:
+                if mode == "Radius":
+                    hits = geogrid.search_radius(lat, lon, km, start_int, end_int, query=query)
+                else:
+                    hits = geogrid.search_bbox(south, west, north, east, start_int, end_int, query=query)
+                st.session_state.geo_hits = (hits, (time.perf_counter() - t0) * 1000)
+            except ValueError as e:
+                st.session_state.geo_hits = None
+                st.warning(str(e))
+
+        if st.session_state.get("geo_hits") is not None:
+            hits, ms = st.session_state.geo_hits
+            probed = hits.attrs.get("probed_cells", 0)
+            st.caption(
+                f"{len(hits):,} events in {ms:,.0f} ms • "
+                + (f"{probed:,} index cells probed" if probed else "area too large for the cell index, scanned")
+                + (f" • first {geogrid.SEARCH_LIMIT:,} shown" if len(hits) >= geogrid.SEARCH_LIMIT else "")
+            )
+            st.dataframe(hits, use_container_width=True, hide_index=True)
+
+with tab5:
+    st.subheader("Conflict Spike Alerts")
+    # written by scripts/detect_anomalies.py as top_actors / quad-class rows change
+    alerts, _ = results.get_or_load(
+        ("alerts", start_int, end_int),
+        lambda: anomaly.load_alerts(start_int, end_int, query=query),
+    )
+    if alerts.empty:
+        st.info("No alerts in this range.")
+    else:
+        st.caption(
+            f"{len(alerts):,} country-days with a conflict rate ≥ {anomaly.Z_THRESHOLD:g}σ above "
+            f"their EWMA baseline (ALL = every event)"
+        )
+        fig_al = figs.get("alerts", charts.build_alerts, alerts)
+        st.plotly_chart(fig_al, use_container_width=True)
+        st.dataframe(alerts, use_container_width=True, hide_index=True)
+
+
+tracing.write_metrics(trace)
+
+if show_perf:
+    with perf_box:
+        perf = trace.to_frame()
+        hits = int((perf["cache"] == "hit").sum())
+        st.caption(
+            f"Render {trace.render_id} • {len(perf)} queries • "
+            f"{trace.total_ms():,.0f} ms in db • {hits} cache hits"
         )
-        fig_bar.update_layout(
-            height=420,
-            margin=dict(l=16, r=16, t=10, b=10),
-            paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
-            xaxis_title="Events", yaxis_title="",
+        rc = results.stats()
+        st.caption(
+            f"Result cache v{rc['version']} • {rc['entries']} entries • "
+            f"{format_bytes(rc['bytes'])} / {format_bytes(rc['max_bytes'])} • "
+            f"{rc['hits']:,} hits • {rc['misses']:,} misses • "
+            f"evicted {rc['evicted']['superseded']:,} superseded, "
+            f"{rc['evicted']['lru']:,} lru, {rc['evicted']['bytes']:,} over budget"
         )
-        st.plotly_chart(fig_bar, use_container_width=True)
+        held = sum(tracing.frame_bytes(df) for df in data.values())
+        saved = loaded["saved_bytes"]
+        st.caption(
+            f"Frames held {format_bytes(held)} • compact dtypes saved {format_bytes(saved)} "
+            f"({saved / max(held + saved, 1) * 100:.0f}%)"
+        )
+        ds = adb.stats()
+        st.caption(
+            f"DB pool • {ds['in_flight']} in flight • {ds['completed']:,} done • "
+            f"{ds['cancelled']:,} cancelled • {ds['timeouts']:,} timed out • {ds['failed']:,} failed"
+        )
+        ns = listener.stats()
+        st.caption(
+            f"Notifications • {'listening' if ns['connected'] else 'disconnected'} • "
+            f"{ns['received']:,} received • {ns['fired']:,} refreshes • {ns['pending']} tables pending"
+        )
+        fc = figs.stats()
+        st.caption(
+            f"Figure cache • {fc['entries']} entries • {fc['hits']:,} hits • "
+            f"{fc['misses']:,} builds • {fc['evictions']:,} evicted"
+        )
+        if store is not None:
+            st.caption(
+                f"Snapshot {store.manifest['exported_at'][:19]} • "
+                f"table versions {'/'.join(str(v) for v in store.versions.values())} • "
+                f"{store.last_delta_rows:,} rows in last delta"
+            )
+        st.dataframe(
+            perf[["label", "cache", "latency_ms", "rows", "frame_bytes", "saved_bytes", "fingerprint"]]
+            .sort_values("latency_ms", ascending=False),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+        lag_hist = get_slot_monitor().history()
+        if not lag_hist.empty:
+            st.caption("CDC slot lag (bytes)")
+            st.line_chart(lag_hist.set_index("sample_time")[["flush_lag_bytes", "retained_wal_bytes"]], height=160)
 
 
 # rerun periodically to check for updates
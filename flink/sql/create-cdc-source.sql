@@ -8,6 +8,10 @@ CREATE TABLE IF NOT EXISTS gdelt_cdc_source (
     target_actor STRING,
     cameo_code STRING,
 
+    source_actor_id INT,
+    target_actor_id INT,
+    cameo_id SMALLINT,
+
     num_events INT,
     num_articles INT,
     quad_class INT,
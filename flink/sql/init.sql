@@ -8,6 +8,10 @@ CREATE TABLE IF NOT EXISTS gdelt_cdc_source (
     target_actor STRING,
     cameo_code STRING,
 
+    source_actor_id INT,
+    target_actor_id INT,
+    cameo_id SMALLINT,
+
     num_events INT,
     num_articles INT,
     quad_class INT,
@@ -53,6 +57,9 @@ CREATE TABLE IF NOT EXISTS daily_event_volume_by_quadclass_sink (
   total_events BIGINT,
   total_articles BIGINT,
   avg_goldstein DOUBLE,
+  row_count BIGINT,
+  goldstein_sum DOUBLE,
+  goldstein_n BIGINT,
   last_updated TIMESTAMP(3),
   PRIMARY KEY (event_date, quad_class) NOT ENFORCED
 ) WITH (
@@ -66,12 +73,15 @@ CREATE TABLE IF NOT EXISTS daily_event_volume_by_quadclass_sink (
 
 CREATE TABLE IF NOT EXISTS dyad_interactions_sink (
   event_date INT,
-  source_actor STRING,
-  target_actor STRING,
+  source_actor_id INT,
+  target_actor_id INT,
   total_events BIGINT,
   avg_goldstein DOUBLE,
+  row_count BIGINT,
+  goldstein_sum DOUBLE,
+  goldstein_n BIGINT,
   last_updated TIMESTAMP(3),
-  PRIMARY KEY (event_date, source_actor, target_actor) NOT ENFORCED
+  PRIMARY KEY (event_date, source_actor_id, target_actor_id) NOT ENFORCED
 ) WITH (
   'connector' = 'jdbc',
   'url' = 'jdbc:postgresql://postgres:5432/gdelt',
@@ -83,12 +93,16 @@ CREATE TABLE IF NOT EXISTS dyad_interactions_sink (
 
 CREATE TABLE IF NOT EXISTS top_actors_sink (
   event_date INT,
-  source_actor STRING,
+  source_actor_id INT,
   total_events BIGINT,
   total_articles BIGINT,
   avg_goldstein DOUBLE,
+  conflict_events BIGINT,
+  row_count BIGINT,
+  goldstein_sum DOUBLE,
+  goldstein_n BIGINT,
   last_updated TIMESTAMP(3),
-  PRIMARY KEY (event_date, source_actor) NOT ENFORCED
+  PRIMARY KEY (event_date, source_actor_id) NOT ENFORCED
 ) WITH (
   'connector' = 'jdbc',
   'url' = 'jdbc:postgresql://postgres:5432/gdelt',
@@ -100,12 +114,15 @@ CREATE TABLE IF NOT EXISTS top_actors_sink (
 
 CREATE TABLE IF NOT EXISTS daily_cameo_metrics_sink (
   event_date INT,
-  cameo_code STRING,
+  cameo_id SMALLINT,
   total_events BIGINT,
   total_articles BIGINT,
   avg_goldstein DOUBLE,
+  row_count BIGINT,
+  goldstein_sum DOUBLE,
+  goldstein_n BIGINT,
   last_updated TIMESTAMP(3),
-  PRIMARY KEY (event_date, cameo_code) NOT ENFORCED
+  PRIMARY KEY (event_date, cameo_id) NOT ENFORCED
 ) WITH (
   'connector' = 'jdbc',
   'url' = 'jdbc:postgresql://postgres:5432/gdelt',
@@ -115,3 +132,40 @@ CREATE TABLE IF NOT EXISTS daily_cameo_metrics_sink (
   'driver' = 'org.postgresql.Driver'
 );
 
+CREATE TABLE IF NOT EXISTS daily_goldstein_histogram_sink (
+  event_date INT,
+  quad_class INT,
+  bin SMALLINT,
+  n BIGINT,
+  last_updated TIMESTAMP(3),
+  PRIMARY KEY (event_date, quad_class, bin) NOT ENFORCED
+) WITH (
+  'connector' = 'jdbc',
+  'url' = 'jdbc:postgresql://postgres:5432/gdelt',
+  'table-name' = 'daily_goldstein_histogram',
+  'username' = 'flink_user',
+  'password' = 'flink_pass',
+  'driver' = 'org.postgresql.Driver'
+);
+
+CREATE TABLE IF NOT EXISTS geo_grid_daily_sink (
+  zoom SMALLINT,
+  event_date INT,
+  cell_y INT,
+  cell_x INT,
+  total_events BIGINT,
+  conflict_events BIGINT,
+  goldstein_sum DOUBLE,
+  goldstein_n BIGINT,
+  row_count BIGINT,
+  last_updated TIMESTAMP(3),
+  PRIMARY KEY (zoom, event_date, cell_y, cell_x) NOT ENFORCED
+) WITH (
+  'connector' = 'jdbc',
+  'url' = 'jdbc:postgresql://postgres:5432/gdelt',
+  'table-name' = 'geo_grid_daily',
+  'username' = 'flink_user',
+  'password' = 'flink_pass',
+  'driver' = 'org.postgresql.Driver'
+);
+
@@ -10,6 +10,9 @@ SELECT
   SUM(CAST(num_events AS BIGINT)) AS total_events,
   SUM(CAST(num_articles AS BIGINT)) AS total_articles,
   AVG(goldstein) AS avg_goldstein,
+  COUNT(*) AS row_count,
+  SUM(goldstein) AS goldstein_sum,
+  COUNT(goldstein) AS goldstein_n,
   CURRENT_TIMESTAMP AS last_updated
 FROM gdelt_cdc_source
 GROUP BY event_date, quad_class;
@@ -18,36 +21,110 @@ GROUP BY event_date, quad_class;
 INSERT INTO dyad_interactions_sink
 SELECT
   event_date,
-  source_actor,
-  target_actor,
+  source_actor_id,
+  target_actor_id,
   SUM(CAST(num_events AS BIGINT)) AS total_events,
   AVG(goldstein) AS avg_goldstein,
+  COUNT(*) AS row_count,
+  SUM(goldstein) AS goldstein_sum,
+  COUNT(goldstein) AS goldstein_n,
   CURRENT_TIMESTAMP AS last_updated
 FROM gdelt_cdc_source
-GROUP BY event_date, source_actor, target_actor;
+GROUP BY event_date, source_actor_id, target_actor_id;
 
 -- top_actors
 INSERT INTO top_actors_sink
 SELECT
   event_date,
-  source_actor,
+  source_actor_id,
   SUM(CAST(num_events AS BIGINT)) AS total_events,
   SUM(CAST(num_articles AS BIGINT)) AS total_articles,
   AVG(goldstein) AS avg_goldstein,
+  SUM(CAST(CASE WHEN quad_class IN (3,4) THEN num_events ELSE 0 END AS BIGINT)) AS conflict_events,
+  COUNT(*) AS row_count,
+  SUM(goldstein) AS goldstein_sum,
+  COUNT(goldstein) AS goldstein_n,
   CURRENT_TIMESTAMP AS last_updated
 FROM gdelt_cdc_source
-GROUP BY event_date, source_actor;
+GROUP BY event_date, source_actor_id;
 
 -- cameo metrics
 INSERT INTO daily_cameo_metrics_sink
 SELECT
   event_date,
-  cameo_code,
+  cameo_id,
   SUM(CAST(num_events AS BIGINT)) AS total_events,
   SUM(CAST(num_articles AS BIGINT)) AS total_articles,
   AVG(goldstein) AS avg_goldstein,
+  COUNT(*) AS row_count,
+  SUM(goldstein) AS goldstein_sum,
+  COUNT(goldstein) AS goldstein_n,
   CURRENT_TIMESTAMP AS last_updated
 FROM gdelt_cdc_source
-GROUP BY event_date, cameo_code;
+GROUP BY event_date, cameo_id;
+
+-- goldstein histogram (0.1-wide bins)
+INSERT INTO daily_goldstein_histogram_sink
+SELECT
+  event_date,
+  quad_class,
+  CAST(ROUND(goldstein * 10, 0) AS SMALLINT) AS bin,
+  COUNT(*) AS n,
+  CURRENT_TIMESTAMP AS last_updated
+FROM gdelt_cdc_source
+WHERE goldstein IS NOT NULL
+GROUP BY event_date, quad_class, CAST(ROUND(goldstein * 10, 0) AS SMALLINT);
+
+-- event density pyramid, one insert per zoom level (cell sizes in gcm/geogrid.py)
+INSERT INTO geo_grid_daily_sink
+SELECT
+  CAST(0 AS SMALLINT) AS zoom,
+  event_date,
+  LEAST(CAST(FLOOR((action_geo_lat + 90) / 4.0) AS INT), 44) AS cell_y,
+  LEAST(CAST(FLOOR((action_geo_long + 180) / 4.0) AS INT), 89) AS cell_x,
+  SUM(CAST(num_events AS BIGINT)) AS total_events,
+  SUM(CAST(CASE WHEN quad_class IN (3,4) THEN num_events ELSE 0 END AS BIGINT)) AS conflict_events,
+  SUM(goldstein) AS goldstein_sum,
+  COUNT(goldstein) AS goldstein_n,
+  COUNT(*) AS row_count,
+  CURRENT_TIMESTAMP AS last_updated
+FROM gdelt_cdc_source
+WHERE action_geo_lat BETWEEN -90 AND 90
+  AND action_geo_long BETWEEN -180 AND 180
+GROUP BY event_date, LEAST(CAST(FLOOR((action_geo_lat + 90) / 4.0) AS INT), 44), LEAST(CAST(FLOOR((action_geo_long + 180) / 4.0) AS INT), 89);
+
+INSERT INTO geo_grid_daily_sink
+SELECT
+  CAST(1 AS SMALLINT) AS zoom,
+  event_date,
+  LEAST(CAST(FLOOR((action_geo_lat + 90) / 1.0) AS INT), 179) AS cell_y,
+  LEAST(CAST(FLOOR((action_geo_long + 180) / 1.0) AS INT), 359) AS cell_x,
+  SUM(CAST(num_events AS BIGINT)) AS total_events,
+  SUM(CAST(CASE WHEN quad_class IN (3,4) THEN num_events ELSE 0 END AS BIGINT)) AS conflict_events,
+  SUM(goldstein) AS goldstein_sum,
+  COUNT(goldstein) AS goldstein_n,
+  COUNT(*) AS row_count,
+  CURRENT_TIMESTAMP AS last_updated
+FROM gdelt_cdc_source
+WHERE action_geo_lat BETWEEN -90 AND 90
+  AND action_geo_long BETWEEN -180 AND 180
+GROUP BY event_date, LEAST(CAST(FLOOR((action_geo_lat + 90) / 1.0) AS INT), 179), LEAST(CAST(FLOOR((action_geo_long + 180) / 1.0) AS INT), 359);
+
+INSERT INTO geo_grid_daily_sink
+SELECT
+  CAST(2 AS SMALLINT) AS zoom,
+  event_date,
+  LEAST(CAST(FLOOR((action_geo_lat + 90) / 0.25) AS INT), 719) AS cell_y,
+  LEAST(CAST(FLOOR((action_geo_long + 180) / 0.25) AS INT), 1439) AS cell_x,
+  SUM(CAST(num_events AS BIGINT)) AS total_events,
+  SUM(CAST(CASE WHEN quad_class IN (3,4) THEN num_events ELSE 0 END AS BIGINT)) AS conflict_events,
+  SUM(goldstein) AS goldstein_sum,
+  COUNT(goldstein) AS goldstein_n,
+  COUNT(*) AS row_count,
+  CURRENT_TIMESTAMP AS last_updated
+FROM gdelt_cdc_source
+WHERE action_geo_lat BETWEEN -90 AND 90
+  AND action_geo_long BETWEEN -180 AND 180
+GROUP BY event_date, LEAST(CAST(FLOOR((action_geo_lat + 90) / 0.25) AS INT), 719), LEAST(CAST(FLOOR((action_geo_long + 180) / 0.25) AS INT), 1439);
 
 END;
@@ -0,0 +1,286 @@
+-- Delta pipeline: resumes at the slot scripts/rebuild_aggregates.py created.
+-- Reads the signed change log (postgres/init/11-delta-sinks.sql) and keeps
+-- per-group running totals of it in the <table>_delta tables; a trigger
+-- there adds each change onto the rebuilt results row. The input is
+-- insert-only, so no group ever needs state from before the resume
+
+CREATE TABLE IF NOT EXISTS gdelt_changes_source (
+    change_id BIGINT,
+    sign SMALLINT,
+
+    event_date INT,
+    source_actor_id INT,
+    target_actor_id INT,
+    cameo_id SMALLINT,
+
+    num_events INT,
+    num_articles INT,
+    quad_class INT,
+    goldstein DOUBLE,
+
+    action_geo_lat DOUBLE,
+    action_geo_long DOUBLE,
+
+    PRIMARY KEY (change_id) NOT ENFORCED
+) WITH (
+    'connector' = 'postgres-cdc',
+    'hostname' = 'postgres',
+    'port' = '5432',
+    'username' = 'flink_user',
+    'password' = 'flink_pass',
+    'database-name' = 'gdelt',
+    'schema-name' = 'public',
+    'table-name' = 'gdelt_event_changes',
+
+    -- the rebuilt tables hold everything before the slot's consistent point
+    'scan.startup.mode' = 'latest-offset',
+    'slot.name' = 'gdelt_flink_slot',
+    'debezium.publication.name' = 'gdelt_flink_delta_pub',
+    'debezium.publication.autocreate.mode' = 'disabled',
+    'debezium.slot.drop.on.stop' = 'false',
+    'decoding.plugin.name' = 'pgoutput',
+    'changelog-mode' = 'all'
+);
+
+-- JDBC sink tables (Postgres), running totals since the job started
+
+CREATE TABLE IF NOT EXISTS daily_event_volume_by_quadclass_delta_sink (
+  event_date INT,
+  quad_class INT,
+  row_count BIGINT,
+  total_events BIGINT,
+  total_articles BIGINT,
+  goldstein_sum DOUBLE,
+  goldstein_n BIGINT,
+  last_updated TIMESTAMP(3),
+  PRIMARY KEY (event_date, quad_class) NOT ENFORCED
+) WITH (
+  'connector' = 'jdbc',
+  'url' = 'jdbc:postgresql://postgres:5432/gdelt',
+  'table-name' = 'daily_event_volume_by_quadclass_delta',
+  'username' = 'flink_user',
+  'password' = 'flink_pass',
+  'driver' = 'org.postgresql.Driver'
+);
+
+CREATE TABLE IF NOT EXISTS dyad_interactions_delta_sink (
+  event_date INT,
+  source_actor_id INT,
+  target_actor_id INT,
+  row_count BIGINT,
+  total_events BIGINT,
+  goldstein_sum DOUBLE,
+  goldstein_n BIGINT,
+  last_updated TIMESTAMP(3),
+  PRIMARY KEY (event_date, source_actor_id, target_actor_id) NOT ENFORCED
+) WITH (
+  'connector' = 'jdbc',
+  'url' = 'jdbc:postgresql://postgres:5432/gdelt',
+  'table-name' = 'dyad_interactions_delta',
+  'username' = 'flink_user',
+  'password' = 'flink_pass',
+  'driver' = 'org.postgresql.Driver'
+);
+
+CREATE TABLE IF NOT EXISTS top_actors_delta_sink (
+  event_date INT,
+  source_actor_id INT,
+  row_count BIGINT,
+  total_events BIGINT,
+  total_articles BIGINT,
+  conflict_events BIGINT,
+  goldstein_sum DOUBLE,
+  goldstein_n BIGINT,
+  last_updated TIMESTAMP(3),
+  PRIMARY KEY (event_date, source_actor_id) NOT ENFORCED
+) WITH (
+  'connector' = 'jdbc',
+  'url' = 'jdbc:postgresql://postgres:5432/gdelt',
+  'table-name' = 'top_actors_delta',
+  'username' = 'flink_user',
+  'password' = 'flink_pass',
+  'driver' = 'org.postgresql.Driver'
+);
+
+CREATE TABLE IF NOT EXISTS daily_cameo_metrics_delta_sink (
+  event_date INT,
+  cameo_id SMALLINT,
+  row_count BIGINT,
+  total_events BIGINT,
+  total_articles BIGINT,
+  goldstein_sum DOUBLE,
+  goldstein_n BIGINT,
+  last_updated TIMESTAMP(3),
+  PRIMARY KEY (event_date, cameo_id) NOT ENFORCED
+) WITH (
+  'connector' = 'jdbc',
+  'url' = 'jdbc:postgresql://postgres:5432/gdelt',
+  'table-name' = 'daily_cameo_metrics_delta',
+  'username' = 'flink_user',
+  'password' = 'flink_pass',
+  'driver' = 'org.postgresql.Driver'
+);
+
+CREATE TABLE IF NOT EXISTS daily_goldstein_histogram_delta_sink (
+  event_date INT,
+  quad_class INT,
+  bin SMALLINT,
+  n BIGINT,
+  last_updated TIMESTAMP(3),
+  PRIMARY KEY (event_date, quad_class, bin) NOT ENFORCED
+) WITH (
+  'connector' = 'jdbc',
+  'url' = 'jdbc:postgresql://postgres:5432/gdelt',
+  'table-name' = 'daily_goldstein_histogram_delta',
+  'username' = 'flink_user',
+  'password' = 'flink_pass',
+  'driver' = 'org.postgresql.Driver'
+);
+
+CREATE TABLE IF NOT EXISTS geo_grid_daily_delta_sink (
+  zoom SMALLINT,
+  event_date INT,
+  cell_y INT,
+  cell_x INT,
+  row_count BIGINT,
+  total_events BIGINT,
+  conflict_events BIGINT,
+  goldstein_sum DOUBLE,
+  goldstein_n BIGINT,
+  last_updated TIMESTAMP(3),
+  PRIMARY KEY (zoom, event_date, cell_y, cell_x) NOT ENFORCED
+) WITH (
+  'connector' = 'jdbc',
+  'url' = 'jdbc:postgresql://postgres:5432/gdelt',
+  'table-name' = 'geo_grid_daily_delta',
+  'username' = 'flink_user',
+  'password' = 'flink_pass',
+  'driver' = 'org.postgresql.Driver'
+);
+
+-- Signed sums per group, same groups as run-aggregations.sql
+
+BEGIN STATEMENT SET;
+
+-- daily_event_volume_by_quadclass
+INSERT INTO daily_event_volume_by_quadclass_delta_sink
+SELECT
+  event_date,
+  quad_class,
+  SUM(CAST(sign AS BIGINT)) AS row_count,
+  SUM(CAST(sign * num_events AS BIGINT)) AS total_events,
+  SUM(CAST(sign * num_articles AS BIGINT)) AS total_articles,
+  SUM(sign * goldstein) AS goldstein_sum,
+  SUM(CAST(CASE WHEN goldstein IS NOT NULL THEN sign ELSE 0 END AS BIGINT)) AS goldstein_n,
+  CURRENT_TIMESTAMP AS last_updated
+FROM gdelt_changes_source
+GROUP BY event_date, quad_class;
+
+-- dyad_interactions
+INSERT INTO dyad_interactions_delta_sink
+SELECT
+  event_date,
+  source_actor_id,
+  target_actor_id,
+  SUM(CAST(sign AS BIGINT)) AS row_count,
+  SUM(CAST(sign * num_events AS BIGINT)) AS total_events,
+  SUM(sign * goldstein) AS goldstein_sum,
+  SUM(CAST(CASE WHEN goldstein IS NOT NULL THEN sign ELSE 0 END AS BIGINT)) AS goldstein_n,
+  CURRENT_TIMESTAMP AS last_updated
+FROM gdelt_changes_source
+GROUP BY event_date, source_actor_id, target_actor_id;
+
+-- top_actors
+INSERT INTO top_actors_delta_sink
+SELECT
+  event_date,
+  source_actor_id,
+  SUM(CAST(sign AS BIGINT)) AS row_count,
+  SUM(CAST(sign * num_events AS BIGINT)) AS total_events,
+  SUM(CAST(sign * num_articles AS BIGINT)) AS total_articles,
+  SUM(CAST(CASE WHEN quad_class IN (3,4) THEN sign * num_events ELSE 0 END AS BIGINT)) AS conflict_events,
+  SUM(sign * goldstein) AS goldstein_sum,
+  SUM(CAST(CASE WHEN goldstein IS NOT NULL THEN sign ELSE 0 END AS BIGINT)) AS goldstein_n,
+  CURRENT_TIMESTAMP AS last_updated
+FROM gdelt_changes_source
+GROUP BY event_date, source_actor_id;
+
+-- cameo metrics
+INSERT INTO daily_cameo_metrics_delta_sink
+SELECT
+  event_date,
+  cameo_id,
+  SUM(CAST(sign AS BIGINT)) AS row_count,
+  SUM(CAST(sign * num_events AS BIGINT)) AS total_events,
+  SUM(CAST(sign * num_articles AS BIGINT)) AS total_articles,
+  SUM(sign * goldstein) AS goldstein_sum,
+  SUM(CAST(CASE WHEN goldstein IS NOT NULL THEN sign ELSE 0 END AS BIGINT)) AS goldstein_n,
+  CURRENT_TIMESTAMP AS last_updated
+FROM gdelt_changes_source
+GROUP BY event_date, cameo_id;
+
+-- goldstein histogram (0.1-wide bins)
+INSERT INTO daily_goldstein_histogram_delta_sink
+SELECT
+  event_date,
+  quad_class,
+  CAST(ROUND(goldstein * 10, 0) AS SMALLINT) AS bin,
+  SUM(CAST(sign AS BIGINT)) AS n,
+  CURRENT_TIMESTAMP AS last_updated
+FROM gdelt_changes_source
+WHERE goldstein IS NOT NULL
+GROUP BY event_date, quad_class, CAST(ROUND(goldstein * 10, 0) AS SMALLINT);
+
+-- event density pyramid, one insert per zoom level (cell sizes in gcm/geogrid.py)
+INSERT INTO geo_grid_daily_delta_sink
+SELECT
+  CAST(0 AS SMALLINT) AS zoom,
+  event_date,
+  LEAST(CAST(FLOOR((action_geo_lat + 90) / 4.0) AS INT), 44) AS cell_y,
+  LEAST(CAST(FLOOR((action_geo_long + 180) / 4.0) AS INT), 89) AS cell_x,
+  SUM(CAST(sign AS BIGINT)) AS row_count,
+  SUM(CAST(sign * num_events AS BIGINT)) AS total_events,
+  SUM(CAST(CASE WHEN quad_class IN (3,4) THEN sign * num_events ELSE 0 END AS BIGINT)) AS conflict_events,
+  SUM(sign * goldstein) AS goldstein_sum,
+  SUM(CAST(CASE WHEN goldstein IS NOT NULL THEN sign ELSE 0 END AS BIGINT)) AS goldstein_n,
+  CURRENT_TIMESTAMP AS last_updated
+FROM gdelt_changes_source
+WHERE action_geo_lat BETWEEN -90 AND 90
+  AND action_geo_long BETWEEN -180 AND 180
+GROUP BY event_date, LEAST(CAST(FLOOR((action_geo_lat + 90) / 4.0) AS INT), 44), LEAST(CAST(FLOOR((action_geo_long + 180) / 4.0) AS INT), 89);
+
+INSERT INTO geo_grid_daily_delta_sink
+SELECT
+  CAST(1 AS SMALLINT) AS zoom,
+  event_date,
+  LEAST(CAST(FLOOR((action_geo_lat + 90) / 1.0) AS INT), 179) AS cell_y,
+  LEAST(CAST(FLOOR((action_geo_long + 180) / 1.0) AS INT), 359) AS cell_x,
+  SUM(CAST(sign AS BIGINT)) AS row_count,
+  SUM(CAST(sign * num_events AS BIGINT)) AS total_events,
+  SUM(CAST(CASE WHEN quad_class IN (3,4) THEN sign * num_events ELSE 0 END AS BIGINT)) AS conflict_events,
+  SUM(sign * goldstein) AS goldstein_sum,
+  SUM(CAST(CASE WHEN goldstein IS NOT NULL THEN sign ELSE 0 END AS BIGINT)) AS goldstein_n,
+  CURRENT_TIMESTAMP AS last_updated
+FROM gdelt_changes_source
+WHERE action_geo_lat BETWEEN -90 AND 90
+  AND action_geo_long BETWEEN -180 AND 180
+GROUP BY event_date, LEAST(CAST(FLOOR((action_geo_lat + 90) / 1.0) AS INT), 179), LEAST(CAST(FLOOR((action_geo_long + 180) / 1.0) AS INT), 359);
+
+INSERT INTO geo_grid_daily_delta_sink
+SELECT
+  CAST(2 AS SMALLINT) AS zoom,
+  event_date,
+  LEAST(CAST(FLOOR((action_geo_lat + 90) / 0.25) AS INT), 719) AS cell_y,
+  LEAST(CAST(FLOOR((action_geo_long + 180) / 0.25) AS INT), 1439) AS cell_x,
+  SUM(CAST(sign AS BIGINT)) AS row_count,
+  SUM(CAST(sign * num_events AS BIGINT)) AS total_events,
+  SUM(CAST(CASE WHEN quad_class IN (3,4) THEN sign * num_events ELSE 0 END AS BIGINT)) AS conflict_events,
+  SUM(sign * goldstein) AS goldstein_sum,
+  SUM(CAST(CASE WHEN goldstein IS NOT NULL THEN sign ELSE 0 END AS BIGINT)) AS goldstein_n,
+  CURRENT_TIMESTAMP AS last_updated
+FROM gdelt_changes_source
+WHERE action_geo_lat BETWEEN -90 AND 90
+  AND action_geo_long BETWEEN -180 AND 180
+GROUP BY event_date, LEAST(CAST(FLOOR((action_geo_lat + 90) / 0.25) AS INT), 719), LEAST(CAST(FLOOR((action_geo_long + 180) / 0.25) AS INT), 1439);
+
+END;
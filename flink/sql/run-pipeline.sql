@@ -6,6 +6,9 @@ CREATE TABLE IF NOT EXISTS gdelt_cdc_source (
     source_actor STRING,
     target_actor STRING,
     cameo_code STRING,
+    source_actor_id INT,
+    target_actor_id INT,
+    cameo_id SMALLINT,
     num_events INT,
     num_articles INT,
     quad_class INT,
@@ -46,6 +49,9 @@ CREATE TABLE IF NOT EXISTS daily_event_volume_by_quadclass_sink (
   total_events BIGINT,
   total_articles BIGINT,
   avg_goldstein DOUBLE,
+  row_count BIGINT,
+  goldstein_sum DOUBLE,
+  goldstein_n BIGINT,
   last_updated TIMESTAMP(3),
   PRIMARY KEY (event_date, quad_class) NOT ENFORCED
 ) WITH (
@@ -59,12 +65,15 @@ CREATE TABLE IF NOT EXISTS daily_event_volume_by_quadclass_sink (
 
 CREATE TABLE IF NOT EXISTS dyad_interactions_sink (
   event_date INT,
-  source_actor STRING,
-  target_actor STRING,
+  source_actor_id INT,
+  target_actor_id INT,
   total_events BIGINT,
   avg_goldstein DOUBLE,
+  row_count BIGINT,
+  goldstein_sum DOUBLE,
+  goldstein_n BIGINT,
   last_updated TIMESTAMP(3),
-  PRIMARY KEY (event_date, source_actor, target_actor) NOT ENFORCED
+  PRIMARY KEY (event_date, source_actor_id, target_actor_id) NOT ENFORCED
 ) WITH (
   'connector' = 'jdbc',
   'url' = 'jdbc:postgresql://postgres:5432/gdelt',
@@ -76,12 +85,16 @@ CREATE TABLE IF NOT EXISTS dyad_interactions_sink (
 
 CREATE TABLE IF NOT EXISTS top_actors_sink (
   event_date INT,
-  source_actor STRING,
+  source_actor_id INT,
   total_events BIGINT,
   total_articles BIGINT,
   avg_goldstein DOUBLE,
+  conflict_events BIGINT,
+  row_count BIGINT,
+  goldstein_sum DOUBLE,
+  goldstein_n BIGINT,
   last_updated TIMESTAMP(3),
-  PRIMARY KEY (event_date, source_actor) NOT ENFORCED
+  PRIMARY KEY (event_date, source_actor_id) NOT ENFORCED
 ) WITH (
   'connector' = 'jdbc',
   'url' = 'jdbc:postgresql://postgres:5432/gdelt',
@@ -93,12 +106,15 @@ CREATE TABLE IF NOT EXISTS top_actors_sink (
 
 CREATE TABLE IF NOT EXISTS daily_cameo_metrics_sink (
   event_date INT,
-  cameo_code STRING,
+  cameo_id SMALLINT,
   total_events BIGINT,
   total_articles BIGINT,
   avg_goldstein DOUBLE,
+  row_count BIGINT,
+  goldstein_sum DOUBLE,
+  goldstein_n BIGINT,
   last_updated TIMESTAMP(3),
-  PRIMARY KEY (event_date, cameo_code) NOT ENFORCED
+  PRIMARY KEY (event_date, cameo_id) NOT ENFORCED
 ) WITH (
   'connector' = 'jdbc',
   'url' = 'jdbc:postgresql://postgres:5432/gdelt',
@@ -108,6 +124,43 @@ CREATE TABLE IF NOT EXISTS daily_cameo_metrics_sink (
   'driver' = 'org.postgresql.Driver'
 );
 
+CREATE TABLE IF NOT EXISTS daily_goldstein_histogram_sink (
+  event_date INT,
+  quad_class INT,
+  bin SMALLINT,
+  n BIGINT,
+  last_updated TIMESTAMP(3),
+  PRIMARY KEY (event_date, quad_class, bin) NOT ENFORCED
+) WITH (
+  'connector' = 'jdbc',
+  'url' = 'jdbc:postgresql://postgres:5432/gdelt',
+  'table-name' = 'daily_goldstein_histogram',
+  'username' = 'flink_user',
+  'password' = 'flink_pass',
+  'driver' = 'org.postgresql.Driver'
+);
+
+CREATE TABLE IF NOT EXISTS geo_grid_daily_sink (
+  zoom SMALLINT,
+  event_date INT,
+  cell_y INT,
+  cell_x INT,
+  total_events BIGINT,
+  conflict_events BIGINT,
+  goldstein_sum DOUBLE,
+  goldstein_n BIGINT,
+  row_count BIGINT,
+  last_updated TIMESTAMP(3),
+  PRIMARY KEY (zoom, event_date, cell_y, cell_x) NOT ENFORCED
+) WITH (
+  'connector' = 'jdbc',
+  'url' = 'jdbc:postgresql://postgres:5432/gdelt',
+  'table-name' = 'geo_grid_daily',
+  'username' = 'flink_user',
+  'password' = 'flink_pass',
+  'driver' = 'org.postgresql.Driver'
+);
+
 
 -- 3) Streaming aggregations and inserts into sink tables
 
@@ -121,6 +174,9 @@ SELECT
   SUM(CAST(num_events AS BIGINT)) AS total_events,
   SUM(CAST(num_articles AS BIGINT)) AS total_articles,
   AVG(goldstein) AS avg_goldstein,
+  COUNT(*) AS row_count,
+  SUM(goldstein) AS goldstein_sum,
+  COUNT(goldstein) AS goldstein_n,
   CURRENT_TIMESTAMP AS last_updated
 FROM gdelt_cdc_source
 GROUP BY event_date, quad_class;
@@ -129,36 +185,110 @@ GROUP BY event_date, quad_class;
 INSERT INTO dyad_interactions_sink
 SELECT
   event_date,
-  source_actor,
-  target_actor,
+  source_actor_id,
+  target_actor_id,
   SUM(CAST(num_events AS BIGINT)) AS total_events,
   AVG(goldstein) AS avg_goldstein,
+  COUNT(*) AS row_count,
+  SUM(goldstein) AS goldstein_sum,
+  COUNT(goldstein) AS goldstein_n,
   CURRENT_TIMESTAMP AS last_updated
 FROM gdelt_cdc_source
-GROUP BY event_date, source_actor, target_actor;
+GROUP BY event_date, source_actor_id, target_actor_id;
 
 -- top actors
 INSERT INTO top_actors_sink
 SELECT
   event_date,
-  source_actor,
+  source_actor_id,
   SUM(CAST(num_events AS BIGINT)) AS total_events,
   SUM(CAST(num_articles AS BIGINT)) AS total_articles,
   AVG(goldstein) AS avg_goldstein,
+  SUM(CAST(CASE WHEN quad_class IN (3,4) THEN num_events ELSE 0 END AS BIGINT)) AS conflict_events,
+  COUNT(*) AS row_count,
+  SUM(goldstein) AS goldstein_sum,
+  COUNT(goldstein) AS goldstein_n,
   CURRENT_TIMESTAMP AS last_updated
 FROM gdelt_cdc_source
-GROUP BY event_date, source_actor;
+GROUP BY event_date, source_actor_id;
 
 -- cameo metrics
 INSERT INTO daily_cameo_metrics_sink
 SELECT
   event_date,
-  cameo_code,
+  cameo_id,
   SUM(CAST(num_events AS BIGINT)) AS total_events,
   SUM(CAST(num_articles AS BIGINT)) AS total_articles,
   AVG(goldstein) AS avg_goldstein,
+  COUNT(*) AS row_count,
+  SUM(goldstein) AS goldstein_sum,
+  COUNT(goldstein) AS goldstein_n,
+  CURRENT_TIMESTAMP AS last_updated
+FROM gdelt_cdc_source
+GROUP BY event_date, cameo_id;
+
+-- goldstein histogram (0.1-wide bins)
+INSERT INTO daily_goldstein_histogram_sink
+SELECT
+  event_date,
+  quad_class,
+  CAST(ROUND(goldstein * 10, 0) AS SMALLINT) AS bin,
+  COUNT(*) AS n,
+  CURRENT_TIMESTAMP AS last_updated
+FROM gdelt_cdc_source
+WHERE goldstein IS NOT NULL
+GROUP BY event_date, quad_class, CAST(ROUND(goldstein * 10, 0) AS SMALLINT);
+
+-- event density pyramid, one insert per zoom level (cell sizes in gcm/geogrid.py)
+INSERT INTO geo_grid_daily_sink
+SELECT
+  CAST(0 AS SMALLINT) AS zoom,
+  event_date,
+  LEAST(CAST(FLOOR((action_geo_lat + 90) / 4.0) AS INT), 44) AS cell_y,
+  LEAST(CAST(FLOOR((action_geo_long + 180) / 4.0) AS INT), 89) AS cell_x,
+  SUM(CAST(num_events AS BIGINT)) AS total_events,
+  SUM(CAST(CASE WHEN quad_class IN (3,4) THEN num_events ELSE 0 END AS BIGINT)) AS conflict_events,
+  SUM(goldstein) AS goldstein_sum,
+  COUNT(goldstein) AS goldstein_n,
+  COUNT(*) AS row_count,
+  CURRENT_TIMESTAMP AS last_updated
+FROM gdelt_cdc_source
+WHERE action_geo_lat BETWEEN -90 AND 90
+  AND action_geo_long BETWEEN -180 AND 180
+GROUP BY event_date, LEAST(CAST(FLOOR((action_geo_lat + 90) / 4.0) AS INT), 44), LEAST(CAST(FLOOR((action_geo_long + 180) / 4.0) AS INT), 89);
+
+INSERT INTO geo_grid_daily_sink
+SELECT
+  CAST(1 AS SMALLINT) AS zoom,
+  event_date,
+  LEAST(CAST(FLOOR((action_geo_lat + 90) / 1.0) AS INT), 179) AS cell_y,
+  LEAST(CAST(FLOOR((action_geo_long + 180) / 1.0) AS INT), 359) AS cell_x,
+  SUM(CAST(num_events AS BIGINT)) AS total_events,
+  SUM(CAST(CASE WHEN quad_class IN (3,4) THEN num_events ELSE 0 END AS BIGINT)) AS conflict_events,
+  SUM(goldstein) AS goldstein_sum,
+  COUNT(goldstein) AS goldstein_n,
+  COUNT(*) AS row_count,
+  CURRENT_TIMESTAMP AS last_updated
+FROM gdelt_cdc_source
+WHERE action_geo_lat BETWEEN -90 AND 90
+  AND action_geo_long BETWEEN -180 AND 180
+GROUP BY event_date, LEAST(CAST(FLOOR((action_geo_lat + 90) / 1.0) AS INT), 179), LEAST(CAST(FLOOR((action_geo_long + 180) / 1.0) AS INT), 359);
+
+INSERT INTO geo_grid_daily_sink
+SELECT
+  CAST(2 AS SMALLINT) AS zoom,
+  event_date,
+  LEAST(CAST(FLOOR((action_geo_lat + 90) / 0.25) AS INT), 719) AS cell_y,
+  LEAST(CAST(FLOOR((action_geo_long + 180) / 0.25) AS INT), 1439) AS cell_x,
+  SUM(CAST(num_events AS BIGINT)) AS total_events,
+  SUM(CAST(CASE WHEN quad_class IN (3,4) THEN num_events ELSE 0 END AS BIGINT)) AS conflict_events,
+  SUM(goldstein) AS goldstein_sum,
+  COUNT(goldstein) AS goldstein_n,
+  COUNT(*) AS row_count,
   CURRENT_TIMESTAMP AS last_updated
 FROM gdelt_cdc_source
-GROUP BY event_date, cameo_code;
+WHERE action_geo_lat BETWEEN -90 AND 90
+  AND action_geo_long BETWEEN -180 AND 180
+GROUP BY event_date, LEAST(CAST(FLOOR((action_geo_lat + 90) / 0.25) AS INT), 719), LEAST(CAST(FLOOR((action_geo_long + 180) / 0.25) AS INT), 1439);
 
 END;
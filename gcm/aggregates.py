@@ -0,0 +1,135 @@
+# the flink-maintained aggregates, restated as plain postgres over gdelt_events
+# so they can be checked (reconcile) or recomputed outside the pipeline
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+from gcm.geogrid import ZOOM_DEG
+
+
+@dataclass(frozen=True)
+class Aggregate:
+    table: str
+    keys: Tuple[str, ...]      # primary key of the results table
+    exact: Tuple[str, ...]     # integer columns, must match exactly
+    approx: Tuple[str, ...]    # double columns, accumulated in a different order by flink
+    raw: str                   # select over gdelt_events for event_date in %(lo)s..%(hi)s
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return self.keys + self.exact + self.approx
+
+
+RAW_RANGE = "event_date BETWEEN %(lo)s AND %(hi)s"
+
+# each select must agree with its INSERT in flink/sql/run-pipeline.sql
+# (and run-aggregations.sql, and the signed sums of run-deltas.sql). row_count
+# and the goldstein sum and count let the delta sinks apply changes (see
+# postgres/init/11-delta-sinks.sql); numeric round() rounds half away from zero
+# like flink's ROUND, double round() would round half to even
+_GEO_SELECT = """
+    SELECT CAST({zoom} AS SMALLINT) AS zoom, event_date,
+           LEAST(FLOOR((action_geo_lat + 90) / {deg})::int, {ymax}) AS cell_y,
+           LEAST(FLOOR((action_geo_long + 180) / {deg})::int, {xmax}) AS cell_x,
+           SUM(num_events::bigint) AS total_events,
+           SUM(CASE WHEN quad_class IN (3, 4) THEN num_events ELSE 0 END::bigint) AS conflict_events,
+           COUNT(*) AS row_count,
+           COUNT(goldstein) AS goldstein_n,
+           SUM(goldstein) AS goldstein_sum
+    FROM gdelt_events
+    WHERE """ + RAW_RANGE + """
+      AND action_geo_lat BETWEEN -90 AND 90
+      AND action_geo_long BETWEEN -180 AND 180
+    GROUP BY 2, 3, 4
+"""
+
+AGGREGATES: Dict[str, Aggregate] = {a.table: a for a in (
+    Aggregate(
+        "daily_event_volume_by_quadclass",
+        ("event_date", "quad_class"), ("total_events", "total_articles", "row_count", "goldstein_n"),
+        ("avg_goldstein", "goldstein_sum"),
+        """
+        SELECT event_date, quad_class,
+               SUM(num_events::bigint) AS total_events,
+               SUM(num_articles::bigint) AS total_articles,
+               AVG(goldstein) AS avg_goldstein,
+               COUNT(*) AS row_count,
+               SUM(goldstein) AS goldstein_sum,
+               COUNT(goldstein) AS goldstein_n
+        FROM gdelt_events
+        WHERE """ + RAW_RANGE + """
+        GROUP BY 1, 2
+        """,
+    ),
+    Aggregate(
+        "dyad_interactions",
+        ("event_date", "source_actor_id", "target_actor_id"), ("total_events", "row_count", "goldstein_n"),
+        ("avg_goldstein", "goldstein_sum"),
+        """
+        SELECT event_date, source_actor_id, target_actor_id,
+               SUM(num_events::bigint) AS total_events,
+               AVG(goldstein) AS avg_goldstein,
+               COUNT(*) AS row_count,
+               SUM(goldstein) AS goldstein_sum,
+               COUNT(goldstein) AS goldstein_n
+        FROM gdelt_events
+        WHERE """ + RAW_RANGE + """
+        GROUP BY 1, 2, 3
+        """,
+    ),
+    Aggregate(
+        "top_actors",
+        ("event_date", "source_actor_id"),
+        ("total_events", "total_articles", "conflict_events", "row_count", "goldstein_n"),
+        ("avg_goldstein", "goldstein_sum"),
+        """
+        SELECT event_date, source_actor_id,
+               SUM(num_events::bigint) AS total_events,
+               SUM(num_articles::bigint) AS total_articles,
+               SUM(CASE WHEN quad_class IN (3, 4) THEN num_events ELSE 0 END::bigint) AS conflict_events,
+               AVG(goldstein) AS avg_goldstein,
+               COUNT(*) AS row_count,
+               SUM(goldstein) AS goldstein_sum,
+               COUNT(goldstein) AS goldstein_n
+        FROM gdelt_events
+        WHERE """ + RAW_RANGE + """
+        GROUP BY 1, 2
+        """,
+    ),
+    Aggregate(
+        "daily_cameo_metrics",
+        ("event_date", "cameo_id"), ("total_events", "total_articles", "row_count", "goldstein_n"),
+        ("avg_goldstein", "goldstein_sum"),
+        """
+        SELECT event_date, cameo_id,
+               SUM(num_events::bigint) AS total_events,
+               SUM(num_articles::bigint) AS total_articles,
+               AVG(goldstein) AS avg_goldstein,
+               COUNT(*) AS row_count,
+               SUM(goldstein) AS goldstein_sum,
+               COUNT(goldstein) AS goldstein_n
+        FROM gdelt_events
+        WHERE """ + RAW_RANGE + """
+        GROUP BY 1, 2
+        """,
+    ),
+    Aggregate(
+        "daily_goldstein_histogram",
+        ("event_date", "quad_class", "bin"), ("n",), (),
+        """
+        SELECT event_date, quad_class, round((goldstein * 10)::numeric)::smallint AS bin, COUNT(*) AS n
+        FROM gdelt_events
+        WHERE """ + RAW_RANGE + """
+          AND goldstein IS NOT NULL
+        GROUP BY 1, 2, 3
+        """,
+    ),
+    Aggregate(
+        "geo_grid_daily",
+        ("zoom", "event_date", "cell_y", "cell_x"), ("total_events", "conflict_events", "row_count", "goldstein_n"),
+        ("goldstein_sum",),
+        " UNION ALL ".join(
+            _GEO_SELECT.format(zoom=z, deg=repr(deg), ymax=int(round(180 / deg)) - 1, xmax=int(round(360 / deg)) - 1)
+            for z, deg in enumerate(ZOOM_DEG)
+        ),
+    ),
+)}
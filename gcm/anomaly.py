@@ -0,0 +1,230 @@
+# online ewma detector for spikes in per-country daily conflict rates
+import os
+import math
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from gcm import data as gcm_data
+
+
+# smoothing factor of the baseline (~ 1 / window in days)
+ALPHA = float(os.getenv("ANOMALY_ALPHA", "0.1"))
+Z_THRESHOLD = float(os.getenv("ANOMALY_Z", "3.0"))
+# days folded before a series is scored, and events a day needs to count
+WARMUP_DAYS = int(os.getenv("ANOMALY_WARMUP_DAYS", "14"))
+MIN_EVENTS = int(os.getenv("ANOMALY_MIN_EVENTS", "20"))
+# floor on the baseline std so a flat history doesn't flag every wobble
+MIN_STD = float(os.getenv("ANOMALY_MIN_STD", "0.02"))
+# queue entries drained per transaction
+BATCH_SIZE = int(os.getenv("ANOMALY_BATCH", "5000"))
+
+ALL_EVENTS = 0  # series id of the quad-class totals
+
+
+@dataclass
+class EwmaState:
+    mean: float = 0.0
+    var: float = 0.0
+    n: int = 0
+    pending_day: Optional[int] = None
+    pending_rate: Optional[float] = None
+
+    def fold(self, x: float):
+        # incremental ewma mean / variance, O(1)
+        if self.n == 0:
+            self.mean, self.var = x, 0.0
+        else:
+            diff = x - self.mean
+            incr = ALPHA * diff
+            self.mean += incr
+            self.var = (1 - ALPHA) * (self.var + diff * incr)
+        self.n += 1
+
+    def std(self) -> float:
+        return max(math.sqrt(self.var), MIN_STD)
+
+    def z(self, x: float) -> Optional[float]:
+        if self.n < WARMUP_DAYS:
+            return None
+        return (x - self.mean) / self.std()
+
+
+def observe(state: EwmaState, day: int, total: int, conflict: int) -> Optional[float]:
+    # one changed (series, day) value -> z-score against the baseline, or None if
+    # not scored. the newest day is still being revised, so it is only folded
+    # into the baseline once a later day shows up; older days are late revisions
+    # and are scored without touching the baseline
+    rate = conflict / total if total >= MIN_EVENTS else None
+    if state.pending_day is None or day > state.pending_day:
+        if state.pending_rate is not None:
+            state.fold(state.pending_rate)
+        state.pending_day, state.pending_rate = day, rate
+    elif day == state.pending_day:
+        state.pending_rate = rate
+    return None if rate is None else state.z(rate)
+
+
+DRAIN_SQL = """
+    DELETE FROM anomaly_queue
+    WHERE id IN (SELECT id FROM anomaly_queue ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED)
+    RETURNING id, source_actor_id, event_date;
+"""
+
+ACTOR_VALUES_SQL = """
+    SELECT t.source_actor_id, t.event_date, t.total_events, t.conflict_events
+    FROM top_actors t
+    JOIN unnest(%s::int[], %s::int[]) AS k(a, d) ON t.source_actor_id = k.a AND t.event_date = k.d;
+"""
+
+TOTAL_VALUES_SQL = """
+    SELECT 0, event_date,
+           SUM(total_events),
+           SUM(CASE WHEN quad_class IN (3,4) THEN total_events ELSE 0 END)
+    FROM daily_event_volume_by_quadclass
+    WHERE event_date = ANY(%s)
+    GROUP BY event_date;
+"""
+
+STATE_SQL = """
+    SELECT source_actor_id, mean, var, n, pending_day, pending_rate
+    FROM anomaly_state WHERE source_actor_id = ANY(%s);
+"""
+
+SAVE_STATE_SQL = """
+    INSERT INTO anomaly_state (source_actor_id, mean, var, n, pending_day, pending_rate, updated_at)
+    VALUES %s
+    ON CONFLICT (source_actor_id) DO UPDATE SET
+      mean = EXCLUDED.mean, var = EXCLUDED.var, n = EXCLUDED.n,
+      pending_day = EXCLUDED.pending_day, pending_rate = EXCLUDED.pending_rate,
+      updated_at = EXCLUDED.updated_at;
+"""
+
+SAVE_ALERTS_SQL = """
+    INSERT INTO conflict_alerts
+      (source_actor_id, event_date, conflict_rate, baseline_rate, baseline_std, z_score,
+       total_events, conflict_events)
+    VALUES %s
+    ON CONFLICT (source_actor_id, event_date) DO UPDATE SET
+      conflict_rate = EXCLUDED.conflict_rate, baseline_rate = EXCLUDED.baseline_rate,
+      baseline_std = EXCLUDED.baseline_std, z_score = EXCLUDED.z_score,
+      total_events = EXCLUDED.total_events, conflict_events = EXCLUDED.conflict_events,
+      detected_at = now();
+"""
+
+CLEAR_ALERTS_SQL = """
+    DELETE FROM conflict_alerts a
+    USING unnest(%s::int[], %s::int[]) AS k(a, d)
+    WHERE a.source_actor_id = k.a AND a.event_date = k.d;
+"""
+
+
+def process_batch(conn, limit: int = BATCH_SIZE) -> Dict[str, int]:
+    # drain up to limit queued changes and score them, all in one transaction:
+    # a failure puts the queue entries back
+    with conn.cursor() as cur:
+        cur.execute(DRAIN_SQL, (limit,))
+        queued = sorted(cur.fetchall())
+        keys: List[Tuple[int, int]] = list(dict.fromkeys((a, d) for _, a, d in queued))
+        if not keys:
+            conn.commit()
+            return {"queued": 0, "scored": 0, "alerts": 0, "cleared": 0}
+
+        actor_keys = [k for k in keys if k[0] != ALL_EVENTS]
+        total_days = [d for a, d in keys if a == ALL_EVENTS]
+        values: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        if actor_keys:
+            cur.execute(ACTOR_VALUES_SQL, ([a for a, _ in actor_keys], [d for _, d in actor_keys]))
+            values.update({(a, d): (int(t), int(c)) for a, d, t, c in cur.fetchall()})
+        if total_days:
+            cur.execute(TOTAL_VALUES_SQL, (total_days,))
+            values.update({(a, d): (int(t), int(c)) for a, d, t, c in cur.fetchall()})
+
+        series = sorted({a for a, _ in keys})
+        cur.execute(STATE_SQL, (series,))
+        states = {r[0]: EwmaState(*r[1:]) for r in cur.fetchall()}
+
+        alerts, cleared, scored = [], [], 0
+        # per series in day order, so the baseline only moves forward
+        for a, d in sorted(values):
+            total, conflict = values[(a, d)]
+            st = states.setdefault(a, EwmaState())
+            z = observe(st, d, total, conflict)
+            if z is None:
+                cleared.append((a, d))
+                continue
+            scored += 1
+            if z >= Z_THRESHOLD:
+                alerts.append((a, d, conflict / total, st.mean, st.std(), z, total, conflict))
+            else:
+                cleared.append((a, d))
+
+        execute_values(cur, SAVE_STATE_SQL, [
+            (a, s.mean, s.var, s.n, s.pending_day, s.pending_rate) for a, s in states.items()
+        ], template="(%s, %s, %s, %s, %s, %s, now())")
+        if cleared:
+            cur.execute(CLEAR_ALERTS_SQL, ([a for a, _ in cleared], [d for _, d in cleared]))
+            n_cleared = cur.rowcount
+        else:
+            n_cleared = 0
+        if alerts:
+            execute_values(cur, SAVE_ALERTS_SQL, alerts)
+        if alerts or n_cleared:
+            days = [d for _, d, *_ in alerts] + [d for _, d in cleared]
+            cur.execute("SELECT notify_coalesced('conflict_alerts', %s::int[]);", (sorted(set(days)),))
+    conn.commit()
+    return {"queued": len(queued), "scored": scored, "alerts": len(alerts), "cleared": n_cleared}
+
+
+BACKFILL_SQL = """
+    INSERT INTO anomaly_queue (source_actor_id, event_date)
+    SELECT source_actor_id, event_date FROM (
+      SELECT t.source_actor_id, t.event_date
+      FROM top_actors t
+      WHERE t.source_actor_id IN (SELECT actor_id FROM actor_dim WHERE is_iso3)
+      UNION ALL
+      SELECT DISTINCT 0, event_date FROM daily_event_volume_by_quadclass
+    ) k
+    ORDER BY event_date, source_actor_id;
+"""
+
+
+def reset(conn, backfill: bool = True) -> int:
+    # forget every baseline and alert; with backfill, queue the full history
+    # in day order so the next drains replay it
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM anomaly_queue;")
+        cur.execute("DELETE FROM anomaly_state;")
+        cur.execute("DELETE FROM conflict_alerts;")
+        n = 0
+        if backfill:
+            cur.execute(BACKFILL_SQL)
+            n = cur.rowcount
+    conn.commit()
+    return n
+
+
+ALERTS_SQL = """
+    SELECT
+      a.event_date,
+      COALESCE(d.actor_code, 'ALL') AS actor,
+      a.z_score,
+      a.conflict_rate,
+      a.baseline_rate,
+      a.baseline_std,
+      a.total_events,
+      a.conflict_events,
+      a.detected_at
+    FROM conflict_alerts a
+    LEFT JOIN actor_dim d ON d.actor_id = a.source_actor_id
+    WHERE a.event_date BETWEEN %(s)s AND %(e)s
+    ORDER BY a.event_date DESC, a.z_score DESC
+    LIMIT %(n)s;
+"""
+
+
+def load_alerts(start_i: int, end_i: int, limit: int = 1000,
+                query: Callable[..., pd.DataFrame] = gcm_data.qdf) -> pd.DataFrame:
+    return query(ALERTS_SQL, {"s": start_i, "e": end_i, "n": limit}, label="alerts")
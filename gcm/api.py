@@ -0,0 +1,304 @@
+# read-only json api over the dashboard frames, with etags from table change versions
+import os
+import json
+import gzip
+import hashlib
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from gcm import db, downsample, export
+from gcm import data as gcm_data
+from gcm.notify import DebouncedListener
+from gcm.resultcache import ResultCache
+
+
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8600"))
+# requests one endpoint serves at once, and how long an extra one waits for a slot
+API_CONCURRENCY = int(os.getenv("API_CONCURRENCY", "4"))
+API_QUEUE_SECONDS = float(os.getenv("API_QUEUE_SECONDS", "2.0"))
+# bodies smaller than this are not worth compressing
+GZIP_MIN_BYTES = 1024
+# csv.gz exports streamed at once; each holds its own connection for the whole export
+API_EXPORT_CONCURRENCY = int(os.getenv("API_EXPORT_CONCURRENCY", "2"))
+
+# api clients poll, so versions follow notifications more closely than the dashboard
+API_NOTIFY_MIN_DELAY = float(os.getenv("API_NOTIFY_MIN_DELAY_S", "0.2"))
+API_NOTIFY_MAX_DELAY = float(os.getenv("API_NOTIFY_MAX_DELAY_S", "1.0"))
+
+# frame -> the table_versions rows it depends on
+FRAME_TABLES: Dict[str, Tuple[str, ...]] = {
+    "kpis": ("daily_event_volume_by_quadclass",),
+    "trend": ("daily_event_volume_by_quadclass",),
+    "actors": ("top_actors",),
+    "dyads": ("dyad_interactions",),
+    "cameo": ("daily_cameo_metrics",),
+    "distinct": ("distinct_sketches",),
+    "quad_dist": ("daily_event_volume_by_quadclass",),
+    "quad_time": ("daily_event_volume_by_quadclass",),
+    "goldstein_bands": ("daily_goldstein_histogram",),
+    "rolling": ("rolling_metrics",),
+}
+META_TABLES = ("daily_event_volume_by_quadclass",)
+
+
+class TableVersions:
+    # change counters from table_versions (09-table-versions.sql), re-read when
+    # the debounced view_updated listener fires. they live in the database, so
+    # etags survive restarts; while the listener is down every lookup reads them
+    def __init__(self, query: Callable[..., pd.DataFrame]):
+        self.query = query
+        self.reloads = 0
+        self._v: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.listener = DebouncedListener(on_fire=lambda tables: self._load(),
+                                          min_delay=API_NOTIFY_MIN_DELAY, max_delay=API_NOTIFY_MAX_DELAY)
+
+    def _load(self):
+        v = gcm_data.load_versions(query=self.query)
+        with self._lock:
+            self._v = v
+            self.reloads += 1
+
+    def get(self, tables: Tuple[str, ...]) -> Tuple[int, ...]:
+        if not self.listener.connected:
+            self._load()
+        with self._lock:
+            return tuple(self._v.get(t, 0) for t in tables)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"reloads": self.reloads, "tables": dict(self._v), "listener": self.listener.stats()}
+
+
+def etag(*parts: Any) -> str:
+    # weak: the same representation is served gzipped or not
+    return 'W/"' + hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def frame_body(name: str, params: Dict[str, Any], df: pd.DataFrame) -> bytes:
+    head = json.dumps({"frame": name, "start": params["s"], "end": params["e"],
+                       "bucket_days": df.attrs.get("bucket_days"), "rows": len(df)})
+    records = df.to_json(orient="records", date_format="iso", double_precision=6)
+    return (head[:-1] + ', "data": ' + records + "}").encode("utf-8")
+
+
+class Busy(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    pass
+
+
+class API:
+    def __init__(self, adb: Optional[db.AsyncDB] = None, versions: Optional[TableVersions] = None,
+                 cache: Optional[ResultCache] = None, concurrency: int = API_CONCURRENCY):
+        self.adb = adb or db.AsyncDB()
+        self.versions = versions or TableVersions(self._query)
+        self.cache = cache or ResultCache()
+        self.limits = {name: threading.BoundedSemaphore(concurrency) for name in list(FRAME_TABLES) + ["meta"]}
+        self.limits["export"] = threading.BoundedSemaphore(API_EXPORT_CONCURRENCY)
+        self.rejected: Dict[str, int] = defaultdict(int)
+        self.not_modified = 0  # handler threads share it; approximate
+
+    def _query(self, sql: str, params: Optional[Dict[str, Any]] = None, label: str = "adhoc") -> pd.DataFrame:
+        return self.adb.call(gcm_data.aqdf(self.adb, sql, params, label, prepared=label))
+
+    def _limited(self, endpoint: str, build):
+        sem = self.limits[endpoint]
+        if not sem.acquire(timeout=API_QUEUE_SECONDS):
+            self.rejected[endpoint] += 1
+            raise Busy(endpoint)
+        try:
+            return build()
+        finally:
+            sem.release()
+
+    def _bodies(self, key: Tuple, endpoint: str, build) -> Callable[[], Dict[str, bytes]]:
+        # json + gzip bytes, cached under the versions they were built at. lazy,
+        # so a matching If-None-Match never touches the cache or the database
+        def load():
+            body = self._limited(endpoint, build)
+            return {"json": body, "gzip": gzip.compress(body, 6, mtime=0) if len(body) >= GZIP_MIN_BYTES else None}
+        return lambda: self.cache.get_or_load(key, load)[0]
+
+    def meta(self) -> Tuple[str, Callable[[], Dict[str, bytes]]]:
+        v = self.versions.get(META_TABLES)
+        tag = etag("meta", v)
+        return tag, self._bodies(("meta", tag), "meta", self._meta_body)
+
+    def _meta_body(self) -> bytes:
+        m = gcm_data.load_meta(self._query)
+        row = {k: (None if pd.isna(m.loc[0, k]) else int(m.loc[0, k])) for k in m.columns} if not m.empty else {}
+        return json.dumps({"frame": "meta", **row, "frames": list(FRAME_TABLES)}).encode("utf-8")
+
+    def date_range(self, q: Dict[str, List[str]]) -> Tuple[int, int]:
+        try:
+            start = int(q["start"][0]) if "start" in q else None
+            end = int(q["end"][0]) if "end" in q else None
+        except ValueError:
+            raise BadRequest("start / end must be yyyymmdd integers")
+        if start is None or end is None:
+            _, bodies = self.meta()
+            m = json.loads(bodies()["json"])
+            start = start if start is not None else m.get("min_event_date")
+            end = end if end is not None else m.get("max_event_date")
+            if start is None or end is None:
+                raise BadRequest("no data yet; pass start and end")
+        if start > end:
+            raise BadRequest("start must not be after end")
+        return start, end
+
+    def frame(self, name: str, q: Dict[str, List[str]]) -> Tuple[str, Callable[[], Dict[str, bytes]]]:
+        start, end = self.date_range(q)
+        try:
+            topn = min(max(int(q.get("top", ["20"])[0]), 1), 250)
+            points = min(max(int(q.get("points", [str(downsample.MAX_POINTS)])[0]), 10), downsample.MAX_POINTS)
+        except ValueError:
+            raise BadRequest("top / points must be integers")
+        try:
+            params = gcm_data.frame_params(name, start, end, topn, points)
+        except ValueError:
+            raise BadRequest("start / end must be valid yyyymmdd dates")
+        v = self.versions.get(FRAME_TABLES[name])
+        tag = etag(name, v, sorted((k, repr(x)) for k, x in params.items()))
+
+        def build() -> bytes:
+            df = self._query(gcm_data.QUERIES[name], params, name)
+            return frame_body(name, params, gcm_data.finish_frame(name, df, params, points))
+
+        return tag, self._bodies((name, tag), name, build)
+
+    def export(self, name: str, q: Dict[str, List[str]], begin: Callable[[str], None],
+               write: Callable[[bytes], Any]) -> None:
+        # csv.gz of gcm.export.EXPORTS straight from a server-side cursor
+        # (iter_csv_gz), on a connection of its own: a long export holds no
+        # pool slot and isn't cut off by the pool's statement timeout. headers
+        # go out with the first chunk, so a failing query still gets a 500
+        if name not in export.EXPORTS:
+            raise BadRequest(f"unknown export; one of {', '.join(export.EXPORTS)}")
+        start, end = self.date_range(q)
+
+        def stream():
+            conn = db.connect()
+            try:
+                chunks = export.iter_csv_gz(conn, name, start, end)
+                first = next(chunks)
+                begin(os.path.basename(export.export_path(name, "csv.gz", start, end)))
+                write(first)
+                for chunk in chunks:
+                    write(chunk)
+                conn.rollback()
+            finally:
+                conn.close()
+
+        self._limited("export", stream)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "versions": self.versions.snapshot(),
+            "cache": self.cache.stats(),
+            "db": self.adb.stats(),
+            "not_modified": self.not_modified,
+            "rejected": dict(self.rejected),
+        }
+
+
+class Handler(BaseHTTPRequestHandler):
+    api: API = None  # set by serve()
+    server_version = "gcm-api/1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", tag: Optional[str] = None,
+              gz: Optional[bytes] = None, extra: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if tag:
+            self.send_header("ETag", tag)
+        if status == 304:
+            self.end_headers()
+            return
+        self.send_header("Content-Type", "application/json")
+        for k, v in (extra or {}).items():
+            self.send_header(k, v)
+        if gz is not None and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gz
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _error(self, status: int, msg: str, extra: Optional[Dict[str, str]] = None):
+        self._send(status, json.dumps({"error": msg}).encode("utf-8"), extra=extra)
+
+    def _export(self, name: str, q: Dict[str, List[str]]):
+        # no length up front: the body ends when the connection closes
+        started = []
+
+        def begin(filename: str):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/gzip")
+            self.send_header("Content-Disposition", f'attachment; filename="{filename}"')
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.close_connection = True
+            started.append(filename)
+
+        if self.command == "HEAD":
+            return self._error(405, "HEAD not supported for exports", extra={"Allow": "GET"})
+        try:
+            self.api.export(name, q, begin, self.wfile.write)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception:
+            # mid-stream the status is gone; a cut gzip stream fails to unpack
+            if not started:
+                raise
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        q = parse_qs(url.query)
+        try:
+            if parts == ["health"]:
+                return self._send(200, json.dumps(self.api.stats()).encode("utf-8"))
+            if len(parts) == 3 and parts[:2] == ["v1", "export"]:
+                return self._export(parts[2], q)
+            if parts == ["v1", "meta"]:
+                tag, bodies = self.api.meta()
+            elif len(parts) == 2 and parts[0] == "v1" and parts[1] in FRAME_TABLES:
+                tag, bodies = self.api.frame(parts[1], q)
+            else:
+                return self._error(404, "unknown endpoint; see /v1/meta for frames")
+            inm = self.headers.get("If-None-Match")
+            if inm and tag in [t.strip() for t in inm.split(",")]:
+                self.api.not_modified += 1
+                return self._send(304, tag=tag)
+            out = bodies()
+        except BadRequest as e:
+            return self._error(400, str(e))
+        except Busy:
+            return self._error(503, "endpoint busy, retry shortly", extra={"Retry-After": "1"})
+        except Exception as e:
+            return self._error(500, f"{type(e).__name__}: {e}")
+        self._send(200, out["json"], tag=tag, gz=out["gzip"])
+
+
+def serve(host: str = API_HOST, port: int = API_PORT, api: Optional[API] = None) -> ThreadingHTTPServer:
+    Handler.api = api or API()
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    return httpd
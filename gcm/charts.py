@@ -0,0 +1,298 @@
+# plotly figure builders for the dashboard
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+QUAD_LABELS = {
+    1: "Q1 Verbal Coop",
+    2: "Q2 Material Coop",
+    3: "Q3 Verbal Conflict",
+    4: "Q4 Material Conflict"
+}
+
+QUAD_COLORS = {
+    "Q1 Verbal Coop": "#22c55e",
+    "Q2 Material Coop": "#3b82f6",
+    "Q3 Verbal Conflict": "#f59e0b",
+    "Q4 Material Conflict": "#ef4444"
+}
+
+
+def events_axis_title(df: pd.DataFrame) -> str:
+    # set by gcm.data.finish_frame when the series was bucketed
+    b = df.attrs.get("bucket_days", 1)
+    return "Events" if b <= 1 else f"Events / day ({b}-day avg)"
+
+
+def build_map(actors: pd.DataFrame, map_metric: str) -> go.Figure:
+    if map_metric == "Avg Goldstein":
+        fig_map = px.choropleth(
+            actors,
+            locations="iso3",
+            locationmode="ISO-3",
+            color="mean_goldstein",
+            hover_name="iso3",
+            hover_data={"total_events": ":,", "mean_goldstein": ":.2f", "iso3": False},
+            color_continuous_scale="RdBu_r",
+            color_continuous_midpoint=0,
+            template="plotly_dark",
+        )
+    else:
+        fig_map = px.choropleth(
+            actors,
+            locations="iso3",
+            locationmode="ISO-3",
+            color="total_events",
+            hover_name="iso3",
+            hover_data={"total_events": ":,", "mean_goldstein": ":.2f", "iso3": False},
+            color_continuous_scale="Viridis",
+            template="plotly_dark",
+        )
+
+    fig_map.update_layout(
+        height=350,
+        margin=dict(l=0, r=0, t=0, b=0),
+        paper_bgcolor="rgba(0,0,0,0)",
+        geo=dict(
+            bgcolor="rgba(0,0,0,0)",
+            landcolor="rgba(30,41,59,0.55)",
+            showcountries=True,
+            countrycolor="rgba(148,163,184,0.22)",
+            showframe=False,
+            projection_type="natural earth",
+        ),
+    )
+    return fig_map
+
+
+def build_density(grid: pd.DataFrame, map_metric: str) -> go.Figure:
+    # one square marker per grid cell (gcm.geogrid); size tracks the cell size
+    zoom = grid.attrs.get("zoom", 1)
+    size = (9, 5, 3)[min(zoom, 2)]
+    if map_metric == "Avg Goldstein":
+        color = grid["mean_goldstein"]
+        marker = dict(colorscale="RdBu_r", cmid=0, colorbar=dict(title="Goldstein"))
+    else:
+        # log scale so a few hotspots don't flatten everything else
+        color = np.log10(grid["total_events"].astype("float64").clip(lower=1))
+        marker = dict(colorscale="Viridis", colorbar=dict(title="log10 events"))
+
+    fig = go.Figure(go.Scattergeo(
+        lat=grid["lat"], lon=grid["lon"],
+        mode="markers",
+        marker=dict(size=size, symbol="square", color=color, opacity=0.85, line=dict(width=0), **marker),
+        customdata=grid[["total_events", "conflict_events", "mean_goldstein"]],
+        hovertemplate=(
+            "%{lat:.2f}, %{lon:.2f}<br>events %{customdata[0]:,}<br>"
+            "conflict %{customdata[1]:,}<br>goldstein %{customdata[2]:.2f}<extra></extra>"
+        ),
+    ))
+    fig.update_layout(
+        template="plotly_dark",
+        height=450,
+        margin=dict(l=0, r=0, t=0, b=0),
+        paper_bgcolor="rgba(0,0,0,0)",
+        geo=dict(
+            bgcolor="rgba(0,0,0,0)",
+            landcolor="rgba(30,41,59,0.55)",
+            showcountries=True,
+            countrycolor="rgba(148,163,184,0.22)",
+            showframe=False,
+            projection_type="natural earth",
+        ),
+    )
+    return fig
+
+
+def build_trend(trend: pd.DataFrame, bands: Optional[pd.DataFrame] = None) -> go.Figure:
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=trend["event_day"], y=trend["total_events"],
+        mode="lines", name="Total",
+        fill="tozeroy"
+    ))
+    fig.add_trace(go.Scatter(
+        x=trend["event_day"], y=trend["conflict_events"],
+        mode="lines", name="Conflict"
+    ))
+    fig.add_trace(go.Scatter(
+        x=trend["event_day"], y=trend["mean_goldstein"],
+        mode="lines", name="Goldstein",
+        line=dict(dash="dot"),
+        yaxis="y2"
+    ))
+    if bands is not None and not bands.empty:
+        # p10-p90 envelope (filled to the p90 trace) plus the median
+        fig.add_trace(go.Scatter(
+            x=bands["event_day"], y=bands["p90_goldstein"],
+            mode="lines", name="Goldstein p90",
+            line=dict(width=0), showlegend=False,
+            yaxis="y2"
+        ))
+        fig.add_trace(go.Scatter(
+            x=bands["event_day"], y=bands["p10_goldstein"],
+            mode="lines", name="Goldstein p10-p90",
+            line=dict(width=0), fill="tonexty",
+            fillcolor="rgba(171,99,250,0.18)",
+            yaxis="y2"
+        ))
+        fig.add_trace(go.Scatter(
+            x=bands["event_day"], y=bands["median_goldstein"],
+            mode="lines", name="Goldstein median",
+            line=dict(width=1),
+            yaxis="y2"
+        ))
+
+    fig.update_layout(
+        template="plotly_dark",
+        height=350,
+        margin=dict(l=16, r=16, t=10, b=10),
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        hovermode="x unified",
+        legend=dict(orientation="h", y=1.12),
+        yaxis=dict(title=events_axis_title(trend)),
+        yaxis2=dict(title="Goldstein", overlaying="y", side="right"),
+    )
+    return fig
+
+
+def heatmap_actors(dyads: pd.DataFrame, k: int = 12) -> List[str]:
+    return pd.concat([dyads["source_actor"], dyads["target_actor"]]).value_counts().head(k).index.tolist()
+
+
+def dyad_pivot(dyads: pd.DataFrame) -> pd.DataFrame:
+    # empty frame means not enough overlap between the top actors
+    top_actors_list = heatmap_actors(dyads)
+    hm = dyads[dyads["source_actor"].isin(top_actors_list) & dyads["target_actor"].isin(top_actors_list)]
+    if hm.empty:
+        return pd.DataFrame()
+    return hm.pivot_table(index="source_actor", columns="target_actor", values="total_events", aggfunc="sum", fill_value=0)
+
+
+def build_heatmap(pivot: pd.DataFrame) -> go.Figure:
+    fig_hm = go.Figure(data=go.Heatmap(
+        z=pivot.values, x=pivot.columns, y=pivot.index,
+        colorscale="Plasma",
+        hovertemplate="From %{y} → %{x}<br>Events: %{z:,}<extra></extra>",
+        colorbar=dict(title="Events")
+    ))
+    fig_hm.update_layout(
+        template="plotly_dark", height=380,
+        margin=dict(l=16, r=16, t=10, b=10),
+        paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
+    )
+    return fig_hm
+
+
+def build_quad_bar(quad_dist: pd.DataFrame) -> go.Figure:
+    # labels go in as a series, no copy of the frame
+    labels = quad_dist["quad_class"].map(QUAD_LABELS).fillna(quad_dist["quad_class"].astype(str))
+
+    fig_qd = px.bar(
+        quad_dist, x=labels, y="total_events",
+        template="plotly_dark",
+        hover_data={"total_events": ":,", "avg_goldstein": ":.2f"},
+    )
+    fig_qd.update_layout(
+        height=380,
+        margin=dict(l=16, r=16, t=10, b=10),
+        paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
+        xaxis_title="", yaxis_title="Events",
+    )
+    return fig_qd
+
+
+def build_quad_area(quad_time: pd.DataFrame) -> go.Figure:
+    labels = quad_time["quad_class"].map(QUAD_LABELS).fillna("Q" + quad_time["quad_class"].astype(str))
+
+    fig_area = px.area(
+        quad_time,
+        x="event_day",
+        y="total_events",
+        color=labels,
+        template="plotly_dark",
+        color_discrete_map=QUAD_COLORS
+    )
+    fig_area.update_layout(
+        height=380,
+        margin=dict(l=16, r=16, t=10, b=30),
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        xaxis=dict(title="", tickangle=-35),
+        yaxis=dict(title=events_axis_title(quad_time)),
+        legend=dict(title="", orientation="h", y=1.12),
+        hovermode="x unified"
+    )
+    return fig_area
+
+
+def build_rolling(rolling: pd.DataFrame) -> go.Figure:
+    # conflict share (q3 + q4 events) over trailing 7 / 30-day windows
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=rolling["event_day"], y=rolling["conflict_share_7d"] * 100,
+        mode="lines", name="Conflict % (7d)",
+        line=dict(width=1)
+    ))
+    fig.add_trace(go.Scatter(
+        x=rolling["event_day"], y=rolling["conflict_share_30d"] * 100,
+        mode="lines", name="Conflict % (30d)",
+        line=dict(width=2.5)
+    ))
+    fig.add_trace(go.Scatter(
+        x=rolling["event_day"], y=rolling["goldstein_30d"],
+        mode="lines", name="Goldstein (30d)",
+        line=dict(dash="dot"),
+        yaxis="y2"
+    ))
+    fig.update_layout(
+        template="plotly_dark",
+        height=320,
+        margin=dict(l=16, r=16, t=10, b=10),
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        hovermode="x unified",
+        legend=dict(orientation="h", y=1.12),
+        yaxis=dict(title="Conflict share (%)"),
+        yaxis2=dict(title="Goldstein", overlaying="y", side="right"),
+    )
+    return fig
+
+
+def build_alerts(alerts: pd.DataFrame) -> go.Figure:
+    days = pd.to_datetime(alerts["event_date"].astype(str), format="%Y%m%d")
+    fig = px.scatter(
+        alerts, x=days, y="z_score", color="actor",
+        size=alerts["total_events"].astype("float64"),
+        hover_data={"conflict_rate": ":.1%", "baseline_rate": ":.1%", "total_events": ":,"},
+        template="plotly_dark",
+    )
+    fig.update_layout(
+        height=320,
+        margin=dict(l=16, r=16, t=10, b=10),
+        paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
+        xaxis_title="", yaxis_title="z-score",
+        legend=dict(title="", orientation="h", y=1.12),
+    )
+    return fig
+
+
+def build_cameo_bar(cameo: pd.DataFrame, top_n: int) -> go.Figure:
+    fig_bar = px.bar(
+        cameo.sort_values("total_events", ascending=True).tail(top_n),
+        x="total_events", y="cameo_code", orientation="h",
+        template="plotly_dark",
+        hover_data={"total_events": ":,", "mean_goldstein": ":.2f"},
+    )
+    fig_bar.update_layout(
+        height=420,
+        margin=dict(l=16, r=16, t=10, b=10),
+        paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
+        xaxis_title="Events", yaxis_title="",
+    )
+    return fig_bar
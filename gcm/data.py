@@ -0,0 +1,455 @@
+# data layer shared by the dashboard and the scripts
+import os
+import time
+import uuid
+import asyncio
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Optional, Dict, Any, Callable, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from gcm import db, tracing, downsample
+
+
+# rows per round trip from the server-side cursor
+FETCH_ROWS = int(os.getenv("FETCH_ROWS", "5000"))
+
+
+def get_db_conn():
+    return db.connect()
+
+
+def read_frame(conn, sql: str, params: Optional[Dict[str, Any]] = None,
+               fetch_rows: int = FETCH_ROWS, prepared: Optional[str] = None) -> pd.DataFrame:
+    # named cursor = server-side; rows arrive in batches and are split into
+    # per-column lists, so no full list of row tuples is ever held. prepared
+    # statements can't back a named cursor (DECLARE takes no EXECUTE), so they
+    # go through a plain one: only for the fixed, bounded dashboard queries
+    cursor = conn.cursor() if prepared else conn.cursor(name=f"gcm_{uuid.uuid4().hex[:8]}")
+    with cursor as cur:
+        cur.itersize = fetch_rows
+        if prepared:
+            db.execute_prepared(cur, prepared, sql, params)
+        else:
+            cur.execute(sql, params)
+        cols: Optional[List[list]] = None
+        while True:
+            rows = cur.fetchmany(fetch_rows)
+            if cols is None:
+                cols = [[] for _ in cur.description]
+            if not rows:
+                break
+            for buf, values in zip(cols, zip(*rows)):
+                buf.extend(values)
+        names = [c.name for c in cur.description]
+    return pd.DataFrame({n: pd.Series(buf, dtype=object) for n, buf in zip(names, cols)})
+
+
+def _compact_col(s: pd.Series) -> pd.Series:
+    if s.dtype == object:
+        present = s.dropna()
+        if present.empty:
+            return s
+        first = present.iloc[0]
+        if isinstance(first, str):
+            return s.astype("string[pyarrow]")
+        if isinstance(first, date):
+            return pd.to_datetime(s)
+        if isinstance(first, Decimal):
+            # numeric: sums of integer columns come back with no fraction
+            # digits. that scale is set by the sql expression, not the values
+            # (avg() keeps 16+ digits even when whole), so whole-valued
+            # floats stay floats
+            if all(v.as_tuple().exponent >= 0 for v in present):
+                if len(present) == len(s):
+                    return pd.to_numeric(s.map(int), downcast="integer")
+                # sum() over no rows is null; float64 holds the rest exactly
+                return pd.to_numeric(s)
+            s = pd.to_numeric(s)
+        elif isinstance(first, (int, float, np.number)):
+            s = pd.to_numeric(s)
+        else:
+            return s
+
+    if pd.api.types.is_bool_dtype(s):
+        return s
+    if pd.api.types.is_float_dtype(s):
+        return s.astype("float32")
+    if pd.api.types.is_integer_dtype(s):
+        return pd.to_numeric(s, downcast="integer")
+    return s
+
+
+def compact(df: pd.DataFrame) -> pd.DataFrame:
+    # arrow-backed strings, datetime64 days, smallest int that fits, float32
+    out = pd.DataFrame({c: _compact_col(df[c]) for c in df.columns}, index=df.index)
+    out.attrs.update(df.attrs)
+    return out
+
+
+def qdf(sql: str, params: Optional[Dict[str, Any]] = None, label: str = "adhoc") -> pd.DataFrame:
+    t0 = time.perf_counter()
+    conn = get_db_conn()
+    try:
+        raw = read_frame(conn, sql, params)
+        conn.rollback()
+    finally:
+        conn.close()
+    df = compact(raw)
+    tracing.record_query(label, sql, params, time.perf_counter() - t0, df,
+                         saved_bytes=tracing.frame_bytes(raw) - tracing.frame_bytes(df))
+    return df
+
+
+async def aqdf(adb: db.AsyncDB, sql: str, params: Optional[Dict[str, Any]] = None, label: str = "adhoc",
+               prepared: Optional[str] = None, timeout: Optional[float] = None) -> pd.DataFrame:
+    # qdf on a pooled connection; recorded here, on the caller's context
+    t0 = time.perf_counter()
+    raw = await adb.run(lambda conn: read_frame(conn, sql, params, prepared=prepared), timeout=timeout)
+    df = compact(raw)
+    tracing.record_query(label, sql, params, time.perf_counter() - t0, df,
+                         saved_bytes=tracing.frame_bytes(raw) - tracing.frame_bytes(df))
+    return df
+
+
+def pooled_qdf(adb: db.AsyncDB, poll: Optional[Callable[[], None]] = None,
+               timeout: Optional[float] = None) -> Callable[..., pd.DataFrame]:
+    # blocking qdf-compatible callable for the load_* helpers
+    def query(sql: str, params: Optional[Dict[str, Any]] = None, label: str = "adhoc") -> pd.DataFrame:
+        return adb.call(aqdf(adb, sql, params, label, timeout=timeout), poll=poll)
+    return query
+
+
+# change counters (09-table-versions.sql): one primary-key row per table
+VERSIONS_SQL = """
+    SELECT table_name, version, last_change_ts, min_affected_date, max_affected_date
+    FROM table_versions
+    WHERE table_name = ANY(%(t)s);
+"""
+
+# everything the dashboard frames read
+RESULT_TABLES = (
+    "daily_event_volume_by_quadclass", "dyad_interactions", "top_actors", "daily_cameo_metrics",
+    "daily_goldstein_histogram", "geo_grid_daily", "distinct_sketches", "rolling_metrics", "conflict_alerts",
+)
+
+
+def load_versions(tables=RESULT_TABLES, query: Callable[..., pd.DataFrame] = qdf) -> Dict[str, int]:
+    df = query(VERSIONS_SQL, {"t": list(tables)}, label="versions")
+    return {t: int(v) for t, v in zip(df["table_name"], df["version"])} if not df.empty else {}
+
+
+def int_yyyymmdd(d: date) -> int:
+    return int(d.strftime("%Y%m%d"))
+
+
+META_SQL = """
+    SELECT MIN(event_date) AS min_event_date,
+           MAX(event_date) AS max_event_date
+    FROM daily_event_volume_by_quadclass;
+"""
+
+# dashboard queries, keyed by frame name
+QUERIES: Dict[str, str] = {
+    "kpis": """
+        SELECT
+          SUM(total_events) AS total_events,
+          SUM(CASE WHEN quad_class IN (3,4) THEN total_events ELSE 0 END) AS conflict_events,
+          AVG(avg_goldstein) AS mean_goldstein
+        FROM daily_event_volume_by_quadclass
+        WHERE event_date BETWEEN %(s)s AND %(e)s;
+    """,
+    # time series are bucketed into %(b)s-day buckets starting at %(s)s;
+    # totals are daily averages per bucket, so b = 1 is plain per-day data
+    "trend": """
+        SELECT
+          event_day,
+          total_events / LEAST(%(b)s, to_date(%(e)s::text, 'YYYYMMDD') - event_day + 1) AS total_events,
+          conflict_events / LEAST(%(b)s, to_date(%(e)s::text, 'YYYYMMDD') - event_day + 1) AS conflict_events,
+          mean_goldstein
+        FROM (
+          SELECT
+            to_date(%(s)s::text, 'YYYYMMDD')
+              + (to_date(event_date::text, 'YYYYMMDD') - to_date(%(s)s::text, 'YYYYMMDD')) / %(b)s * %(b)s AS event_day,
+            SUM(total_events) AS total_events,
+            SUM(CASE WHEN quad_class IN (3,4) THEN total_events ELSE 0 END) AS conflict_events,
+            AVG(avg_goldstein) AS mean_goldstein
+          FROM daily_event_volume_by_quadclass
+          WHERE event_date BETWEEN %(s)s AND %(e)s
+          GROUP BY 1
+        ) b
+        ORDER BY 1;
+    """,
+    # aggregate on integer ids, join the dimension only for labels
+    "actors": """
+        SELECT
+          d.actor_code AS iso3,
+          a.total_events,
+          a.mean_goldstein
+        FROM (
+          SELECT
+            source_actor_id,
+            SUM(total_events) AS total_events,
+            AVG(avg_goldstein) AS mean_goldstein
+          FROM top_actors
+          WHERE event_date BETWEEN %(s)s AND %(e)s
+            AND source_actor_id IN (SELECT actor_id FROM actor_dim WHERE is_iso3)
+          GROUP BY 1
+          HAVING SUM(total_events) > 0
+          ORDER BY total_events DESC
+          LIMIT 250
+        ) a
+        JOIN actor_dim d ON d.actor_id = a.source_actor_id
+        ORDER BY a.total_events DESC;
+    """,
+    "dyads": """
+        SELECT
+          s.actor_code AS source_actor,
+          t.actor_code AS target_actor,
+          a.total_events,
+          a.mean_goldstein
+        FROM (
+          SELECT
+            source_actor_id,
+            target_actor_id,
+            SUM(total_events) AS total_events,
+            AVG(avg_goldstein) AS mean_goldstein
+          FROM dyad_interactions
+          WHERE event_date BETWEEN %(s)s AND %(e)s
+          GROUP BY 1,2
+          ORDER BY total_events DESC
+          LIMIT %(n)s
+        ) a
+        JOIN actor_dim s ON s.actor_id = a.source_actor_id
+        JOIN actor_dim t ON t.actor_id = a.target_actor_id
+        ORDER BY a.total_events DESC;
+    """,
+    "cameo": """
+        SELECT
+          c.cameo_code,
+          a.total_events,
+          a.mean_goldstein
+        FROM (
+          SELECT
+            cameo_id,
+            SUM(total_events) AS total_events,
+            AVG(avg_goldstein) AS mean_goldstein
+          FROM daily_cameo_metrics
+          WHERE event_date BETWEEN %(s)s AND %(e)s
+          GROUP BY 1
+          ORDER BY total_events DESC
+          LIMIT %(n)s
+        ) a
+        JOIN cameo_dim c ON c.cameo_id = a.cameo_id
+        ORDER BY a.total_events DESC;
+    """,
+    # hll sketches (05-distinct-sketches.sql), merged over whole years,
+    # whole months and leftover days of the range
+    "distinct": """
+        WITH merged AS (
+          SELECT kind, u.reg, MAX(u.rho) AS rho
+          FROM distinct_sketches, unnest(regs, rhos) AS u(reg, rho)
+          WHERE (level = 'y' AND period = ANY(%(y)s))
+             OR (level = 'm' AND period = ANY(%(m)s))
+             OR (level = 'd' AND period = ANY(%(d)s))
+          GROUP BY 1,2
+        )
+        SELECT
+          round(hll_estimate(COUNT(*) FILTER (WHERE kind = 'actor'),
+                             SUM(power(2.0::float8, -rho)) FILTER (WHERE kind = 'actor')))::bigint AS distinct_actors,
+          round(hll_estimate(COUNT(*) FILTER (WHERE kind = 'dyad'),
+                             SUM(power(2.0::float8, -rho)) FILTER (WHERE kind = 'dyad')))::bigint AS distinct_dyads
+        FROM merged;
+    """,
+    "quad_dist": """
+        SELECT
+          quad_class,
+          SUM(total_events) AS total_events,
+          AVG(avg_goldstein) AS avg_goldstein
+        FROM daily_event_volume_by_quadclass
+        WHERE event_date BETWEEN %(s)s AND %(e)s
+        GROUP BY 1
+        ORDER BY 1;
+    """,
+    "quad_time": """
+        SELECT
+          event_day,
+          quad_class,
+          total_events / LEAST(%(b)s, to_date(%(e)s::text, 'YYYYMMDD') - event_day + 1) AS total_events
+        FROM (
+          SELECT
+            to_date(%(s)s::text, 'YYYYMMDD')
+              + (to_date(event_date::text, 'YYYYMMDD') - to_date(%(s)s::text, 'YYYYMMDD')) / %(b)s * %(b)s AS event_day,
+            quad_class,
+            SUM(total_events) AS total_events
+          FROM daily_event_volume_by_quadclass
+          WHERE event_date BETWEEN %(s)s AND %(e)s
+          GROUP BY 1,2
+        ) b
+        ORDER BY 1,2;
+    """,
+    # p10 / median / p90 goldstein per bucket from the 0.1-wide histogram bins
+    "goldstein_bands": """
+        WITH h AS (
+          SELECT
+            to_date(%(s)s::text, 'YYYYMMDD')
+              + (to_date(event_date::text, 'YYYYMMDD') - to_date(%(s)s::text, 'YYYYMMDD')) / %(b)s * %(b)s AS event_day,
+            bin,
+            SUM(n) AS n
+          FROM daily_goldstein_histogram
+          WHERE event_date BETWEEN %(s)s AND %(e)s
+          GROUP BY 1,2
+        ), c AS (
+          SELECT
+            event_day,
+            bin,
+            SUM(n) OVER (PARTITION BY event_day ORDER BY bin) AS cum,
+            SUM(n) OVER (PARTITION BY event_day) AS total
+          FROM h
+        )
+        SELECT
+          event_day,
+          MIN(bin) FILTER (WHERE cum >= 0.1 * total) / 10.0 AS p10_goldstein,
+          MIN(bin) FILTER (WHERE cum >= 0.5 * total) / 10.0 AS median_goldstein,
+          MIN(bin) FILTER (WHERE cum >= 0.9 * total) / 10.0 AS p90_goldstein
+        FROM c
+        GROUP BY 1
+        ORDER BY 1;
+    """,
+    # smoothed conflict share from the rolling window tables (07-rolling-metrics.sql)
+    "rolling": """
+        SELECT
+          to_date(%(s)s::text, 'YYYYMMDD')
+            + (to_date(event_date::text, 'YYYYMMDD') - to_date(%(s)s::text, 'YYYYMMDD')) / %(b)s * %(b)s AS event_day,
+          AVG(conflict_share_7d) AS conflict_share_7d,
+          AVG(conflict_share_30d) AS conflict_share_30d,
+          AVG(goldstein_7d) AS goldstein_7d,
+          AVG(goldstein_30d) AS goldstein_30d
+        FROM (
+          SELECT
+            event_date,
+            SUM(events_7d) FILTER (WHERE quad_class IN (3,4))::float8 / NULLIF(SUM(events_7d), 0) AS conflict_share_7d,
+            SUM(events_30d) FILTER (WHERE quad_class IN (3,4))::float8 / NULLIF(SUM(events_30d), 0) AS conflict_share_30d,
+            SUM(goldstein_7d * events_7d) / NULLIF(SUM(events_7d), 0) AS goldstein_7d,
+            SUM(goldstein_30d * events_30d) / NULLIF(SUM(events_30d), 0) AS goldstein_30d
+          FROM rolling_quadclass_metrics
+          WHERE event_date BETWEEN %(s)s AND %(e)s
+          GROUP BY 1
+        ) d
+        GROUP BY 1
+        ORDER BY 1;
+    """,
+}
+
+# one country's rolling series, same columns as the "rolling" frame
+ACTOR_ROLLING_SQL = """
+    SELECT
+      to_date(%(s)s::text, 'YYYYMMDD')
+        + (to_date(r.event_date::text, 'YYYYMMDD') - to_date(%(s)s::text, 'YYYYMMDD')) / %(b)s * %(b)s AS event_day,
+      AVG(r.conflict_7d::float8 / NULLIF(r.events_7d, 0)) AS conflict_share_7d,
+      AVG(r.conflict_30d::float8 / NULLIF(r.events_30d, 0)) AS conflict_share_30d,
+      AVG(r.goldstein_7d) AS goldstein_7d,
+      AVG(r.goldstein_30d) AS goldstein_30d
+    FROM rolling_actor_metrics r
+    JOIN actor_dim d ON d.actor_id = r.source_actor_id
+    WHERE d.actor_code = %(a)s AND r.event_date BETWEEN %(s)s AND %(e)s
+    GROUP BY 1
+    ORDER BY 1;
+"""
+
+
+# time series frames -> points fetched per chart point (trend is lttb'd down after)
+SERIES: Dict[str, int] = {
+    "trend": downsample.LTTB_OVERSAMPLE,
+    "quad_time": 1,
+    "goldstein_bands": 1,
+    "rolling": 1,
+}
+
+
+# relative standard error of the p = 12 hll sketches
+HLL_ERROR = 1.04 / 64
+
+
+def _day(i: int) -> date:
+    return date(i // 10000, i // 100 % 100, i % 100)
+
+
+def sketch_periods(start_i: int, end_i: int) -> Dict[str, List[int]]:
+    # fewest sketches covering [start, end]: whole years, whole months, days
+    s, e = _day(start_i), _day(end_i)
+    out: Dict[str, List[int]] = {"y": [], "m": [], "d": []}
+    d = s
+    while d <= e:
+        next_month = date(d.year + d.month // 12, d.month % 12 + 1, 1)
+        if d.month == 1 and d.day == 1 and date(d.year, 12, 31) <= e:
+            out["y"].append(d.year)
+            d = date(d.year + 1, 1, 1)
+        elif d.day == 1 and next_month - timedelta(days=1) <= e:
+            out["m"].append(d.year * 100 + d.month)
+            d = next_month
+        else:
+            out["d"].append(int_yyyymmdd(d))
+            d += timedelta(days=1)
+    return out
+
+
+def frame_params(name: str, start_i: int, end_i: int, topn: int,
+                 max_points: int = downsample.MAX_POINTS) -> Dict[str, Any]:
+    b = downsample.bucket_days(start_i, end_i, max_points * SERIES[name]) if name in SERIES else 1
+    params = {"s": start_i, "e": end_i, "n": topn, "b": b}
+    if name == "distinct":
+        params.update(sketch_periods(start_i, end_i))
+    return params
+
+
+def finish_frame(name: str, df: pd.DataFrame, params: Dict[str, Any],
+                 max_points: int = downsample.MAX_POINTS) -> pd.DataFrame:
+    if name == "trend":
+        df = downsample.lttb(df, "event_day", "total_events", max_points).reset_index(drop=True)
+    if name in SERIES:
+        # charts label the y axis from this
+        df.attrs["bucket_days"] = params["b"]
+    return df
+
+
+def load_meta(query: Callable[..., pd.DataFrame] = qdf) -> pd.DataFrame:
+    return query(META_SQL, label="meta")
+
+
+def load_frame(name: str, start_i: int, end_i: int, topn: int,
+               query: Callable[..., pd.DataFrame] = qdf,
+               max_points: int = downsample.MAX_POINTS) -> pd.DataFrame:
+    params = frame_params(name, start_i, end_i, topn, max_points)
+    return finish_frame(name, query(QUERIES[name], params=params, label=name), params, max_points)
+
+
+def load_actor_rolling(actor_code: str, start_i: int, end_i: int,
+                       query: Callable[..., pd.DataFrame] = qdf,
+                       max_points: int = downsample.MAX_POINTS) -> pd.DataFrame:
+    params = {"s": start_i, "e": end_i, "a": actor_code,
+              "b": downsample.bucket_days(start_i, end_i, max_points)}
+    df = query(ACTOR_ROLLING_SQL, params=params, label="actor_rolling")
+    df.attrs["bucket_days"] = params["b"]
+    return df
+
+
+def load_all(start_i: int, end_i: int, topn: int,
+             query: Callable[..., pd.DataFrame] = qdf,
+             max_points: int = downsample.MAX_POINTS) -> Dict[str, pd.DataFrame]:
+    return {name: load_frame(name, start_i, end_i, topn, query=query, max_points=max_points) for name in QUERIES}
+
+
+async def aload_all(adb: db.AsyncDB, start_i: int, end_i: int, topn: int,
+                    max_points: int = downsample.MAX_POINTS,
+                    timeout: Optional[float] = None,
+                    names: Sequence[str] = tuple(QUERIES)) -> Dict[str, pd.DataFrame]:
+    # every frame at once, each on its own pooled connection as a prepared
+    # statement; cancelling this cancels all of them
+    params = {name: frame_params(name, start_i, end_i, topn, max_points) for name in names}
+    frames = await asyncio.gather(*(
+        aqdf(adb, QUERIES[name], params[name], label=name, prepared=name, timeout=timeout) for name in names
+    ))
+    return {name: finish_frame(name, df, params[name], max_points) for name, df in zip(names, frames)}
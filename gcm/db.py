@@ -0,0 +1,239 @@
+# shared database access: connection settings, a pooled async executor with
+# prepared statements, timeouts and cancellation, and a blocking facade
+import os
+import re
+import asyncio
+import hashlib
+import threading
+import concurrent.futures
+from datetime import date
+from typing import Any, Callable, Dict, Hashable, Optional, TypeVar
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+
+
+# db config
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_PORT = os.getenv("DB_PORT", "5432")
+DB_NAME = os.getenv("DB_NAME", "gdelt")
+DB_USER = os.getenv("DB_USER", "flink_user")
+DB_PASS = os.getenv("DB_PASS", "flink_pass")
+
+# pooled connections (dashboard, api); plain connect() has no timeout
+POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+POOL_MAX = int(os.getenv("DB_POOL_MAX", "8"))
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+# how often a blocked call() checks whether its caller moved on
+POLL_SECONDS = 0.1
+
+T = TypeVar("T")
+
+
+def connect(statement_timeout_ms: Optional[int] = None, **kwargs):
+    options = f"-c statement_timeout={statement_timeout_ms}" if statement_timeout_ms else None
+    return psycopg2.connect(
+        host=DB_HOST,
+        port=DB_PORT,
+        dbname=DB_NAME,
+        user=DB_USER,
+        password=DB_PASS,
+        options=options,
+        **kwargs,
+    )
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    # remembers which statements were prepared on this backend
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: Dict[str, str] = {}
+
+
+_PARAM = re.compile(r"%\((\w+)\)s")
+
+
+def _pg_type(v: Any) -> str:
+    if isinstance(v, bool):
+        return "boolean"
+    if isinstance(v, int):
+        return "integer" if -2 ** 31 <= v < 2 ** 31 else "bigint"
+    if isinstance(v, float):
+        return "double precision"
+    if isinstance(v, date):
+        return "date"
+    if isinstance(v, (list, tuple)):
+        return (_pg_type(v[0]) if v else "integer") + "[]"
+    return "text"
+
+
+def execute_prepared(cur, name: str, sql: str, params: Optional[Dict[str, Any]] = None):
+    # PREPARE once per connection (named %(k)s params become typed $n), then
+    # EXECUTE; connections without a prepared map just run the sql
+    prepared = getattr(cur.connection, "prepared", None)
+    if prepared is None:
+        cur.execute(sql, params)
+        return
+    params = params or {}
+    names = list(dict.fromkeys(_PARAM.findall(sql)))
+    types = [_pg_type(params[k]) for k in names]
+    # the types are part of the statement, so they are part of its name
+    stmt = f"gcm_{name}_{hashlib.sha1((sql + repr(types)).encode('utf-8')).hexdigest()[:10]}"
+    if stmt not in prepared:
+        body = _PARAM.sub(lambda m: f"${names.index(m.group(1)) + 1}", sql).replace("%%", "%").strip().rstrip(";")
+        cur.execute(f"PREPARE {stmt} ({', '.join(types)}) AS {body}" if types else f"PREPARE {stmt} AS {body}")
+        prepared[stmt] = name
+    if names:
+        cur.execute(f"EXECUTE {stmt} ({', '.join(['%s'] * len(names))})", [params[k] for k in names])
+    else:
+        cur.execute(f"EXECUTE {stmt}")
+
+
+class AsyncDB:
+    # a connection pool driven from one background event loop. blocking
+    # psycopg2 work runs on worker threads; cancelling a task (superseded,
+    # timed out, or the caller gave up) cancels the statement on the backend
+    # so it stops holding a connection
+    def __init__(self, min_conn: int = POOL_MIN, max_conn: int = POOL_MAX,
+                 statement_timeout_ms: int = STATEMENT_TIMEOUT_MS):
+        self.max_conn = max_conn
+        self.statement_timeout_ms = statement_timeout_ms
+        self._pool = psycopg2.pool.ThreadedConnectionPool(
+            min_conn, max_conn,
+            host=DB_HOST, port=DB_PORT, dbname=DB_NAME, user=DB_USER, password=DB_PASS,
+            options=f"-c statement_timeout={statement_timeout_ms}" if statement_timeout_ms else None,
+            connection_factory=PooledConnection,
+        )
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_conn, thread_name_prefix="gcm-db")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="gcm-db-loop", daemon=True)
+        self._thread.start()
+        self._slots = asyncio.run_coroutine_threadsafe(self._make_slots(), self._loop).result()
+        self._running: Dict[Hashable, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.timeouts = 0
+        self.failed = 0
+
+    async def _make_slots(self) -> asyncio.Semaphore:
+        # the pool raises when empty, so waiters queue here instead
+        return asyncio.Semaphore(self.max_conn)
+
+    def _count(self, attr: str, n: int = 1):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + n)
+
+    async def run(self, work: Callable[[Any], T], timeout: Optional[float] = None) -> T:
+        # work(conn) on a pooled connection; the transaction is always rolled back.
+        # the connection and its slot go back from done callbacks, never from
+        # a finally: a second cancel (a stale rerun, then its superseding call)
+        # would land in the finally and skip the release
+        loop = asyncio.get_running_loop()
+        await self._slots.acquire()
+        getting = loop.run_in_executor(self._executor, self._pool.getconn)
+        try:
+            conn = await asyncio.shield(getting)
+        except asyncio.CancelledError:
+            # the checkout still finishes; hand that connection straight back
+            def checked_out(f):
+                if f.cancelled() or f.exception() is not None:
+                    self._slots.release()
+                else:
+                    self._give_back(loop, f.result())
+            getting.add_done_callback(checked_out)
+            raise
+        except BaseException:
+            self._slots.release()
+            raise
+
+        def worker_done(f):
+            if not f.cancelled():
+                f.exception()  # raised to the caller, or nobody waits any more
+            # the worker has seen any cancel before the connection goes back
+            self._give_back(loop, conn)
+
+        fut = loop.run_in_executor(self._executor, work, conn)
+        fut.add_done_callback(worker_done)
+        self._count("in_flight")
+        try:
+            out = await asyncio.wait_for(asyncio.shield(fut), timeout)
+            self._count("completed")
+            return out
+        except asyncio.TimeoutError:
+            self._count("timeouts")
+            conn.cancel()
+            raise
+        except asyncio.CancelledError:
+            self._count("cancelled")
+            conn.cancel()
+            raise
+        except Exception:
+            self._count("failed")
+            raise
+        finally:
+            self._count("in_flight", -1)
+
+    def _give_back(self, loop: asyncio.AbstractEventLoop, conn):
+        # rollback() blocks, so it runs on a worker thread, not the loop. the
+        # slot frees once the connection is in the pool, so getconn never
+        # finds it empty
+        done = loop.run_in_executor(self._executor, self._release, conn)
+        done.add_done_callback(lambda _: self._slots.release())
+
+    def _release(self, conn):
+        try:
+            conn.rollback()
+            self._pool.putconn(conn)
+        except Exception:
+            self._pool.putconn(conn, close=True)
+
+    async def _superseding(self, key: Hashable, coro):
+        # a newer call with the same key cancels this one
+        prev = self._running.get(key)
+        if prev is not None and not prev.done():
+            prev.cancel()
+        task = asyncio.current_task()
+        self._running[key] = task
+        try:
+            return await coro
+        finally:
+            if self._running.get(key) is task:
+                del self._running[key]
+
+    def call(self, coro, key: Optional[Hashable] = None, poll: Optional[Callable[[], None]] = None) -> Any:
+        # blocking facade: run coro on the db loop and wait. poll() runs every
+        # POLL_SECONDS while waiting; if it raises (e.g. streamlit stopping a
+        # stale rerun) the query is cancelled and the exception propagates
+        if key is not None:
+            coro = self._superseding(key, coro)
+        fut = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            while True:
+                done, _ = concurrent.futures.wait([fut], timeout=POLL_SECONDS)
+                if done:
+                    return fut.result()
+                if poll is not None:
+                    poll()
+        except BaseException:
+            fut.cancel()
+            raise
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "timeouts": self.timeouts,
+                "failed": self.failed,
+            }
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._executor.shutdown(wait=False)
+        self._pool.closeall()
@@ -0,0 +1,62 @@
+# width-aware downsampling for the dashboard time series
+import os
+import math
+
+import numpy as np
+import pandas as pd
+
+
+# roughly one point per horizontal pixel of a dashboard chart
+MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "800"))
+
+# trend is bucketed in sql to this multiple of max_points, then lttb keeps the shape
+LTTB_OVERSAMPLE = 4
+
+
+def span_days(start_i: int, end_i: int) -> int:
+    s = pd.to_datetime(str(start_i), format="%Y%m%d")
+    e = pd.to_datetime(str(end_i), format="%Y%m%d")
+    return max(1, (e - s).days + 1)
+
+
+def bucket_days(start_i: int, end_i: int, max_points: int) -> int:
+    # 1 (full resolution) whenever the range fits in max_points days
+    return max(1, math.ceil(span_days(start_i, end_i) / max(1, max_points)))
+
+
+def lttb(df: pd.DataFrame, x: str, y: str, n: int) -> pd.DataFrame:
+    # largest-triangle-three-buckets: keeps n rows, always the first and last,
+    # picking per bucket the row that spans the largest triangle with its neighbours
+    size = len(df)
+    if n >= size or n < 3:
+        return df
+
+    if pd.api.types.is_numeric_dtype(df[x]):
+        xs = df[x].to_numpy(dtype="float64")
+    else:
+        xs = pd.to_datetime(df[x]).to_numpy().astype("int64").astype("float64")
+    ys = np.nan_to_num(df[y].to_numpy(dtype="float64"))
+
+    keep = np.empty(n, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = size - 1
+
+    every = (size - 2) / (n - 2)
+    a = 0
+    for i in range(n - 2):
+        lo = int(math.floor(i * every)) + 1
+        hi = int(math.floor((i + 1) * every)) + 1
+        nlo = hi
+        nhi = min(int(math.floor((i + 2) * every)) + 1, size)
+        # next bucket's mean is the third vertex (last point for the final bucket)
+        if nlo >= nhi:
+            cx, cy = xs[-1], ys[-1]
+        else:
+            cx, cy = xs[nlo:nhi].mean(), ys[nlo:nhi].mean()
+
+        bx, by = xs[lo:hi], ys[lo:hi]
+        area = np.abs((xs[a] - cx) * (by - ys[a]) - (xs[a] - bx) * (cy - ys[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+
+    return df.iloc[keep]
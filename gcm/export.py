@@ -0,0 +1,306 @@
+# bounded-memory exports of aggregates and raw events (csv.gz / parquet)
+import io
+import os
+import csv
+import gzip
+import time
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from gcm.data import get_db_conn
+
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+# files up to this size are offered as a dashboard download; larger ones stay on disk
+EXPORT_INLINE_MB = int(os.getenv("EXPORT_INLINE_MB", "200"))
+# base url of scripts/api_server.py as the browser sees it; when set, the
+# dashboard links larger exports to its streaming /v1/export/<name> route
+EXPORT_API_URL = os.getenv("EXPORT_API_URL", "").rstrip("/")
+# rows per server-side fetch / parquet row group; memory is bounded by this
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "50000"))
+# progress callbacks fire at most this often
+PROGRESS_SECONDS = 0.5
+
+FORMATS = ("csv.gz", "parquet")
+
+# name -> (select over %(s)s..%(e)s, column -> arrow type); codes are joined
+# in so the files stand on their own
+EXPORTS: Dict[str, Tuple[str, Dict[str, str]]] = {
+    "dyads": (
+        """
+        SELECT i.event_date, s.actor_code AS source_actor, t.actor_code AS target_actor,
+               i.total_events, i.avg_goldstein
+        FROM dyad_interactions i
+        JOIN actor_dim s ON s.actor_id = i.source_actor_id
+        JOIN actor_dim t ON t.actor_id = i.target_actor_id
+        WHERE i.event_date BETWEEN %(s)s AND %(e)s
+        ORDER BY i.event_date, i.source_actor_id, i.target_actor_id
+        """,
+        {"event_date": "int32", "source_actor": "string", "target_actor": "string",
+         "total_events": "int64", "avg_goldstein": "float64"},
+    ),
+    "actors": (
+        """
+        SELECT a.event_date, d.actor_code AS actor, a.total_events, a.total_articles,
+               a.conflict_events, a.avg_goldstein
+        FROM top_actors a
+        JOIN actor_dim d ON d.actor_id = a.source_actor_id
+        WHERE a.event_date BETWEEN %(s)s AND %(e)s
+        ORDER BY a.event_date, a.source_actor_id
+        """,
+        {"event_date": "int32", "actor": "string", "total_events": "int64",
+         "total_articles": "int64", "conflict_events": "int64", "avg_goldstein": "float64"},
+    ),
+    "cameo": (
+        """
+        SELECT m.event_date, c.cameo_code, m.total_events, m.total_articles, m.avg_goldstein
+        FROM daily_cameo_metrics m
+        JOIN cameo_dim c ON c.cameo_id = m.cameo_id
+        WHERE m.event_date BETWEEN %(s)s AND %(e)s
+        ORDER BY m.event_date, m.cameo_id
+        """,
+        {"event_date": "int32", "cameo_code": "string", "total_events": "int64",
+         "total_articles": "int64", "avg_goldstein": "float64"},
+    ),
+    "quadclass": (
+        """
+        SELECT event_date, quad_class, total_events, total_articles, avg_goldstein
+        FROM daily_event_volume_by_quadclass
+        WHERE event_date BETWEEN %(s)s AND %(e)s
+        ORDER BY event_date, quad_class
+        """,
+        {"event_date": "int32", "quad_class": "int32", "total_events": "int64",
+         "total_articles": "int64", "avg_goldstein": "float64"},
+    ),
+    "events": (
+        """
+        SELECT globaleventid, event_date, source_actor, target_actor, cameo_code,
+               num_events, num_articles, quad_class, goldstein,
+               source_geo_type, source_geo_lat, source_geo_long,
+               target_geo_type, target_geo_lat, target_geo_long,
+               action_geo_type, action_geo_lat, action_geo_long
+        FROM gdelt_events
+        WHERE event_date BETWEEN %(s)s AND %(e)s
+        """,
+        {"globaleventid": "int64", "event_date": "int32", "source_actor": "string",
+         "target_actor": "string", "cameo_code": "string", "num_events": "int32",
+         "num_articles": "int32", "quad_class": "int32", "goldstein": "float64",
+         "source_geo_type": "int32", "source_geo_lat": "float64", "source_geo_long": "float64",
+         "target_geo_type": "int32", "target_geo_lat": "float64", "target_geo_long": "float64",
+         "action_geo_type": "int32", "action_geo_lat": "float64", "action_geo_long": "float64"},
+    ),
+}
+
+
+@dataclass
+class ExportProgress:
+    name: str
+    fmt: str
+    rows: int = 0
+    bytes: int = 0  # compressed output
+    started: float = field(default_factory=time.perf_counter)
+    finished: Optional[float] = None
+    path: Optional[str] = None
+    span: Optional[Tuple[int, int]] = None  # start_i, end_i
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def bytes_per_sec(self) -> float:
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+
+class _Ticker:
+    # rate-limits progress callbacks
+    def __init__(self, progress: Optional[Callable[[ExportProgress], None]]):
+        self.progress = progress
+        self.last = 0.0
+
+    def __call__(self, p: ExportProgress, force: bool = False):
+        now = time.perf_counter()
+        if self.progress is not None and (force or now - self.last >= PROGRESS_SECONDS):
+            self.last = now
+            self.progress(p)
+
+
+def schema(name: str) -> pa.Schema:
+    return pa.schema([(c, pa.type_for_alias(t)) for c, t in EXPORTS[name][1].items()])
+
+
+def _params(start_i: int, end_i: int) -> Dict[str, int]:
+    return {"s": start_i, "e": end_i}
+
+
+def estimate_rows(conn, name: str, start_i: int, end_i: int) -> int:
+    # planner estimate, for progress bars; counting would scan the range twice
+    with conn.cursor() as cur:
+        cur.execute("EXPLAIN (FORMAT JSON) " + EXPORTS[name][0], _params(start_i, end_i))
+        plan = cur.fetchone()[0]
+    conn.rollback()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _chunks(conn, name: str, start_i: int, end_i: int, chunk_rows: int) -> Iterator[list]:
+    # named cursor = server-side; one chunk of row tuples is held at a time
+    with conn.cursor(name=f"gcm_export_{uuid.uuid4().hex[:8]}") as cur:
+        cur.itersize = chunk_rows
+        cur.execute(EXPORTS[name][0], _params(start_i, end_i))
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+
+
+class _RawSink:
+    # byte-counting pass-through under the gzip layer
+    def __init__(self, fileobj, p: ExportProgress):
+        self.fileobj = fileobj
+        self.p = p
+
+    def write(self, b):
+        self.p.bytes += len(b)
+        return self.fileobj.write(b)
+
+    def flush(self):
+        if hasattr(self.fileobj, "flush"):
+            self.fileobj.flush()
+
+
+class _CopyTarget:
+    # COPY target: counts rows and gzip-compresses into fileobj
+    def __init__(self, fileobj, p: ExportProgress, tick: _Ticker):
+        self.p = p
+        self.tick = tick
+        self.gz = gzip.GzipFile(fileobj=_RawSink(fileobj, p), mode="wb", mtime=0)
+        self.header = True
+
+    def write(self, b):
+        if isinstance(b, str):
+            b = b.encode("utf-8")
+        # postgres sends one COPY message per row; the first is the header
+        n = b.count(b"\n")
+        if self.header and n:
+            self.header, n = False, n - 1
+        self.p.rows += n
+        self.gz.write(b)
+        self.tick(self.p)
+        return len(b)
+
+    def close(self):
+        self.gz.close()
+
+
+def copy_csv_gz(conn, name: str, start_i: int, end_i: int, fileobj,
+                progress: Optional[Callable[[ExportProgress], None]] = None) -> ExportProgress:
+    # COPY ... TO STDOUT straight into a gzip stream: no python row objects at all
+    p = ExportProgress(name, "csv.gz")
+    tick = _Ticker(progress)
+    with conn.cursor() as cur:
+        sql = cur.mogrify(EXPORTS[name][0], _params(start_i, end_i)).decode("utf-8").strip().rstrip(";")
+        out = _CopyTarget(fileobj, p, tick)
+        cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER)", out)
+        out.close()
+    p.finished = time.perf_counter()
+    tick(p, force=True)
+    return p
+
+
+def iter_csv_gz(conn, name: str, start_i: int, end_i: int, chunk_rows: int = EXPORT_CHUNK_ROWS,
+                progress: Optional[Callable[[ExportProgress], None]] = None) -> Iterator[bytes]:
+    # pull-based variant for http responses: one gzip member, yielded a chunk at a time
+    p = ExportProgress(name, "csv.gz")
+    tick = _Ticker(progress)
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    buf = io.StringIO()
+    w = csv.writer(buf, lineterminator="\n")
+    w.writerow(EXPORTS[name][1].keys())
+    for rows in _chunks(conn, name, start_i, end_i, chunk_rows):
+        w.writerows(rows)
+        out = z.compress(buf.getvalue().encode("utf-8"))
+        buf.seek(0)
+        buf.truncate()
+        p.rows += len(rows)
+        if out:
+            p.bytes += len(out)
+            yield out
+        tick(p)
+    out = z.compress(buf.getvalue().encode("utf-8")) + z.flush()
+    p.bytes += len(out)
+    p.finished = time.perf_counter()
+    tick(p, force=True)
+    yield out
+
+
+def write_parquet(conn, name: str, start_i: int, end_i: int, path: str,
+                  chunk_rows: int = EXPORT_CHUNK_ROWS,
+                  progress: Optional[Callable[[ExportProgress], None]] = None) -> ExportProgress:
+    # one row group per fetched chunk, fixed schema so an empty or all-null
+    # chunk can't change column types mid-file
+    p = ExportProgress(name, "parquet")
+    tick = _Ticker(progress)
+    sch = schema(name)
+    with pa.OSFile(path, "wb") as sink, pq.ParquetWriter(sink, sch, compression="zstd") as writer:
+        for rows in _chunks(conn, name, start_i, end_i, chunk_rows):
+            cols = list(zip(*rows))
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(c, type=f.type) for c, f in zip(cols, sch)], schema=sch))
+            p.rows += len(rows)
+            p.bytes = sink.tell()
+            tick(p)
+    p.bytes = os.path.getsize(path)
+    p.finished = time.perf_counter()
+    tick(p, force=True)
+    return p
+
+
+def export_path(name: str, fmt: str, start_i: int, end_i: int, out_dir: str = EXPORT_DIR) -> str:
+    return os.path.join(out_dir, f"{name}_{start_i}_{end_i}.{fmt}")
+
+
+def export_file(name: str, fmt: str, start_i: int, end_i: int, path: Optional[str] = None,
+                progress: Optional[Callable[[ExportProgress], None]] = None,
+                estimate: Optional[Callable[[int], None]] = None) -> ExportProgress:
+    # written to a temp name and renamed, so a half-written file is never served
+    if name not in EXPORTS:
+        raise ValueError(f"unknown export {name!r}")
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}")
+    path = path or export_path(name, fmt, start_i, end_i)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.part"
+    conn = get_db_conn()
+    try:
+        if estimate is not None:
+            estimate(estimate_rows(conn, name, start_i, end_i))
+        if fmt == "parquet":
+            p = write_parquet(conn, name, start_i, end_i, tmp, progress=progress)
+        else:
+            with open(tmp, "wb") as f:
+                p = copy_csv_gz(conn, name, start_i, end_i, f, progress=progress)
+        conn.rollback()
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    finally:
+        conn.close()
+    p.path = path
+    p.span = (start_i, end_i)
+    return p
+
+
+def api_url(name: str, start_i: int, end_i: int, base: str = EXPORT_API_URL) -> str:
+    return f"{base}/v1/export/{name}?start={start_i}&end={end_i}"
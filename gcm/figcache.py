@@ -0,0 +1,66 @@
+# memoized figure construction keyed by frame content + chart options
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+import pandas as pd
+
+
+FIGURE_CACHE_SIZE = int(os.getenv("FIGURE_CACHE_SIZE", "64"))
+
+
+def frame_key(df: pd.DataFrame) -> str:
+    # content hash: frames reloaded after a table version bump (or from
+    # another session's query) can be equal without being the same object,
+    # and they should share the figure
+    h = hashlib.sha1()
+    h.update(repr((list(df.columns), [str(t) for t in df.dtypes], sorted(df.attrs.items()))).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _arg_key(arg: Any) -> Hashable:
+    if isinstance(arg, pd.DataFrame):
+        return ("df", frame_key(arg))
+    return arg
+
+
+class FigureCache:
+    # lru over built figures (or any derived value, e.g. the dyad pivot)
+    def __init__(self, max_entries: int = FIGURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, name: str, build: Callable[..., Any], *args, **opts) -> Any:
+        key = (name, tuple(_arg_key(a) for a in args), tuple(sorted(opts.items())))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        value = build(*args, **opts)
+
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,192 @@
+# multi-zoom lat/long grid over event locations (action_geo)
+import os
+import math
+from typing import Callable, Dict, List, Tuple
+
+import pandas as pd
+
+from gcm import data as gcm_data
+
+
+# cell size in degrees per zoom level; must match the geo_grid_daily
+# inserts in flink/sql (run-aggregations.sql / run-pipeline.sql)
+ZOOM_DEG: Tuple[float, ...] = (4.0, 1.0, 0.25)
+
+# densest cells returned for one view; the rest are dropped from the map
+GEO_MAX_CELLS = int(os.getenv("GEO_MAX_CELLS", "20000"))
+
+# event search: rows returned per query, and the candidate cell count past
+# which probing the geo_cell index stops paying off (plain scan instead)
+SEARCH_LIMIT = int(os.getenv("GEO_SEARCH_LIMIT", "1000"))
+SEARCH_MAX_CELLS = int(os.getenv("GEO_SEARCH_MAX_CELLS", "2000"))
+
+# geo_cell() in postgres/init/06-geo-search.sql indexes zoom 1 (1-degree cells)
+SEARCH_ZOOM = 1
+EARTH_KM = 6371.0
+
+
+def zoom_label(zoom: int) -> str:
+    return f"{ZOOM_DEG[zoom]:g}°"
+
+
+def cell_of(lat: float, lon: float, zoom: int) -> Tuple[int, int]:
+    # (row, col) from the south-west corner; the 90 / 180 edges fold into the last cell
+    deg = ZOOM_DEG[zoom]
+    y = min(int(math.floor((lat + 90.0) / deg)), int(round(180.0 / deg)) - 1)
+    x = min(int(math.floor((lon + 180.0) / deg)), int(round(360.0 / deg)) - 1)
+    return y, x
+
+
+def cell_center(y: int, x: int, zoom: int) -> Tuple[float, float]:
+    deg = ZOOM_DEG[zoom]
+    return (y + 0.5) * deg - 90.0, (x + 0.5) * deg - 180.0
+
+
+GRID_SQL = """
+    SELECT
+      (cell_y + 0.5) * %(deg)s - 90 AS lat,
+      (cell_x + 0.5) * %(deg)s - 180 AS lon,
+      total_events,
+      conflict_events,
+      goldstein_sum / NULLIF(goldstein_n, 0) AS mean_goldstein
+    FROM (
+      SELECT
+        cell_y,
+        cell_x,
+        SUM(total_events) AS total_events,
+        SUM(conflict_events) AS conflict_events,
+        SUM(goldstein_sum) AS goldstein_sum,
+        SUM(goldstein_n) AS goldstein_n
+      FROM geo_grid_daily
+      WHERE zoom = %(z)s AND event_date BETWEEN %(s)s AND %(e)s
+      GROUP BY 1,2
+      ORDER BY total_events DESC
+      LIMIT %(n)s
+    ) c;
+"""
+
+
+def grid_params(start_i: int, end_i: int, zoom: int, max_cells: int = GEO_MAX_CELLS) -> Dict[str, object]:
+    return {"s": start_i, "e": end_i, "z": zoom, "deg": ZOOM_DEG[zoom], "n": max_cells}
+
+
+def load_grid(start_i: int, end_i: int, zoom: int,
+              query: Callable[..., pd.DataFrame] = gcm_data.qdf,
+              max_cells: int = GEO_MAX_CELLS) -> pd.DataFrame:
+    # one zoom level of the pyramid, summed over the date range
+    df = query(GRID_SQL, grid_params(start_i, end_i, zoom, max_cells), label="geo_grid")
+    df.attrs["zoom"] = zoom
+    return df
+
+
+def cell_id(y: int, x: int) -> int:
+    # same numbering as geo_cell()
+    return y * int(round(360.0 / ZOOM_DEG[SEARCH_ZOOM])) + x
+
+
+def bbox_cells(south: float, west: float, north: float, east: float) -> List[int]:
+    # west > east means the box crosses the antimeridian
+    y0, x0 = cell_of(max(south, -90.0), west, SEARCH_ZOOM)
+    y1, x1 = cell_of(min(north, 90.0), east, SEARCH_ZOOM)
+    ncols = int(round(360.0 / ZOOM_DEG[SEARCH_ZOOM]))
+    cols = list(range(x0, x1 + 1)) if x0 <= x1 else list(range(x0, ncols)) + list(range(0, x1 + 1))
+    return [cell_id(y, x) for y in range(y0, y1 + 1) for x in cols]
+
+
+def radius_bbox(lat: float, lon: float, km: float) -> Tuple[float, float, float, float]:
+    # smallest lat/long box holding the great circle of radius km around (lat, lon)
+    ang = km / EARTH_KM
+    dlat = math.degrees(ang)
+    south, north = lat - dlat, lat + dlat
+    if south <= -90.0 or north >= 90.0 or ang >= math.pi / 2:
+        # reaches a pole: every longitude
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    dlon = math.degrees(math.asin(min(1.0, math.sin(ang) / math.cos(math.radians(lat)))))
+    west, east = lon - dlon, lon + dlon
+    if dlon >= 180.0:
+        return south, -180.0, north, 180.0
+    if west < -180.0:
+        west += 360.0
+    if east > 180.0:
+        east -= 360.0
+    return south, west, north, east
+
+
+_SEARCH_COLS = """
+      globaleventid,
+      event_date,
+      source_actor,
+      target_actor,
+      cameo_code,
+      quad_class,
+      goldstein,
+      num_events,
+      action_geo_lat AS lat,
+      action_geo_long AS lon"""
+
+_SEARCH_WHERE = """
+    WHERE action_geo_lat IS NOT NULL AND action_geo_long IS NOT NULL
+      AND event_date BETWEEN %(s)s AND %(e)s"""
+
+# only when the candidate set is small enough to probe
+_CELL_FILTER = """
+      AND geo_cell(action_geo_lat, action_geo_long) = ANY(%(cells)s)"""
+
+_BBOX_FILTER = """
+      AND action_geo_lat BETWEEN %(south)s AND %(north)s
+      AND CASE WHEN %(west)s <= %(east)s
+               THEN action_geo_long BETWEEN %(west)s AND %(east)s
+               ELSE action_geo_long >= %(west)s OR action_geo_long <= %(east)s END"""
+
+
+def search_sql(kind: str, probe: bool) -> str:
+    cells = _CELL_FILTER if probe else ""
+    if kind == "radius":
+        return (
+            "SELECT * FROM (\n    SELECT" + _SEARCH_COLS + ",\n"
+            "      great_circle_km(%(lat)s, %(lon)s, action_geo_lat, action_geo_long) AS distance_km\n"
+            "    FROM gdelt_events" + _SEARCH_WHERE + cells + _BBOX_FILTER + "\n) r\n"
+            "WHERE distance_km <= %(km)s\n"
+            "ORDER BY distance_km, event_date DESC\n"
+            "LIMIT %(n)s;"
+        )
+    return (
+        "SELECT" + _SEARCH_COLS + "\n"
+        "FROM gdelt_events" + _SEARCH_WHERE + cells + _BBOX_FILTER + "\n"
+        "ORDER BY event_date DESC, globaleventid DESC\n"
+        "LIMIT %(n)s;"
+    )
+
+
+def _search(kind: str, params: Dict[str, object], query: Callable[..., pd.DataFrame]) -> pd.DataFrame:
+    cells = bbox_cells(params["south"], params["west"], params["north"], params["east"])
+    probe = len(cells) <= SEARCH_MAX_CELLS
+    if probe:
+        params["cells"] = cells
+    df = query(search_sql(kind, probe), params, label=f"geo_search:{kind}")
+    df.attrs["probed_cells"] = len(cells) if probe else 0
+    return df
+
+
+def search_bbox(south: float, west: float, north: float, east: float,
+                start_i: int, end_i: int, limit: int = SEARCH_LIMIT,
+                query: Callable[..., pd.DataFrame] = gcm_data.qdf) -> pd.DataFrame:
+    # events located inside the box, newest first; west > east wraps the antimeridian
+    if south > north:
+        raise ValueError("south must not be above north")
+    params = {"south": south, "west": west, "north": north, "east": east,
+              "s": start_i, "e": end_i, "n": limit}
+    return _search("bbox", params, query)
+
+
+def search_radius(lat: float, lon: float, km: float,
+                  start_i: int, end_i: int, limit: int = SEARCH_LIMIT,
+                  query: Callable[..., pd.DataFrame] = gcm_data.qdf) -> pd.DataFrame:
+    # events within km (great circle) of (lat, lon), nearest first
+    if km <= 0:
+        raise ValueError("radius must be positive")
+    south, west, north, east = radius_bbox(lat, lon, km)
+    params = {"lat": lat, "lon": lon, "km": km,
+              "south": south, "west": west, "north": north, "east": east,
+              "s": start_i, "e": end_i, "n": limit}
+    return _search("radius", params, query)
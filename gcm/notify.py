@@ -0,0 +1,122 @@
+# one debounced LISTEN view_updated subscriber per process
+import os
+import time
+import select
+import threading
+from typing import Callable, Dict, Optional, Set
+
+import psycopg2.errors
+import psycopg2.extensions
+
+from gcm import db
+
+
+NOTIFY_CHANNEL = "view_updated"
+
+# quiet time after the last notification before firing, and the longest a
+# change may wait while notifications keep coming (ingest storms)
+NOTIFY_MIN_DELAY = float(os.getenv("NOTIFY_MIN_DELAY_S", "1.0"))
+NOTIFY_MAX_DELAY = float(os.getenv("NOTIFY_MAX_DELAY_S", "5.0"))
+
+TICK_SECONDS = 0.25
+# how often an idle subscriber sends the coalesced trailing notifications
+FLUSH_SECONDS = 1.0
+
+# every (re)connect fires with this, since notifications sent while
+# disconnected are lost
+RECONNECT = "*"
+
+
+class DebouncedListener:
+    def __init__(self, on_fire: Callable[[Set[str]], None],
+                 min_delay: float = NOTIFY_MIN_DELAY, max_delay: float = NOTIFY_MAX_DELAY,
+                 channel: str = NOTIFY_CHANNEL):
+        self.on_fire = on_fire
+        self.min_delay = min_delay
+        self.max_delay = max(max_delay, min_delay)
+        self.channel = channel
+        self.connected = False
+        # bumped on every fire; sessions compare it to what they last saw
+        self.generation = 0
+        self.received = 0
+        self.fired = 0
+        self.last_fired: Optional[float] = None
+        self._pending: Set[str] = set()
+        self._first: Optional[float] = None
+        self._last: Optional[float] = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="gcm-notify", daemon=True)
+        self._thread.start()
+
+    def _fire(self):
+        with self._lock:
+            tables, self._pending = self._pending, set()
+            self._first = self._last = None
+        try:
+            self.on_fire(tables)
+        finally:
+            with self._lock:
+                self.generation += 1
+                self.fired += 1
+                self.last_fired = time.time()
+
+    def _due(self, now: float) -> bool:
+        with self._lock:
+            if not self._pending:
+                return False
+            return now - self._last >= self.min_delay or now - self._first >= self.max_delay
+
+    def _run(self):
+        while True:
+            conn = None
+            try:
+                conn = db.connect()
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                cur = conn.cursor()
+                cur.execute(f"LISTEN {self.channel};")
+                self.connected = True
+                with self._lock:
+                    self._pending.add(RECONNECT)
+                self._fire()
+                last_flush = time.monotonic()
+                flush = True
+                while True:
+                    if select.select([conn], [], [], TICK_SECONDS) != ([], [], []):
+                        conn.poll()
+                    now = time.monotonic()
+                    if conn.notifies:
+                        with self._lock:
+                            for n in conn.notifies:
+                                self._pending.add(n.payload)
+                            self.received += len(conn.notifies)
+                            self._first = self._first or now
+                            self._last = now
+                        conn.notifies.clear()
+                    elif flush and now - last_flush >= FLUSH_SECONDS:
+                        # changes the source held back (09-table-versions.sql)
+                        last_flush = now
+                        try:
+                            cur.execute("SELECT flush_view_notifications();")
+                        except psycopg2.errors.UndefinedFunction:
+                            flush = False  # database without coalescing
+                    if self._due(now):
+                        self._fire()
+            except Exception:
+                self.connected = False
+                time.sleep(1.0)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "connected": self.connected,
+                "received": self.received,
+                "fired": self.fired,
+                "pending": len(self._pending),
+                "generation": self.generation,
+            }
@@ -0,0 +1,304 @@
+# rebuild the flink results tables straight from gdelt_events: parallel
+# per-chunk INSERT ... SELECT into staging tables, all read at the consistent
+# point of a fresh CDC slot, then one transaction swaps them in and records
+# the LSN the streaming job resumes from. the job that resumes is the delta
+# job (flink/sql/run-deltas.sql): it adds signed changes onto the rebuilt
+# rows instead of upserting aggregates it never saw the start of
+import os
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import psycopg2.extras
+
+from gcm import anomaly, db
+from gcm.aggregates import AGGREGATES, Aggregate
+from gcm.reconcile import chunks
+from gcm.slot_monitor import SLOT_NAME
+
+
+REBUILD_CHUNK_DAYS = int(os.getenv("REBUILD_CHUNK_DAYS", "31"))
+REBUILD_WORKERS = int(os.getenv("REBUILD_WORKERS", "4"))
+# per index build on the staging tables
+REBUILD_MAINTENANCE_MEM = os.getenv("REBUILD_MAINTENANCE_MEM", "256MB")
+# the swap gives up rather than queue behind a long dashboard query
+SWAP_LOCK_TIMEOUT_MS = int(os.getenv("REBUILD_LOCK_TIMEOUT_MS", "10000"))
+
+STAGING = "{}_rebuild"
+# running totals of the delta job (postgres/init/11-delta-sinks.sql)
+DELTA = "{}_delta"
+# index and constraint names are schema-wide, so staging carries a suffix until the swap
+STAGED_NAME = "{}_rb"
+
+PUBLICATION_NAME = os.getenv("PUBLICATION_NAME", "gdelt_flink_pub")
+DELTA_PUBLICATION_NAME = os.getenv("DELTA_PUBLICATION_NAME", "gdelt_flink_delta_pub")
+
+# derived tables rebuilt from scratch after the swap; their incremental
+# refreshes track xmin and would miss days the rebuild dropped
+DERIVED = {
+    "dyad_interactions": ("SELECT refresh_distinct_sketches(true);",),
+    "daily_event_volume_by_quadclass": ("SELECT refresh_rolling_metrics(true);",),
+    "top_actors": ("SELECT refresh_rolling_metrics(true);",),
+}
+
+
+@dataclass
+class TableDDL:
+    # what a renamed-in table has to get back: index-backed constraints,
+    # plain indexes and triggers (LIKE copies columns, defaults and checks)
+    constraints: List[Tuple[str, str]] = field(default_factory=list)
+    indexes: List[Tuple[str, str]] = field(default_factory=list)
+    triggers: List[str] = field(default_factory=list)
+
+
+@dataclass
+class RebuildResult:
+    tables: List[str]
+    slot: str
+    resume_lsn: str
+    start: Optional[int] = None
+    end: Optional[int] = None
+    rows: Dict[str, int] = field(default_factory=dict)
+    load_seconds: float = 0.0
+    index_seconds: float = 0.0
+    swap_seconds: float = 0.0
+    seconds: float = 0.0
+
+
+def table_ddl(conn, table: str) -> TableDDL:
+    ddl = TableDDL()
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'x') ORDER BY conname;
+        """, (table,))
+        ddl.constraints = cur.fetchall()
+        cur.execute("""
+            SELECT c.relname, pg_get_indexdef(i.indexrelid) FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = %s::regclass
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint k WHERE k.conindid = i.indexrelid)
+            ORDER BY c.relname;
+        """, (table,))
+        ddl.indexes = cur.fetchall()
+        cur.execute("""
+            SELECT pg_get_triggerdef(oid) FROM pg_trigger
+            WHERE tgrelid = %s::regclass AND NOT tgisinternal ORDER BY tgname;
+        """, (table,))
+        ddl.triggers = [r[0] for r in cur.fetchall()]
+    conn.rollback()
+    return ddl
+
+
+def create_slot(slot: str):
+    # the slot's consistent point is the resume lsn, and the snapshot it
+    # exports sees exactly the changes before it. the snapshot lives until the
+    # replication connection runs anything else, so the caller keeps it open
+    conn = db.connect()
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1 FROM pg_replication_slots WHERE slot_name = %s;", (slot,))
+        if cur.fetchone():
+            conn.close()
+            raise RuntimeError(f"slot {slot!r} exists; stop flink and run scripts/reset-cdc.sh first")
+        # same as 02-publication.sql and 11-delta-sinks.sql; reset-cdc.sh drops the first
+        cur.execute(f"""
+            DO $$
+            BEGIN
+              IF NOT EXISTS (SELECT 1 FROM pg_publication WHERE pubname = '{PUBLICATION_NAME}') THEN
+                CREATE PUBLICATION {PUBLICATION_NAME} FOR TABLE public.gdelt_events
+                  WITH (publish_via_partition_root = true);
+              END IF;
+              IF NOT EXISTS (SELECT 1 FROM pg_publication WHERE pubname = '{DELTA_PUBLICATION_NAME}') THEN
+                CREATE PUBLICATION {DELTA_PUBLICATION_NAME} FOR TABLE public.gdelt_event_changes
+                  WITH (publish = 'insert');
+              END IF;
+            END$$;
+        """)
+        # log signed changes for the delta job. committed before the slot
+        # exists, so whatever commits after its consistent point is logged
+        cur.execute("SELECT gdelt_change_log(true);")
+    conn.commit()
+    conn.close()
+    repl = db.connect(connection_factory=psycopg2.extras.LogicalReplicationConnection)
+    with repl.cursor() as cur:
+        cur.execute(f"CREATE_REPLICATION_SLOT {slot} LOGICAL pgoutput EXPORT_SNAPSHOT")
+        _, lsn, snapshot, _ = cur.fetchone()
+    return repl, lsn, snapshot
+
+
+def _in_snapshot(cur, snapshot: str):
+    cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ;")
+    cur.execute("SET TRANSACTION SNAPSHOT %s;", (snapshot,))
+
+
+def _bounds(conn, snapshot: str) -> Tuple[Optional[int], Optional[int]]:
+    with conn.cursor() as cur:
+        _in_snapshot(cur, snapshot)
+        cur.execute("SELECT MIN(event_date), MAX(event_date) FROM gdelt_events;")
+        lo, hi = cur.fetchone()
+    conn.rollback()
+    return lo, hi
+
+
+def _create_staging(conn, table: str):
+    # no indexes while loading; they are built once, after the last chunk
+    staging = STAGING.format(table)
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {staging};")
+        cur.execute(f"CREATE TABLE {staging} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS);")
+    conn.commit()
+
+
+def _load_chunk(conn, a: Aggregate, lo: int, hi: int, snapshot: str) -> int:
+    cols = ", ".join(a.columns)
+    with conn.cursor() as cur:
+        _in_snapshot(cur, snapshot)
+        cur.execute(f"INSERT INTO {STAGING.format(a.table)} ({cols}) SELECT {cols} FROM ({a.raw}) x;",
+                    {"lo": lo, "hi": hi})
+        n = cur.rowcount
+    conn.commit()
+    return n
+
+
+def _index_staging(conn, table: str, ddl: TableDDL):
+    staging = STAGING.format(table)
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL maintenance_work_mem = %s;", (REBUILD_MAINTENANCE_MEM,))
+        for name, definition in ddl.constraints:
+            cur.execute(f"ALTER TABLE {staging} ADD CONSTRAINT {STAGED_NAME.format(name)} {definition};")
+        for name, definition in ddl.indexes:
+            cur.execute(definition.replace(f" {name} ON public.{table} ",
+                                           f" {STAGED_NAME.format(name)} ON public.{staging} ", 1))
+    conn.commit()
+    with conn.cursor() as cur:
+        cur.execute(f"ANALYZE {staging};")
+    conn.commit()
+
+
+def _swap(conn, result: RebuildResult, ddls: Dict[str, TableDDL], started: float):
+    # one transaction: readers see all old tables or all new ones. triggers go
+    # back on after the rows are in, so the swap itself fires none of them
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL lock_timeout = %s;", (SWAP_LOCK_TIMEOUT_MS,))
+        for t in result.tables:
+            ddl = ddls[t]
+            cur.execute(f"DROP TABLE {t};")
+            cur.execute(f"ALTER TABLE {STAGING.format(t)} RENAME TO {t};")
+            for name, _ in ddl.constraints:
+                cur.execute(f"ALTER TABLE {t} RENAME CONSTRAINT {STAGED_NAME.format(name)} TO {name};")
+            for name, _ in ddl.indexes:
+                cur.execute(f"ALTER INDEX {STAGED_NAME.format(name)} RENAME TO {name};")
+            for definition in ddl.triggers:
+                cur.execute(definition)
+            # the whole table changed: readers of the version log reload it
+            cur.execute("SELECT notify_coalesced(%s, NULL);", (t,))
+        # the delta job on the new slot counts from zero. what the last one
+        # added is in the tables already (or was replaced by the rebuild).
+        # truncate fires no row triggers, so nothing is applied twice
+        cur.execute(f"TRUNCATE {', '.join(DELTA.format(t) for t in AGGREGATES)};")
+        cur.execute("""
+            INSERT INTO aggregate_rebuilds
+              (started_at, tables, slot_name, resume_lsn, min_event_date, max_event_date, total_rows, seconds)
+            VALUES (to_timestamp(%s), %s, %s, %s, %s, %s, %s, %s);
+        """, (started, result.tables, result.slot, result.resume_lsn, result.start, result.end,
+              sum(result.rows.values()), time.time() - started))
+    conn.commit()
+
+
+def drop_staging(tables: Iterable[str]):
+    conn = db.connect()
+    try:
+        with conn.cursor() as cur:
+            for t in tables:
+                cur.execute(f"DROP TABLE IF EXISTS {STAGING.format(t)};")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+async def _load(adb: db.AsyncDB, result: RebuildResult, ranges: List[Tuple[int, int]], snapshot: str,
+                progress: Optional[Callable[[int, int], None]]):
+    # chunk-major, like reconcile: concurrent workers read the same slice of
+    # gdelt_events, so it comes from disk once for all tables
+    aggs = [AGGREGATES[t] for t in result.tables]
+    jobs = [(a, lo, hi) for lo, hi in ranges for a in aggs]
+    done = 0
+
+    async def one(a: Aggregate, lo: int, hi: int):
+        return a, await adb.run(lambda conn: _load_chunk(conn, a, lo, hi, snapshot))
+
+    for next_done in asyncio.as_completed([one(*j) for j in jobs]):
+        a, n = await next_done
+        result.rows[a.table] = result.rows.get(a.table, 0) + n
+        done += 1
+        if progress is not None:
+            progress(done, len(jobs))
+
+
+async def _index(adb: db.AsyncDB, tables: List[str], ddls: Dict[str, TableDDL]):
+    await asyncio.gather(*(adb.run(lambda conn, t=t: _index_staging(conn, t, ddls[t])) for t in tables))
+
+
+def rebuild(tables: Optional[Iterable[str]] = None, slot: str = SLOT_NAME,
+            chunk_days: int = REBUILD_CHUNK_DAYS, workers: int = REBUILD_WORKERS,
+            progress: Optional[Callable[[int, int], None]] = None) -> RebuildResult:
+    tables = list(tables or AGGREGATES)
+    for t in tables:
+        if t not in AGGREGATES:
+            raise ValueError(f"unknown results table {t!r}")
+    started, t0 = time.time(), time.perf_counter()
+    conn = db.connect()
+    adb = db.AsyncDB(min_conn=1, max_conn=workers, statement_timeout_ms=0)
+    repl = None
+    try:
+        ddls = {t: table_ddl(conn, t) for t in tables}
+        for t in tables:
+            _create_staging(conn, t)
+        repl, lsn, snapshot = create_slot(slot)
+        result = RebuildResult(tables, slot, lsn)
+        result.start, result.end = _bounds(conn, snapshot)
+        if result.start is not None:
+            adb.call(_load(adb, result, chunks(result.start, result.end, chunk_days), snapshot, progress))
+        # every load transaction has imported the snapshot by now
+        repl.close()
+        repl = None
+        t1 = time.perf_counter()
+        result.load_seconds = t1 - t0
+        adb.call(_index(adb, tables, ddls))
+        t2 = time.perf_counter()
+        result.index_seconds = t2 - t1
+        _swap(conn, result, ddls, started)
+        result.swap_seconds = time.perf_counter() - t2
+    except BaseException:
+        conn.rollback()
+        # the slot stays: drop it with reset-cdc.sh before retrying
+        drop_staging(tables)
+        raise
+    finally:
+        if repl is not None:
+            repl.close()
+        adb.close()
+        conn.close()
+    result.seconds = time.perf_counter() - t0
+    return result
+
+
+def refresh_derived(tables: Iterable[str]) -> List[str]:
+    # sketches, rolling windows and the anomaly baselines read the swapped tables
+    done: List[str] = []
+    conn = db.connect()
+    try:
+        with conn.cursor() as cur:
+            for t in tables:
+                for stmt in DERIVED.get(t, ()):
+                    if stmt not in done:
+                        cur.execute(stmt)
+                        done.append(stmt)
+        conn.commit()
+        if {"daily_event_volume_by_quadclass", "top_actors"} & set(tables):
+            anomaly.reset(conn)
+            done.append("anomaly reset")
+    finally:
+        conn.close()
+    return done
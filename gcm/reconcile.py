@@ -0,0 +1,236 @@
+# check the flink results tables against gdelt_events: order-independent
+# per-day checksums computed chunk by chunk in parallel on both sides, then
+# a group-level diff of only the days whose checksums disagree
+import os
+import time
+import asyncio
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from gcm import db
+from gcm.data import int_yyyymmdd
+from gcm.aggregates import AGGREGATES, Aggregate
+
+
+# days of the event_date domain per checksum query
+RECONCILE_CHUNK_DAYS = int(os.getenv("RECONCILE_CHUNK_DAYS", "31"))
+RECONCILE_WORKERS = int(os.getenv("RECONCILE_WORKERS", "4"))
+# doubles enter checksums rounded to FLOAT_DIGITS; group diffs allow FLOAT_TOL
+FLOAT_DIGITS = 6
+FLOAT_TOL = 1e-6
+# differing groups listed per bad day
+MAX_GROUPS = 20
+
+
+def _hashed(a: Aggregate) -> str:
+    # one bigint per group over keys and values (the row's text form, nulls
+    # included); summed, it doesn't depend on row order
+    cols = list(a.keys + a.exact) + [f"round({c}::numeric, {FLOAT_DIGITS})" for c in a.approx]
+    return f"hashtextextended(ROW({', '.join(cols)})::text, 0)::numeric"
+
+
+def _table_rows(a: Aggregate) -> str:
+    return f"SELECT {', '.join(a.columns)} FROM {a.table} WHERE event_date BETWEEN %(lo)s AND %(hi)s"
+
+
+def checksum_sql(a: Aggregate, rows: str) -> str:
+    return f"""
+        SELECT event_date, COUNT(*) AS groups, SUM({_hashed(a)}) AS checksum
+        FROM ({rows}) r
+        GROUP BY event_date
+    """
+
+
+def diff_sql(a: Aggregate) -> str:
+    # full join on the key; a side with no row shows up as NULL present
+    differs = [f"r.{c} IS DISTINCT FROM t.{c}" for c in a.exact]
+    differs += [f"(r.{c} IS NULL) <> (t.{c} IS NULL) OR abs(r.{c} - t.{c}) > {FLOAT_TOL}" for c in a.approx]
+    values = [f"r.{c} AS raw_{c}, t.{c} AS table_{c}" for c in a.exact + a.approx]
+    return f"""
+        SELECT {', '.join(a.keys)},
+               r.present IS NOT NULL AS in_raw, t.present IS NOT NULL AS in_table,
+               {', '.join(values)},
+               COUNT(*) OVER () AS n_bad
+        FROM (SELECT *, TRUE AS present FROM ({a.raw}) x) r
+        FULL JOIN (SELECT *, TRUE AS present FROM ({_table_rows(a)}) x) t USING ({', '.join(a.keys)})
+        WHERE r.present IS NULL OR t.present IS NULL OR {' OR '.join(differs) or 'FALSE'}
+        ORDER BY {', '.join(a.keys)}
+        LIMIT %(n)s
+    """
+
+
+def _day(i: int) -> date:
+    return date(i // 10000, i // 100 % 100, i % 100)
+
+
+def chunks(start_i: int, end_i: int, days: int = RECONCILE_CHUNK_DAYS) -> List[Tuple[int, int]]:
+    # calendar ranges, so chunks hold about the same number of event days
+    out = []
+    d, end = _day(start_i), _day(end_i)
+    while d <= end:
+        hi = min(d + timedelta(days=days - 1), end)
+        out.append((int_yyyymmdd(d), int_yyyymmdd(hi)))
+        d = hi + timedelta(days=1)
+    return out
+
+
+@dataclass
+class TableReport:
+    table: str
+    chunks: int = 0
+    days: int = 0
+    raw_groups: int = 0
+    table_groups: int = 0
+    bad_days: List[int] = field(default_factory=list)
+    # event_date -> (differing groups on that day, first MAX_GROUPS of them)
+    diffs: Dict[int, Tuple[int, pd.DataFrame]] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.bad_days
+
+
+@dataclass
+class Report:
+    start: int
+    end: int
+    snapshot: Optional[str]
+    seconds: float = 0.0
+    tables: Dict[str, TableReport] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return all(t.ok for t in self.tables.values())
+
+
+def _in_snapshot(cur, snapshot: Optional[str]):
+    # workers read what the coordinator saw when it exported the snapshot
+    cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;")
+    if snapshot:
+        cur.execute("SET TRANSACTION SNAPSHOT %s;", (snapshot,))
+
+
+def _chunk_checksums(conn, a: Aggregate, lo: int, hi: int, snapshot: Optional[str]):
+    params = {"lo": lo, "hi": hi}
+    with conn.cursor() as cur:
+        _in_snapshot(cur, snapshot)
+        cur.execute(checksum_sql(a, a.raw), params)
+        raw = {d: (n, s) for d, n, s in cur.fetchall()}
+        cur.execute(checksum_sql(a, _table_rows(a)), params)
+        table = {d: (n, s) for d, n, s in cur.fetchall()}
+    return raw, table
+
+
+def _day_diff(conn, a: Aggregate, day: int, snapshot: Optional[str], max_groups: int):
+    with conn.cursor() as cur:
+        _in_snapshot(cur, snapshot)
+        cur.execute(diff_sql(a), {"lo": day, "hi": day, "n": max_groups})
+        cols = [c.name for c in cur.description]
+        df = pd.DataFrame(cur.fetchall(), columns=cols)
+    n = int(df["n_bad"].iloc[0]) if not df.empty else 0
+    return n, df.drop(columns="n_bad")
+
+
+def bounds(conn, tables: Iterable[str]) -> Tuple[Optional[int], Optional[int]]:
+    # event_date range over raw and the results; geo_grid_daily's key leads
+    # with zoom, and zoom 0 covers every day the finer levels have
+    parts = ["SELECT MIN(event_date) AS lo, MAX(event_date) AS hi FROM gdelt_events"]
+    for t in tables:
+        where = " WHERE zoom = 0" if "zoom" in AGGREGATES[t].keys else ""
+        parts.append(f"SELECT MIN(event_date), MAX(event_date) FROM {t}{where}")
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT MIN(lo), MAX(hi) FROM ({' UNION ALL '.join(parts)}) b;")
+        lo, hi = cur.fetchone()
+    conn.rollback()
+    return lo, hi
+
+
+async def _verify(adb: db.AsyncDB, report: Report, aggs: List[Aggregate], ranges: List[Tuple[int, int]],
+                  max_groups: int, progress: Optional[Callable[[int, int], None]]):
+    # chunk-major order: the workers scan the same slice of gdelt_events at
+    # about the same time, so it is read from disk once for all tables
+    jobs = [(a, lo, hi) for lo, hi in ranges for a in aggs]
+    done = 0
+
+    async def one(a: Aggregate, lo: int, hi: int):
+        raw, table = await adb.run(lambda conn: _chunk_checksums(conn, a, lo, hi, report.snapshot))
+        return a, raw, table
+
+    bad: List[Tuple[Aggregate, int]] = []
+    for next_done in asyncio.as_completed([one(*j) for j in jobs]):
+        a, raw, table = await next_done
+        tr = report.tables[a.table]
+        tr.chunks += 1
+        tr.days += len(raw.keys() | table.keys())
+        tr.raw_groups += sum(n for n, _ in raw.values())
+        tr.table_groups += sum(n for n, _ in table.values())
+        for d in sorted(raw.keys() | table.keys()):
+            if raw.get(d) != table.get(d):
+                tr.bad_days.append(d)
+                bad.append((a, d))
+        done += 1
+        if progress is not None:
+            progress(done, len(jobs))
+
+    await _drill(adb, report, bad, report.snapshot, max_groups)
+
+
+async def _drill(adb: db.AsyncDB, report: Report, bad: List[Tuple[Aggregate, int]],
+                 snapshot: Optional[str], max_groups: int):
+    async def one(a: Aggregate, d: int):
+        n, df = await adb.run(lambda conn: _day_diff(conn, a, d, snapshot, max_groups))
+        report.tables[a.table].diffs[d] = (n, df)
+
+    await asyncio.gather(*(one(a, d) for a, d in bad))
+    for tr in report.tables.values():
+        # a checksum can differ only by float rounding; drop days with no real diff
+        tr.bad_days = sorted(d for d in set(tr.bad_days) if tr.diffs[d][0] > 0)
+        tr.diffs = {d: tr.diffs[d] for d in tr.bad_days}
+
+
+def reconcile(tables: Optional[Iterable[str]] = None, start_i: Optional[int] = None, end_i: Optional[int] = None,
+              chunk_days: int = RECONCILE_CHUNK_DAYS, workers: int = RECONCILE_WORKERS,
+              max_groups: int = MAX_GROUPS, progress: Optional[Callable[[int, int], None]] = None) -> Report:
+    tables = list(tables or AGGREGATES)
+    for t in tables:
+        if t not in AGGREGATES:
+            raise ValueError(f"unknown results table {t!r}")
+    t0 = time.perf_counter()
+    # the coordinator holds the exported snapshot open until every worker is done
+    coord = db.connect()
+    adb = db.AsyncDB(min_conn=1, max_conn=workers, statement_timeout_ms=0)
+    try:
+        lo, hi = bounds(coord, tables)
+        start_i = start_i if start_i is not None else lo
+        end_i = end_i if end_i is not None else hi
+        coord.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        with coord.cursor() as cur:
+            cur.execute("SELECT pg_export_snapshot();")
+            snapshot = cur.fetchone()[0]
+        report = Report(start_i, end_i, snapshot, tables={t: TableReport(t) for t in tables})
+        if start_i is not None and end_i is not None and start_i <= end_i:
+            aggs = [AGGREGATES[t] for t in tables]
+            adb.call(_verify(adb, report, aggs, chunks(start_i, end_i, chunk_days), max_groups, progress))
+    finally:
+        adb.close()
+        coord.close()
+    report.seconds = time.perf_counter() - t0
+    return report
+
+
+def recheck(report: Report, workers: int = RECONCILE_WORKERS, max_groups: int = MAX_GROUPS) -> Report:
+    # diff the bad days again on current data. flink trails gdelt_events by
+    # its checkpoint interval, so a day that is clean now was only in flight
+    t0 = time.perf_counter()
+    bad = [(AGGREGATES[t], d) for t, tr in report.tables.items() for d in tr.bad_days]
+    adb = db.AsyncDB(min_conn=1, max_conn=workers, statement_timeout_ms=0)
+    try:
+        adb.call(_drill(adb, report, bad, None, max_groups))
+    finally:
+        adb.close()
+    report.snapshot = None
+    report.seconds += time.perf_counter() - t0
+    return report
@@ -0,0 +1,104 @@
+# bounded, memory-accounted cache for dashboard frame sets
+import os
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+import pandas as pd
+
+from gcm.tracing import frame_bytes
+
+
+RESULT_CACHE_ENTRIES = int(os.getenv("RESULT_CACHE_ENTRIES", "32"))
+RESULT_CACHE_BYTES = int(os.getenv("RESULT_CACHE_MB", "256")) * 1024 * 1024
+
+
+def result_bytes(value: Any) -> int:
+    if isinstance(value, pd.DataFrame):
+        return frame_bytes(value)
+    if isinstance(value, dict):
+        return sum(result_bytes(v) for v in value.values())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return 0
+
+
+@dataclass
+class _Entry:
+    value: Any
+    version: int
+    nbytes: int
+    created: float
+
+
+class ResultCache:
+    # one live entry per key at the current data version. bump() moves the
+    # version forward and drops everything older: no session can hit it again
+    def __init__(self, max_entries: int = RESULT_CACHE_ENTRIES, max_bytes: int = RESULT_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version = 0
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = {"superseded": 0, "lru": 0, "bytes": 0}
+        self.uncacheable = 0
+
+    def _drop(self, key: Hashable, reason: str):
+        e = self._entries.pop(key)
+        self._bytes -= e.nbytes
+        self.evicted[reason] += 1
+
+    def bump(self) -> int:
+        with self._lock:
+            self.version += 1
+            for key in [k for k, e in self._entries.items() if e.version < self.version]:
+                self._drop(key, "superseded")
+            return self.version
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any]) -> Tuple[Any, bool]:
+        with self._lock:
+            version = self.version
+            e = self._entries.get(key)
+            if e is not None and e.version == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return e.value, True
+            self.misses += 1
+
+        value = load()
+        nbytes = result_bytes(value)
+
+        with self._lock:
+            if version != self.version:
+                # data changed while loading; serve it but don't keep it
+                return value, False
+            if nbytes > self.max_bytes:
+                self.uncacheable += 1
+                return value, False
+            if key in self._entries:
+                self._drop(key, "superseded")
+            self._entries[key] = _Entry(value, version, nbytes, time.time())
+            self._bytes += nbytes
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)), "lru")
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)), "bytes")
+        return value, False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted": dict(self.evicted),
+                "uncacheable": self.uncacheable,
+            }
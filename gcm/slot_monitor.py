@@ -0,0 +1,167 @@
+# cdc replication slot lag + wal retention monitor
+import os
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Optional, Deque, List, Callable
+
+import pandas as pd
+
+from gcm.data import get_db_conn
+
+
+SLOT_NAME = os.getenv("SLOT_NAME", "gdelt_flink_slot")
+
+# alarm thresholds (0 disables a check)
+LAG_ALARM_BYTES = int(os.getenv("SLOT_LAG_ALARM_BYTES", str(256 * 1024 * 1024)))
+LAG_ALARM_SECONDS = float(os.getenv("SLOT_LAG_ALARM_SECONDS", "300"))
+WAL_ALARM_BYTES = int(os.getenv("SLOT_WAL_ALARM_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+SLOT_SQL = """
+    SELECT
+      s.slot_name,
+      s.active,
+      pg_wal_lsn_diff(pg_current_wal_lsn(), '0/0')::bigint AS current_lsn_bytes,
+      pg_wal_lsn_diff(pg_current_wal_lsn(), s.confirmed_flush_lsn)::bigint AS flush_lag_bytes,
+      pg_wal_lsn_diff(pg_current_wal_lsn(), s.restart_lsn)::bigint AS retained_wal_bytes,
+      EXTRACT(EPOCH FROM r.flush_lag)::double precision AS reported_lag_seconds,
+      r.state AS replication_state
+    FROM pg_replication_slots s
+    LEFT JOIN pg_stat_replication r ON r.pid = s.active_pid
+    WHERE s.slot_name = %(slot)s;
+"""
+
+INSERT_SQL = """
+    INSERT INTO cdc_slot_lag
+      (sample_ts, slot_name, active, flush_lag_bytes, retained_wal_bytes, lag_seconds, alarm)
+    VALUES (to_timestamp(%s), %s, %s, %s, %s, %s, %s);
+"""
+
+
+@dataclass
+class SlotSample:
+    ts: float
+    slot_name: str
+    exists: bool
+    active: bool
+    current_lsn_bytes: int
+    flush_lag_bytes: int
+    retained_wal_bytes: int
+    lag_seconds: Optional[float]
+    replication_state: Optional[str]
+    alarm: Optional[str] = None
+
+
+def format_bytes(n: Optional[float]) -> str:
+    if n is None:
+        return "—"
+    if abs(n) >= 1024 ** 3:
+        return f"{n / 1024 ** 3:.1f}GB"
+    elif abs(n) >= 1024 ** 2:
+        return f"{n / 1024 ** 2:.1f}MB"
+    elif abs(n) >= 1024:
+        return f"{n / 1024:.1f}KB"
+    return f"{n:.0f}B"
+
+
+class SlotMonitor:
+    def __init__(self, slot_name: str = SLOT_NAME, history: int = 720,
+                 lag_alarm_bytes: int = LAG_ALARM_BYTES,
+                 lag_alarm_seconds: float = LAG_ALARM_SECONDS,
+                 wal_alarm_bytes: int = WAL_ALARM_BYTES,
+                 connect: Callable = get_db_conn):
+        self.slot_name = slot_name
+        self.samples: Deque[SlotSample] = deque(maxlen=history)
+        self.lag_alarm_bytes = lag_alarm_bytes
+        self.lag_alarm_seconds = lag_alarm_seconds
+        self.wal_alarm_bytes = wal_alarm_bytes
+        self.connect = connect
+        self._lock = threading.Lock()
+
+    def _wal_rate(self, cur_ts: float, cur_lsn: int) -> Optional[float]:
+        # bytes/sec of wal generated over the retained history
+        first = next((s for s in self.samples if s.exists), None)
+        if first is None:
+            return None
+        dt = cur_ts - first.ts
+        if dt <= 0 or cur_lsn <= first.current_lsn_bytes:
+            return None
+        return (cur_lsn - first.current_lsn_bytes) / dt
+
+    def _estimate_lag_seconds(self, ts: float, current_lsn: int, flush_lag: int,
+                              reported: Optional[float]) -> Optional[float]:
+        if reported is not None:
+            return reported
+        if flush_lag <= 0:
+            return 0.0
+        # find when wal was last at the slot's confirmed position
+        confirmed = current_lsn - flush_lag
+        for s in self.samples:
+            if s.exists and s.current_lsn_bytes >= confirmed:
+                return ts - s.ts
+        rate = self._wal_rate(ts, current_lsn)
+        return flush_lag / rate if rate else None
+
+    def _check_alarm(self, s: SlotSample) -> Optional[str]:
+        if not s.exists:
+            return f"slot {s.slot_name} missing"
+        reasons = []
+        if self.lag_alarm_bytes and s.flush_lag_bytes >= self.lag_alarm_bytes:
+            reasons.append(f"flush lag {format_bytes(s.flush_lag_bytes)}")
+        if self.lag_alarm_seconds and s.lag_seconds is not None and s.lag_seconds >= self.lag_alarm_seconds:
+            reasons.append(f"lag {s.lag_seconds:,.0f}s")
+        if self.wal_alarm_bytes and s.retained_wal_bytes >= self.wal_alarm_bytes:
+            reasons.append(f"retained wal {format_bytes(s.retained_wal_bytes)}")
+        if not s.active and s.flush_lag_bytes > 0:
+            reasons.append("slot inactive")
+        return ", ".join(reasons) or None
+
+    def sample(self) -> SlotSample:
+        conn = self.connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(SLOT_SQL, {"slot": self.slot_name})
+                row = cur.fetchone()
+        finally:
+            conn.close()
+
+        ts = time.time()
+        with self._lock:
+            if row is None:
+                s = SlotSample(ts, self.slot_name, False, False, 0, 0, 0, None, None)
+            else:
+                _, active, current_lsn, flush_lag, retained, reported, state = row
+                flush_lag = int(flush_lag or 0)
+                lag_s = self._estimate_lag_seconds(ts, int(current_lsn), flush_lag, reported)
+                s = SlotSample(ts, self.slot_name, True, bool(active), int(current_lsn),
+                               flush_lag, int(retained or 0), lag_s, state)
+            s.alarm = self._check_alarm(s)
+            self.samples.append(s)
+        return s
+
+    def latest(self, max_age: float = 5.0) -> SlotSample:
+        # reuse a recent sample so many sessions share one query
+        with self._lock:
+            last = self.samples[-1] if self.samples else None
+        if last is not None and time.time() - last.ts < max_age:
+            return last
+        return self.sample()
+
+    def history(self) -> pd.DataFrame:
+        with self._lock:
+            rows: List[dict] = [asdict(s) for s in self.samples]
+        df = pd.DataFrame(rows)
+        if not df.empty:
+            df["sample_time"] = pd.to_datetime(df["ts"], unit="s")
+        return df
+
+    def persist(self, s: SlotSample):
+        conn = self.connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(INSERT_SQL, (s.ts, s.slot_name, s.active, s.flush_lag_bytes,
+                                         s.retained_wal_bytes, s.lag_seconds, s.alarm))
+            conn.commit()
+        finally:
+            conn.close()
@@ -0,0 +1,441 @@
+# columnar snapshots of the results tables for warm dashboard starts
+import os
+import json
+import time
+import threading
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Tuple, Callable, Hashable
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from gcm import tracing, downsample
+from gcm import data as gcm_data
+from gcm.data import get_db_conn, frame_params, finish_frame, compact
+from gcm.db import AsyncDB
+
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_COMPRESSION = os.getenv("SNAPSHOT_COMPRESSION", "lz4")  # lz4, zstd or none (zero-copy mmap)
+REFRESH_SECONDS = float(os.getenv("SNAPSHOT_REFRESH_SECONDS", "1.0"))
+
+MANIFEST = "manifest.json"
+
+# table -> (columns + dtypes, primary key)
+TABLES: Dict[str, Tuple[Dict[str, str], List[str]]] = {
+    "daily_event_volume_by_quadclass": (
+        {"event_date": "int32", "quad_class": "int16", "total_events": "int64",
+         "total_articles": "int64", "avg_goldstein": "float64"},
+        ["event_date", "quad_class"],
+    ),
+    "dyad_interactions": (
+        {"event_date": "int32", "source_actor_id": "int32", "target_actor_id": "int32",
+         "total_events": "int64", "avg_goldstein": "float64"},
+        ["event_date", "source_actor_id", "target_actor_id"],
+    ),
+    "top_actors": (
+        {"event_date": "int32", "source_actor_id": "int32", "total_events": "int64",
+         "total_articles": "int64", "avg_goldstein": "float64"},
+        ["event_date", "source_actor_id"],
+    ),
+    "daily_cameo_metrics": (
+        {"event_date": "int32", "cameo_id": "int16", "total_events": "int64",
+         "total_articles": "int64", "avg_goldstein": "float64"},
+        ["event_date", "cameo_id"],
+    ),
+    "actor_dim": (
+        {"actor_id": "int32", "actor_code": "object", "is_iso3": "bool"},
+        ["actor_id"],
+    ),
+    "cameo_dim": (
+        {"cameo_id": "int16", "cameo_code": "object"},
+        ["cameo_id"],
+    ),
+}
+
+# flink deletes aggregate rows when a group empties; the dims only grow
+APPEND_ONLY = {"actor_dim", "cameo_dim"}
+
+# where the export stands: snapshot xmin and wal lsn, for the manifest
+WATERMARK_SQL = """
+    SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint AS xmin,
+           pg_snapshot_xmax(pg_current_snapshot())::text::bigint AS xmax,
+           pg_current_wal_lsn()::text AS lsn;
+"""
+
+
+def _select_sql(table: str) -> str:
+    cols, keys = TABLES[table]
+    return f"SELECT {', '.join(cols)} FROM {table} ORDER BY {', '.join(keys)}"
+
+
+def _days_sql(table: str) -> str:
+    cols, _ = TABLES[table]
+    return f"SELECT {', '.join(cols)} FROM {table} WHERE event_date = ANY(%(d)s)"
+
+
+# days changed since a version (09-table-versions.sql); null days when the
+# version log can't say and the table has to be reloaded
+CHANGES_SQL = "SELECT days FROM table_changes_since(%(t)s, %(v)s);"
+
+
+def _typed(table: str, df: pd.DataFrame) -> pd.DataFrame:
+    cols, _ = TABLES[table]
+    return df.astype(cols)[list(cols)]
+
+
+def _read(conn, sql: str, params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        names = [c.name for c in cur.description]
+        return pd.DataFrame(cur.fetchall(), columns=names)
+
+
+def _begin_snapshot(conn) -> Dict[str, Any]:
+    conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    with conn.cursor() as cur:
+        cur.execute(WATERMARK_SQL)
+        xmin, xmax, lsn = cur.fetchone()
+    return {"xmin": int(xmin), "xmax": int(xmax), "lsn": lsn}
+
+
+def _versions(conn) -> Dict[str, Optional[int]]:
+    # table_versions counters of the results tables; the version moves in the
+    # writer's own transaction, so it matches the rows this snapshot sees
+    tables = [t for t in TABLES if t not in APPEND_ONLY]
+    df = _read(conn, gcm_data.VERSIONS_SQL, {"t": tables})
+    got = dict(zip(df["table_name"], df["version"])) if not df.empty else {}
+    return {t: int(got[t]) if t in got else None for t in tables}
+
+
+def read_manifest(snapshot_dir: str = SNAPSHOT_DIR) -> Optional[Dict[str, Any]]:
+    path = os.path.join(snapshot_dir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def export_snapshot(snapshot_dir: str = SNAPSHOT_DIR, compression: str = SNAPSHOT_COMPRESSION,
+                    connect: Callable = get_db_conn) -> Dict[str, Any]:
+    os.makedirs(snapshot_dir, exist_ok=True)
+    codec = None if compression == "none" else compression
+
+    conn = connect()
+    try:
+        # one repeatable-read transaction so every file reflects the same watermark
+        wm = _begin_snapshot(conn)
+        versions = _versions(conn)
+        files = {}
+        for table in TABLES:
+            t0 = time.perf_counter()
+            df = _typed(table, _read(conn, _select_sql(table)))
+            at = pa.Table.from_pandas(df, preserve_index=False)
+            at = at.replace_schema_metadata({
+                "gcm.table": table,
+                "gcm.watermark_xmin": str(wm["xmin"]),
+                "gcm.lsn": wm["lsn"],
+            })
+
+            path = os.path.join(snapshot_dir, f"{table}.arrow")
+            tmp = path + ".tmp"
+            with pa.OSFile(tmp, "wb") as sink:
+                with ipc.new_file(sink, at.schema, options=ipc.IpcWriteOptions(compression=codec)) as w:
+                    w.write_table(at)
+            os.replace(tmp, path)
+            files[table] = {
+                "file": os.path.basename(path),
+                "rows": len(df),
+                "bytes": os.path.getsize(path),
+                "export_ms": (time.perf_counter() - t0) * 1000.0,
+            }
+        conn.rollback()
+    finally:
+        conn.close()
+
+    manifest = {
+        "watermark_xmin": wm["xmin"],
+        "watermark_xmax": wm["xmax"],
+        "lsn": wm["lsn"],
+        "versions": versions,
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+        "compression": compression,
+        "tables": files,
+    }
+    # manifest goes last; a reader never sees it ahead of its files
+    path = os.path.join(snapshot_dir, MANIFEST)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+    return manifest
+
+
+def read_table(path: str) -> pd.DataFrame:
+    # uncompressed files are mapped zero-copy; compressed buffers are inflated on read
+    with pa.memory_map(path, "r") as src:
+        return ipc.open_file(src).read_all().to_pandas()
+
+
+class SnapshotStore:
+    def __init__(self, snapshot_dir: str = SNAPSHOT_DIR, refresh_seconds: float = REFRESH_SECONDS,
+                 connect: Callable = get_db_conn, adb: Optional[AsyncDB] = None):
+        self.snapshot_dir = snapshot_dir
+        self.refresh_seconds = refresh_seconds
+        self.connect = connect
+        # frames the snapshot tables can't answer are queried on this pool
+        self.adb = adb
+        self.frames: Dict[str, pd.DataFrame] = {}
+        self.manifest: Optional[Dict[str, Any]] = None
+        self.versions: Dict[str, Optional[int]] = {}
+        self.version = 0
+        self.last_refresh = 0.0
+        self.last_delta_rows = 0
+        self._lock = threading.Lock()
+
+    def load(self) -> bool:
+        manifest = read_manifest(self.snapshot_dir)
+        if manifest is None:
+            return False
+        frames = {}
+        for table, meta in manifest["tables"].items():
+            if table not in TABLES:
+                continue
+            t0 = time.perf_counter()
+            df = read_table(os.path.join(self.snapshot_dir, meta["file"]))
+            frames[table] = _typed(table, df)
+            tracing.record_query(f"snapshot:{table}", f"mmap {meta['file']}", None,
+                                 time.perf_counter() - t0, df)
+        if set(frames) != set(TABLES):
+            return False
+        with self._lock:
+            self.frames = frames
+            self.manifest = manifest
+            # manifests without versions are reloaded on the first refresh
+            self.versions = manifest.get("versions", {})
+            self.version += 1
+        return True
+
+    def _apply_changes(self, conn, moved: List[str]) -> int:
+        # rows replaced or dropped; changed days are refetched whole
+        changed = 0
+        for table in moved:
+            t0 = time.perf_counter()
+            with conn.cursor() as cur:
+                cur.execute(CHANGES_SQL, {"t": table, "v": self.versions.get(table)})
+                row = cur.fetchone()
+            days = row[0] if row else None
+            base = self.frames[table]
+            if days is None:
+                sql, params = _select_sql(table), None
+                fresh = _typed(table, _read(conn, sql))
+                changed += len(base) + len(fresh)
+                base = fresh
+            else:
+                sql, params = _days_sql(table), {"d": days}
+                fresh = _typed(table, _read(conn, sql, params))
+                keep = ~base["event_date"].isin(days)
+                changed += int((~keep).sum()) + len(fresh)
+                base = pd.concat([base[keep], fresh], ignore_index=True)
+            tracing.record_query(f"delta:{table}", sql, params, time.perf_counter() - t0, fresh)
+            self.frames[table] = base
+        for table in APPEND_ONLY:
+            changed += self._grow_dim(conn, table)
+        return changed
+
+    def _grow_dim(self, conn, table: str) -> int:
+        # new codes come with new results rows, so the dims are only looked
+        # at when a results table moved. ids are handed out in order but can
+        # commit out of order; a count that still differs reloads the dim
+        cols, (key,) = TABLES[table]
+        base = self.frames[table]
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT COUNT(*) FROM {table}")
+            n = cur.fetchone()[0]
+        if n == len(base):
+            return 0
+        after = int(base[key].max()) if not base.empty else 0
+        new = _typed(table, _read(conn, f"SELECT {', '.join(cols)} FROM {table} WHERE {key} > %(k)s", {"k": after}))
+        base = pd.concat([base, new], ignore_index=True)
+        if len(base) != n:
+            base = _typed(table, _read(conn, _select_sql(table)))
+        self.frames[table] = base
+        return len(new)
+
+    def refresh(self, force: bool = False) -> int:
+        # coalesces concurrent sessions: at most one check per refresh_seconds.
+        # a check is one table_versions lookup; only tables whose version
+        # moved are touched, and only on the days that changed
+        with self._lock:
+            if not self.frames:
+                return 0
+            now = time.time()
+            if not force and now - self.last_refresh < self.refresh_seconds:
+                return 0
+            self.last_refresh = now
+
+            conn = self.connect()
+            try:
+                conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+                versions = _versions(conn)
+                moved = [t for t, v in versions.items() if v != self.versions.get(t)]
+                changed = self._apply_changes(conn, moved) if moved else 0
+                conn.rollback()
+            finally:
+                conn.close()
+
+            self.versions = versions
+            if moved:
+                self.last_delta_rows = changed
+                self.version += 1
+            return max(changed, 1) if moved else 0
+
+    def load_meta(self) -> pd.DataFrame:
+        dv = self.frames["daily_event_volume_by_quadclass"]
+        return pd.DataFrame([{
+            "min_event_date": dv["event_date"].min() if not dv.empty else None,
+            "max_event_date": dv["event_date"].max() if not dv.empty else None,
+        }])
+
+    def _query(self) -> Callable[..., pd.DataFrame]:
+        return gcm_data.pooled_qdf(self.adb) if self.adb is not None else gcm_data.qdf
+
+    def load_frame(self, name: str, start_i: int, end_i: int, topn: int,
+                   max_points: int = downsample.MAX_POINTS) -> pd.DataFrame:
+        if name not in _FRAMES:
+            # not derivable from the snapshot tables (e.g. the hll sketches)
+            return gcm_data.load_frame(name, start_i, end_i, topn, query=self._query(), max_points=max_points)
+        t0 = time.perf_counter()
+        p = frame_params(name, start_i, end_i, topn, max_points)
+        raw = finish_frame(name, _FRAMES[name](self.frames, p["s"], p["e"], p["n"], p["b"]), p, max_points)
+        df = compact(raw)
+        tracing.record_query(name, f"snapshot:{name}", p, time.perf_counter() - t0, df,
+                             saved_bytes=tracing.frame_bytes(raw) - tracing.frame_bytes(df))
+        return df
+
+    def load_all(self, start_i: int, end_i: int, topn: int,
+                 max_points: int = downsample.MAX_POINTS, key: Optional[Hashable] = None,
+                 poll: Optional[Callable[[], None]] = None) -> Dict[str, pd.DataFrame]:
+        # the rest (sketches, goldstein bands, rolling windows) go to the pool
+        # all at once, like gcm.data.aload_all; key and poll as for AsyncDB.call
+        rest = [name for name in gcm_data.QUERIES if name not in _FRAMES]
+        if self.adb is not None:
+            frames = self.adb.call(gcm_data.aload_all(self.adb, start_i, end_i, topn, max_points, names=rest),
+                                   key=key, poll=poll)
+        else:
+            frames = {name: self.load_frame(name, start_i, end_i, topn, max_points) for name in rest}
+        with self._lock:
+            frames.update({name: self.load_frame(name, start_i, end_i, topn, max_points) for name in _FRAMES})
+        return {name: frames[name] for name in gcm_data.QUERIES}
+
+
+# pandas equivalents of gcm.data.QUERIES over the snapshot frames
+
+def _between(df: pd.DataFrame, s: int, e: int) -> pd.DataFrame:
+    return df[(df["event_date"] >= s) & (df["event_date"] <= e)]
+
+
+def _to_day(i: int) -> pd.Timestamp:
+    return pd.to_datetime(str(i), format="%Y%m%d")
+
+
+def _bucketed(dv: pd.DataFrame, s: int, b: int) -> pd.DataFrame:
+    # same b-day buckets from s as gcm.data's time series queries
+    day = pd.to_datetime(dv["event_date"].astype(str), format="%Y%m%d")
+    offset = (day - _to_day(s)).dt.days // b * b
+    return dv.assign(event_day=_to_day(s) + pd.to_timedelta(offset, unit="D"))
+
+
+def _per_day(out: pd.DataFrame, cols: List[str], e: int, b: int) -> pd.DataFrame:
+    # bucket totals -> daily averages (the last bucket can be short)
+    days = ((_to_day(e) - out["event_day"]).dt.days + 1).clip(upper=b)
+    for c in cols:
+        out[c] = out[c] / days
+    out["event_day"] = out["event_day"].dt.date
+    return out
+
+
+def _conflict(dv: pd.DataFrame) -> pd.Series:
+    return dv["total_events"].where(dv["quad_class"].isin([3, 4]), 0)
+
+
+def _kpis(f, s, e, n, b):
+    # SUM/AVG over no rows is NULL in sql
+    dv = _between(f["daily_event_volume_by_quadclass"], s, e)
+    mean = dv["avg_goldstein"].mean()
+    return pd.DataFrame([{
+        "total_events": dv["total_events"].sum() if not dv.empty else None,
+        "conflict_events": _conflict(dv).sum() if not dv.empty else None,
+        "mean_goldstein": None if pd.isna(mean) else mean,
+    }], dtype=object)
+
+
+def _trend(f, s, e, n, b):
+    dv = _between(f["daily_event_volume_by_quadclass"], s, e).assign(conflict_events=_conflict)
+    out = (_bucketed(dv, s, b)
+           .groupby("event_day", as_index=False)
+           .agg(total_events=("total_events", "sum"),
+                conflict_events=("conflict_events", "sum"),
+                mean_goldstein=("avg_goldstein", "mean"))
+           .sort_values("event_day"))
+    return _per_day(out, ["total_events", "conflict_events"], e, b).reset_index(drop=True)
+
+
+def _top(df: pd.DataFrame, keys: List[str], limit: int) -> pd.DataFrame:
+    return (df.groupby(keys, as_index=False)
+              .agg(total_events=("total_events", "sum"), mean_goldstein=("avg_goldstein", "mean"))
+              .sort_values("total_events", ascending=False)
+              .head(limit))
+
+
+def _actors(f, s, e, n, b):
+    dim = f["actor_dim"]
+    ta = _between(f["top_actors"], s, e)
+    ta = ta[ta["source_actor_id"].isin(dim.loc[dim["is_iso3"], "actor_id"])]
+    top = _top(ta, ["source_actor_id"], 250)
+    top = top[top["total_events"] > 0]
+    codes = dim.set_index("actor_id")["actor_code"]
+    top.insert(0, "iso3", top["source_actor_id"].map(codes))
+    return top.drop(columns="source_actor_id").reset_index(drop=True)
+
+
+def _dyads(f, s, e, n, b):
+    codes = f["actor_dim"].set_index("actor_id")["actor_code"]
+    top = _top(_between(f["dyad_interactions"], s, e), ["source_actor_id", "target_actor_id"], n)
+    top.insert(0, "source_actor", top["source_actor_id"].map(codes))
+    top.insert(1, "target_actor", top["target_actor_id"].map(codes))
+    return top.drop(columns=["source_actor_id", "target_actor_id"]).reset_index(drop=True)
+
+
+def _cameo(f, s, e, n, b):
+    codes = f["cameo_dim"].set_index("cameo_id")["cameo_code"]
+    top = _top(_between(f["daily_cameo_metrics"], s, e), ["cameo_id"], n)
+    top.insert(0, "cameo_code", top["cameo_id"].map(codes))
+    return top.drop(columns="cameo_id").reset_index(drop=True)
+
+
+def _quad_dist(f, s, e, n, b):
+    dv = _between(f["daily_event_volume_by_quadclass"], s, e)
+    return (dv.groupby("quad_class", as_index=False)
+              .agg(total_events=("total_events", "sum"), avg_goldstein=("avg_goldstein", "mean"))
+              .sort_values("quad_class")
+              .reset_index(drop=True))
+
+
+def _quad_time(f, s, e, n, b):
+    dv = _between(f["daily_event_volume_by_quadclass"], s, e)
+    out = (_bucketed(dv, s, b)
+           .groupby(["event_day", "quad_class"], as_index=False)["total_events"].sum()
+           .sort_values(["event_day", "quad_class"]))
+    return _per_day(out, ["total_events"], e, b).reset_index(drop=True)
+
+
+_FRAMES: Dict[str, Callable[..., pd.DataFrame]] = {
+    "kpis": _kpis,
+    "trend": _trend,
+    "actors": _actors,
+    "dyads": _dyads,
+    "cameo": _cameo,
+    "quad_dist": _quad_dist,
+    "quad_time": _quad_time,
+}
@@ -0,0 +1,173 @@
+# synthetic gdelt at scale: the reduced event file (11 or 17 columns, tab
+# separated) generated in seeded, date-ordered chunks. events come from the
+# workload model (gcm/workload.py); locations are country centroids with
+# jitter. chunks are independent, so they can be rendered in parallel and
+# the output is the same for any number of jobs
+import io
+from dataclasses import dataclass
+from multiprocessing import Pool
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from gcm.workload import ACTORS, CAMEO, Workload, _as_day, get_profile, yyyymmdd
+
+
+SYNTH_CHUNK_ROWS = 500_000
+
+# (gdelt header, table column) of the reduced file, in file order
+FILE_COLUMNS: Dict[int, Tuple[Tuple[str, str], ...]] = {
+    17: (
+        ("Date", "event_date"), ("Source", "source_actor"), ("Target", "target_actor"),
+        ("CAMEOCode", "cameo_code"), ("NumEvents", "num_events"), ("NumArts", "num_articles"),
+        ("QuadClass", "quad_class"), ("Goldstein", "goldstein"),
+        ("SourceGeoType", "source_geo_type"), ("SourceGeoLat", "source_geo_lat"),
+        ("SourceGeoLong", "source_geo_long"),
+        ("TargetGeoType", "target_geo_type"), ("TargetGeoLat", "target_geo_lat"),
+        ("TargetGeoLong", "target_geo_long"),
+        ("ActionGeoType", "action_geo_type"), ("ActionGeoLat", "action_geo_lat"),
+        ("ActionGeoLong", "action_geo_long"),
+    ),
+}
+FILE_COLUMNS[11] = FILE_COLUMNS[17][:8] + FILE_COLUMNS[17][14:]
+
+# (lat, long, spread in degrees) per country code; actors are matched on
+# their first three letters (USAGOV -> USA). unknown countries get no location
+CENTROIDS: Dict[str, Tuple[float, float, float]] = {
+    "USA": (39.8, -98.6, 8.0), "GBR": (54.0, -2.0, 1.5), "RUS": (60.0, 100.0, 12.0),
+    "CHN": (35.0, 105.0, 8.0), "ISR": (31.5, 34.8, 0.5), "IRN": (32.0, 53.0, 3.0),
+    "IND": (20.0, 77.0, 5.0), "PAK": (30.0, 70.0, 3.0), "FRA": (46.0, 2.0, 2.0),
+    "AFG": (33.0, 65.0, 2.5), "DEU": (51.0, 9.0, 1.5), "IRQ": (33.0, 44.0, 2.0),
+    "SYR": (35.0, 38.0, 1.0), "TUR": (39.0, 35.0, 2.5), "JPN": (36.0, 138.0, 3.0),
+    "UKR": (49.0, 32.0, 2.5), "AUS": (-27.0, 133.0, 8.0), "CAN": (60.0, -95.0, 10.0),
+    "PSE": (31.9, 35.2, 0.3), "EGY": (27.0, 30.0, 3.0), "SAU": (25.0, 45.0, 4.0),
+    "NGA": (10.0, 8.0, 3.0), "KOR": (37.0, 127.5, 1.0), "PRK": (40.0, 127.0, 1.0),
+    "ZAF": (-29.0, 24.0, 3.0), "MEX": (23.0, -102.0, 4.0), "BRA": (-10.0, -55.0, 8.0),
+    "LBN": (33.8, 35.8, 0.3), "LBY": (25.0, 17.0, 4.0), "IDN": (-5.0, 120.0, 6.0),
+    "PHL": (13.0, 122.0, 2.5), "ITA": (42.8, 12.8, 2.0), "ESP": (40.0, -4.0, 2.0),
+    "KEN": (1.0, 38.0, 2.0), "YEM": (15.0, 48.0, 2.0), "SDN": (15.0, 30.0, 4.0),
+    "VEN": (8.0, -66.0, 3.0), "GRC": (39.0, 22.0, 1.5), "POL": (52.0, 20.0, 2.0),
+    "NLD": (52.5, 5.8, 0.7), "BEL": (50.8, 4.0, 0.5), "SWE": (62.0, 15.0, 3.0),
+    "VNM": (16.0, 106.0, 3.0), "THA": (15.0, 100.0, 3.0), "MYS": (2.5, 112.5, 3.0),
+    "BGD": (24.0, 90.0, 1.5), "LKA": (7.0, 81.0, 1.0), "COL": (4.0, -72.0, 3.0),
+}
+
+# geo types: 1 country (at the centroid), 4 world city, 5 world state; in the
+# us these are 3 (us city) and 2 (us state)
+GEO_TYPES = np.array([1, 4, 5])
+GEO_TYPE_P = np.array([0.35, 0.45, 0.2])
+US_GEO_TYPES = {4: 3, 5: 2}
+# share of events without a location, by side
+GEO_MISSING = {"source": 0.25, "target": 0.3, "action": 0.05}
+# action happens in the target's country this often, else in the source's
+ACTION_AT_TARGET = 0.5
+
+
+@dataclass(frozen=True)
+class Chunk:
+    index: int
+    days: np.ndarray    # yyyymmdd, ascending
+    counts: np.ndarray  # rows per day
+    seed: np.random.SeedSequence
+
+    @property
+    def rows(self) -> int:
+        return int(self.counts.sum())
+
+
+def day_weights(start: int, end: int, growth: float) -> Tuple[np.ndarray, np.ndarray]:
+    # (yyyymmdd days, share of rows); coverage grows by `growth` per year,
+    # as gdelt's source base did
+    days = np.arange(_as_day(start), _as_day(end) + np.timedelta64(1, "D"))
+    if not len(days):
+        raise ValueError(f"empty date range {start}..{end}")
+    w = np.exp(growth * np.arange(len(days)) / 365.25)
+    return yyyymmdd(days), w / w.sum()
+
+
+def plan(rows: int, start: int, end: int, chunk_rows: int = SYNTH_CHUNK_ROWS,
+         growth: float = 0.1, seed: Optional[int] = None) -> List[Chunk]:
+    # rows per day, cut into date-ordered chunks of about chunk_rows (whole
+    # days, so a chunk may run over). each chunk gets its own seed
+    root = np.random.SeedSequence(seed)
+    days, p = day_weights(start, end, growth)
+    counts = np.random.default_rng(root.spawn(1)[0]).multinomial(rows, p)
+    cum = np.cumsum(counts)
+    cuts = np.unique(np.searchsorted(cum, np.arange(chunk_rows, rows, chunk_rows), side="left") + 1)
+    parts = [idx for idx in np.split(np.arange(len(days)), cuts[cuts < len(days)]) if counts[idx].sum()]
+    return [Chunk(i, days[idx], counts[idx], s) for i, (idx, s) in enumerate(zip(parts, root.spawn(len(parts))))]
+
+
+def _centroids(actors: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # lat, long, spread and is-us per actor; nan where the country is unknown
+    c = np.array([CENTROIDS.get(str(a)[:3], (np.nan, np.nan, np.nan)) for a in actors], dtype=float).reshape(-1, 3)
+    return c[:, 0], c[:, 1], c[:, 2], np.array([str(a)[:3] == "USA" for a in actors], dtype=bool)
+
+
+def locations(rng: np.random.Generator, actor_i: np.ndarray, geo, missing: float) -> Dict[str, pa.Array]:
+    # geo type, lat and long for events located in the countries of actor_i
+    lat0, long0, spread, us = (g[actor_i] for g in geo)
+    n = len(actor_i)
+    t = rng.choice(GEO_TYPES, size=n, p=GEO_TYPE_P)
+    for world, us_type in US_GEO_TYPES.items():
+        t[(t == world) & us] = us_type
+    off = rng.standard_normal((2, n)) * np.where(t == 1, 0.0, spread)
+    lat = np.round(np.clip(lat0 + off[0], -90.0, 90.0), 4)
+    long = np.round((long0 + off[1] + 180.0) % 360.0 - 180.0, 4)
+    null = np.isnan(lat0) | (rng.random(n) < missing)
+    return {
+        "geo_type": pa.array(t.astype(np.int8), mask=null),
+        "geo_lat": pa.array(lat, mask=null),
+        "geo_long": pa.array(long, mask=null),
+    }
+
+
+def chunk_table(chunk: Chunk, profile: str = "gdelt", columns: int = 17,
+                actors: Sequence[str] = ACTORS, cameo: Sequence[Tuple[str, float]] = CAMEO) -> pa.Table:
+    # one chunk as an arrow table with the gdelt header names. the trending
+    # dyads are drawn per chunk, so they move along with the dates
+    w = Workload(get_profile(profile), actors, cameo, seed=chunk.seed)
+    dates = np.repeat(chunk.days, chunk.counts)
+    ev = w.events(len(dates), dates=dates)
+    cols = {c: pa.array(v) for c, v in ev.items()}
+    index = pd.Index(w.actors)
+    src = index.get_indexer(ev["source_actor"])
+    tgt = index.get_indexer(ev["target_actor"])
+    geo = _centroids(w.actors)
+    action_i = np.where(w.rng.random(len(dates)) < ACTION_AT_TARGET, tgt, src)
+    sides = {"action": action_i} if columns == 11 else {"source": src, "target": tgt, "action": action_i}
+    for side, actor_i in sides.items():
+        for k, v in locations(w.rng, actor_i, geo, GEO_MISSING[side]).items():
+            cols[f"{side}_{k}"] = v
+    return pa.table([cols[c] for _, c in FILE_COLUMNS[columns]], names=[h for h, _ in FILE_COLUMNS[columns]])
+
+
+def header(columns: int) -> bytes:
+    return ("\t".join(h for h, _ in FILE_COLUMNS[columns]) + "\n").encode()
+
+
+def render(table: pa.Table) -> bytes:
+    # tab separated, nulls as empty fields: what load-gdelt.sh and COPY
+    # (FORMAT text, NULL '') read
+    buf = io.BytesIO()
+    pacsv.write_csv(table, buf, pacsv.WriteOptions(include_header=False, delimiter="\t", quoting_style="none"))
+    return buf.getvalue()
+
+
+def _render_chunk(args) -> Tuple[int, bytes]:
+    chunk, profile, columns = args
+    return chunk.rows, render(chunk_table(chunk, profile, columns))
+
+
+def generate(chunks: Sequence[Chunk], profile: str = "gdelt", columns: int = 17,
+             jobs: int = 1) -> Iterator[Tuple[int, bytes]]:
+    # (rows, tsv bytes) per chunk, in date order
+    work = [(c, profile, columns) for c in chunks]
+    if jobs <= 1:
+        yield from map(_render_chunk, work)
+        return
+    with Pool(jobs) as pool:
+        yield from pool.imap(_render_chunk, work)
@@ -0,0 +1,144 @@
+# per-render query tracing for qdf()
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import logging
+import logging.handlers
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict, field
+from typing import Optional, Dict, Any, List
+
+import pandas as pd
+
+
+METRICS_LOG = os.getenv("METRICS_LOG", "logs/query_metrics.jsonl")
+METRICS_LOG_BYTES = int(os.getenv("METRICS_LOG_BYTES", str(5 * 1024 * 1024)))
+METRICS_LOG_BACKUPS = int(os.getenv("METRICS_LOG_BACKUPS", "5"))
+
+_current: ContextVar[Optional["RenderTrace"]] = ContextVar("render_trace", default=None)
+_cache_scope: ContextVar[Optional[str]] = ContextVar("cache_scope", default=None)
+
+_logger: Optional[logging.Logger] = None
+
+
+def fingerprint(sql: str) -> str:
+    # normalize literals + whitespace so the same query shape hashes the same
+    norm = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    norm = re.sub(r"\b\d+(\.\d+)?\b", "?", norm)
+    norm = re.sub(r"\s+", " ", norm).strip().lower()
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest()[:12]
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+
+@dataclass
+class QueryRecord:
+    label: str
+    fingerprint: str
+    params: Dict[str, Any]
+    latency_ms: float
+    rows: int
+    frame_bytes: int
+    cache: str  # "hit", "miss" or "none" (not behind a cache)
+    saved_bytes: int = 0  # shrink from compact dtypes
+    ts: float = field(default_factory=time.time)
+
+
+class RenderTrace:
+    def __init__(self, name: str = "render"):
+        self.name = name
+        self.render_id = uuid.uuid4().hex[:8]
+        self.started = time.time()
+        self.records: List[QueryRecord] = []
+
+    def add(self, record: QueryRecord):
+        self.records.append(record)
+
+    def add_cache_hits(self, frames: Dict[str, pd.DataFrame], params: Dict[str, Any]):
+        for name, df in frames.items():
+            self.add(QueryRecord(
+                label=name, fingerprint="", params=params, latency_ms=0.0,
+                rows=len(df), frame_bytes=frame_bytes(df), cache="hit",
+            ))
+
+    def to_frame(self) -> pd.DataFrame:
+        if not self.records:
+            return pd.DataFrame(columns=["label", "cache", "latency_ms", "rows", "frame_bytes", "saved_bytes",
+                                         "fingerprint", "params"])
+        df = pd.DataFrame([asdict(r) for r in self.records])
+        df["params"] = df["params"].astype(str)
+        return df[["label", "cache", "latency_ms", "rows", "frame_bytes", "saved_bytes", "fingerprint", "params"]]
+
+    def total_ms(self) -> float:
+        return sum(r.latency_ms for r in self.records)
+
+
+def start_render(name: str = "render") -> RenderTrace:
+    trace = RenderTrace(name)
+    _current.set(trace)
+    return trace
+
+
+def current() -> Optional[RenderTrace]:
+    return _current.get()
+
+
+@contextmanager
+def cache_scope(name: str):
+    # queries inside run only on a cache miss
+    token = _cache_scope.set(name)
+    try:
+        yield
+    finally:
+        _cache_scope.reset(token)
+
+
+def record_query(label: str, sql: str, params: Optional[Dict[str, Any]], latency_s: float, df: pd.DataFrame,
+                 saved_bytes: int = 0):
+    trace = _current.get()
+    if trace is None:
+        return
+    trace.add(QueryRecord(
+        label=label,
+        fingerprint=fingerprint(sql),
+        params=dict(params or {}),
+        latency_ms=latency_s * 1000.0,
+        rows=len(df),
+        frame_bytes=frame_bytes(df),
+        cache="miss" if _cache_scope.get() is not None else "none",
+        saved_bytes=saved_bytes,
+    ))
+
+
+def _get_logger() -> logging.Logger:
+    global _logger
+    if _logger is None:
+        os.makedirs(os.path.dirname(METRICS_LOG) or ".", exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            METRICS_LOG, maxBytes=METRICS_LOG_BYTES, backupCount=METRICS_LOG_BACKUPS
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _logger = logging.getLogger("gcm.query_metrics")
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+        _logger.addHandler(handler)
+    return _logger
+
+
+def write_metrics(trace: RenderTrace):
+    # best effort, never break a render over metrics
+    try:
+        logger = _get_logger()
+        for r in trace.records:
+            row = asdict(r)
+            row["render_id"] = trace.render_id
+            row["render"] = trace.name
+            logger.info(json.dumps(row, default=str))
+    except Exception:
+        pass
@@ -0,0 +1,271 @@
+# change workloads shaped like real gdelt traffic: zipf-skewed actors, dyads
+# and cameo codes, a rotating set of hot dyads, and late arrivals by date age.
+# sampling is vectorized (numpy) so the same model feeds benchmarks and bulk
+# generation
+import os
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# default profile of every script that takes --profile
+WORKLOAD_PROFILE = os.getenv("WORKLOAD_PROFILE", "uniform")
+
+
+@dataclass(frozen=True)
+class Profile:
+    name: str
+    actor_s: float = 0.0        # zipf exponent over actors by rank (0 = uniform)
+    cameo_s: float = 0.0        # same over cameo codes
+    dyad_focus: float = 0.0     # share of events on the top dyads (USA->CHN, CHN->USA, ...)
+    dyad_s: float = 1.0         # zipf exponent within those top dyads
+    hot_keys: int = 0           # size of the trending dyad set
+    hot_fraction: float = 0.0   # share of events / changes landing on it
+    hot_churn: float = 0.0      # share of the hot set replaced per batch
+    # (max age in days, share) buckets relative to the newest day; the rest
+    # lands on the newest day. None: any day of the history, uniformly
+    late: Optional[Tuple[Tuple[int, float], ...]] = None
+    rekey_fraction: float = 0.0  # updates that also move the event to a new dyad
+
+
+PROFILES: Dict[str, Profile] = {p.name: p for p in (
+    # the old behaviour: random rows and codes, any date
+    Profile("uniform"),
+    # skew and lateness in the range seen in the gdelt 2.0 feed: a few
+    # countries and dyads carry most events, and most changes are for today
+    Profile("gdelt", actor_s=1.1, cameo_s=1.0, dyad_focus=0.3, dyad_s=1.2,
+            hot_keys=20, hot_fraction=0.1, hot_churn=0.05,
+            late=((1, 0.08), (7, 0.06), (90, 0.04), (3650, 0.02))),
+    # contention: most changes hit a small, slowly rotating set of groups
+    Profile("hotspot", actor_s=1.1, cameo_s=1.0, dyad_focus=0.2, dyad_s=1.5,
+            hot_keys=8, hot_fraction=0.7, hot_churn=0.02,
+            late=((1, 0.1),), rekey_fraction=0.2),
+    # state growth: trending keys turn over fast and corrections reach far back
+    Profile("churn", actor_s=0.8, cameo_s=0.8, hot_keys=200, hot_fraction=0.5, hot_churn=0.5,
+            late=((7, 0.2), (365, 0.2), (3650, 0.2)), rekey_fraction=0.1),
+    # backfill: corrections spread over years of history
+    Profile("late", actor_s=1.1, cameo_s=1.0, dyad_focus=0.3,
+            late=((30, 0.2), (365, 0.3), (7300, 0.4))),
+)}
+
+
+# fallback vocabulary, roughly by frequency in gdelt; used when the database
+# has no history to rank by (and by offline generation)
+ACTORS: Tuple[str, ...] = (
+    "USA", "GBR", "RUS", "CHN", "ISR", "IRN", "IND", "PAK", "FRA", "AFG", "DEU", "IRQ",
+    "SYR", "TUR", "JPN", "UKR", "AUS", "CAN", "PSE", "EGY", "SAU", "NGA", "KOR", "PRK",
+    "ZAF", "MEX", "BRA", "LBN", "LBY", "IDN", "PHL", "ITA", "ESP", "KEN", "YEM", "SDN",
+    "VEN", "GRC", "POL", "NLD", "BEL", "SWE", "VNM", "THA", "MYS", "BGD", "LKA", "COL",
+    "USAGOV", "USAMIL", "GBRGOV", "RUSGOV", "CHNGOV", "ISRMIL", "IRNGOV", "INDGOV", "PAKMIL",
+    "USABUS", "USAMED", "USACOP", "USAJUD", "USALEG", "GBRMED", "RUSMIL", "CHNMIL",
+)
+
+# (cameo code, goldstein scale value) roughly by frequency; in gdelt the
+# goldstein score is a property of the event code
+CAMEO: Tuple[Tuple[str, float], ...] = (
+    ("042", 1.9), ("043", 2.8), ("010", 0.0), ("040", 1.0), ("051", 3.4), ("020", 3.0),
+    ("036", 4.0), ("046", 7.0), ("190", -10.0), ("173", -5.0), ("112", -2.0), ("111", -2.0),
+    ("057", 8.0), ("013", 0.4), ("061", 6.4), ("084", 7.0), ("0841", 7.0), ("172", -5.0),
+    ("193", -10.0), ("141", -6.5), ("030", 4.0), ("050", 3.5), ("070", 7.0), ("180", -9.0),
+    ("150", -7.2), ("100", -5.0), ("090", -2.0), ("120", -4.0), ("130", -4.4), ("160", -4.0),
+    ("200", -10.0), ("014", 0.0), ("071", 7.4), ("031", 5.2), ("128", -4.0), ("138", -7.0),
+)
+
+
+def quad_class(cameo_codes: np.ndarray) -> np.ndarray:
+    # cameo root 01-05 verbal cooperation, 06-08 material cooperation,
+    # 09-14 verbal conflict, 15-20 material conflict
+    root = np.array([int(c[:2]) for c in cameo_codes]) if len(cameo_codes) else np.zeros(0, int)
+    return np.searchsorted(np.array([6, 9, 15]), root, side="right") + 1
+
+
+def zipf_p(n: int, s: float) -> np.ndarray:
+    # finite zipf over ranks 1..n; s may be <= 1, unlike numpy's zipf
+    w = 1.0 / np.arange(1, n + 1, dtype=float) ** s
+    return w / w.sum()
+
+
+def yyyymmdd(days: np.ndarray) -> np.ndarray:
+    # datetime64[D] -> int yyyymmdd, vectorized
+    y = days.astype("datetime64[Y]").astype(int) + 1970
+    m = days.astype("datetime64[M]").astype(int) % 12 + 1
+    d = (days - days.astype("datetime64[M]")).astype(int) + 1
+    return y * 10000 + m * 100 + d
+
+
+def _as_day(i: int) -> np.datetime64:
+    return np.datetime64(date(i // 10000, i // 100 % 100, i % 100), "D")
+
+
+class Workload:
+    # sampler for one profile. actors and cameo codes are given most frequent
+    # first; newest / oldest bound the dates (yyyymmdd)
+    def __init__(self, profile: Profile, actors: Sequence[str] = ACTORS,
+                 cameo: Sequence[Tuple[str, float]] = CAMEO,
+                 newest: Optional[int] = None, oldest: Optional[int] = None, seed: Optional[int] = None):
+        self.profile = profile
+        self.rng = np.random.default_rng(seed)
+        self.actors = np.array(actors, dtype=object)
+        self.actor_p = zipf_p(len(self.actors), profile.actor_s)
+        self.cameo = np.array([c for c, _ in cameo], dtype=object)
+        self.cameo_goldstein = np.array([g for _, g in cameo], dtype=float)
+        self.cameo_quad = quad_class(self.cameo)
+        self.cameo_p = zipf_p(len(self.cameo), profile.cameo_s)
+        today = int(date.today().strftime("%Y%m%d"))
+        self.newest = _as_day(newest or today)
+        self.oldest = _as_day(oldest or 19790101)
+        # top dyads: pairs of the most frequent actors, by product of ranks
+        k = min(len(self.actors), 12)
+        pairs = sorted(((i, j) for i in range(k) for j in range(k) if i != j), key=lambda p: ((p[0] + 1) * (p[1] + 1), p))
+        self.top_dyads = np.array(pairs, dtype=int).reshape(-1, 2)
+        self.top_dyad_p = zipf_p(len(self.top_dyads), profile.dyad_s)
+        self.hot = self._random_dyads(profile.hot_keys)
+
+    def _random_dyads(self, n: int) -> np.ndarray:
+        return self.rng.integers(0, len(self.actors), size=(n, 2))
+
+    def advance(self):
+        # one batch later: part of the hot set stops trending, new keys start
+        n = int(round(self.profile.hot_churn * len(self.hot)))
+        if n:
+            idx = self.rng.choice(len(self.hot), size=n, replace=False)
+            self.hot[idx] = self._random_dyads(n)
+
+    def dyads(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        p = self.profile
+        src = self.rng.choice(len(self.actors), size=n, p=self.actor_p)
+        tgt = self.rng.choice(len(self.actors), size=n, p=self.actor_p)
+        # self-dyads are rare in gdelt; redraw once
+        same = src == tgt
+        tgt[same] = self.rng.choice(len(self.actors), size=int(same.sum()), p=self.actor_p)
+        if p.dyad_focus > 0 and len(self.top_dyads):
+            m = self.rng.random(n) < p.dyad_focus
+            k = self.rng.choice(len(self.top_dyads), size=int(m.sum()), p=self.top_dyad_p)
+            src[m], tgt[m] = self.top_dyads[k, 0], self.top_dyads[k, 1]
+        if p.hot_fraction > 0 and len(self.hot):
+            m = self.rng.random(n) < p.hot_fraction
+            k = self.rng.integers(0, len(self.hot), size=int(m.sum()))
+            src[m], tgt[m] = self.hot[k, 0], self.hot[k, 1]
+        return self.actors[src], self.actors[tgt]
+
+    def hot_dyads(self) -> Tuple[List[str], List[str]]:
+        return list(self.actors[self.hot[:, 0]]), list(self.actors[self.hot[:, 1]])
+
+    def cameo_index(self, n: int) -> np.ndarray:
+        return self.rng.choice(len(self.cameo), size=n, p=self.cameo_p)
+
+    def dates(self, n: int) -> np.ndarray:
+        # yyyymmdd; late buckets count back from the newest day
+        late = self.profile.late
+        span = int((self.newest - self.oldest).astype(int))
+        if late is None:
+            ages = self.rng.integers(0, span + 1, size=n)
+        else:
+            bounds = np.array([0] + [a for a, _ in late])
+            shares = np.array([1.0 - sum(f for _, f in late)] + [f for _, f in late])
+            b = self.rng.choice(len(shares), size=n, p=shares / shares.sum())
+            lo = np.where(b == 0, 0, bounds[np.maximum(b - 1, 0)] + 1)
+            hi = bounds[b]
+            ages = np.minimum(lo + (self.rng.random(n) * (hi - lo + 1)).astype(int), span)
+        return yyyymmdd(self.newest - ages.astype("timedelta64[D]"))
+
+    def events(self, n: int, dates: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        # the event columns of the reduced gdelt file (no locations);
+        # num_events is mostly 1 and an event is usually covered by a few articles
+        src, tgt = self.dyads(n)
+        k = self.cameo_index(n)
+        num_events = self.rng.geometric(0.7, size=n)
+        return {
+            "event_date": self.dates(n) if dates is None else dates,
+            "source_actor": src,
+            "target_actor": tgt,
+            "cameo_code": self.cameo[k],
+            "num_events": num_events,
+            "num_articles": num_events * self.rng.geometric(0.4, size=n),
+            "quad_class": self.cameo_quad[k],
+            "goldstein": self.cameo_goldstein[k],
+        }
+
+
+# column order of events() / as_rows(), as in the reduced gdelt file
+EVENT_COLUMNS = ("event_date", "source_actor", "target_actor", "cameo_code",
+                 "num_events", "num_articles", "quad_class", "goldstein")
+
+
+def as_rows(events: Dict[str, np.ndarray]) -> List[tuple]:
+    # plain python tuples for execute_values
+    return list(zip(*(events[c].tolist() for c in EVENT_COLUMNS)))
+
+
+def get_profile(name: str) -> Profile:
+    if name not in PROFILES:
+        raise ValueError(f"unknown workload profile {name!r}; one of {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+VOCAB_SQL = {
+    # ranked by events in the results tables, so the skew follows the data
+    "actors": """
+        SELECT d.actor_code
+        FROM actor_dim d
+        LEFT JOIN (SELECT source_actor_id, SUM(total_events) AS n FROM top_actors GROUP BY 1) t
+          ON t.source_actor_id = d.actor_id
+        ORDER BY t.n DESC NULLS LAST, d.actor_id;
+    """,
+    "cameo": """
+        SELECT d.cameo_code
+        FROM cameo_dim d
+        LEFT JOIN (SELECT cameo_id, SUM(total_events) AS n FROM daily_cameo_metrics GROUP BY 1) t
+          ON t.cameo_id = d.cameo_id
+        ORDER BY t.n DESC NULLS LAST, d.cameo_id;
+    """,
+}
+
+
+def from_db(conn, profile: Profile, seed: Optional[int] = None) -> Workload:
+    # vocabulary and date range of the loaded data. cameo codes without a
+    # known goldstein value are left out; built-in ones the data lacks follow
+    with conn.cursor() as cur:
+        cur.execute(VOCAB_SQL["actors"])
+        actors = [r[0] for r in cur.fetchall()]
+        cur.execute(VOCAB_SQL["cameo"])
+        codes = [r[0] for r in cur.fetchall()]
+        cur.execute("SELECT MIN(event_date), MAX(event_date) FROM gdelt_events;")
+        oldest, newest = cur.fetchone()
+    conn.rollback()
+    scale = dict(CAMEO)
+    cameo = [(c, scale[c]) for c in codes if c in scale] + [(c, g) for c, g in CAMEO if c not in codes]
+    return Workload(profile, actors if len(actors) >= 2 else ACTORS, cameo,
+                    newest=newest, oldest=oldest, seed=seed)
+
+
+def pick_rows(conn, w: Workload, n: int) -> List[Tuple[int, int]]:
+    # (globaleventid, event_date) of rows to change. uniform profiles take
+    # random rows; skewed ones pick days by age and, within a day, the hot
+    # share from the trending dyads. days without rows contribute nothing
+    with conn.cursor() as cur:
+        if w.profile.late is None:
+            cur.execute("""
+                SELECT globaleventid, event_date FROM public.gdelt_events ORDER BY RANDOM() LIMIT %s;
+            """, (n,))
+            return cur.fetchall()
+        days, counts = np.unique(w.dates(n), return_counts=True)
+        hot = w.rng.binomial(counts, w.profile.hot_fraction) if len(w.hot) else np.zeros_like(counts)
+        hot_src, hot_tgt = w.hot_dyads()
+        cur.execute("""
+            SELECT DISTINCT e.globaleventid, e.event_date
+            FROM unnest(%s::int[], %s::int[], %s::int[]) AS k(d, n, h)
+            CROSS JOIN LATERAL (
+              (SELECT globaleventid, event_date FROM public.gdelt_events
+               WHERE event_date = k.d
+                 AND (source_actor, target_actor) IN (SELECT * FROM unnest(%s::text[], %s::text[]))
+               ORDER BY random() LIMIT k.h)
+              UNION ALL
+              (SELECT globaleventid, event_date FROM public.gdelt_events
+               WHERE event_date = k.d
+               ORDER BY random() LIMIT k.n - k.h)
+            ) e;
+        """, ([int(d) for d in days], [int(c) for c in counts], [int(h) for h in hot], hot_src, hot_tgt))
+        return cur.fetchall()
@@ -0,0 +1,59 @@
+-- Dimension Schema
+
+-- Dimension tables (dictionary encoding of actor / CAMEO codes)
+CREATE TABLE IF NOT EXISTS actor_dim (
+    actor_id INT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    actor_code TEXT NOT NULL UNIQUE,
+    is_iso3 BOOLEAN NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS cameo_dim (
+    cameo_id SMALLINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    cameo_code TEXT NOT NULL UNIQUE,
+    root_code TEXT NOT NULL,              -- e.g. '08' for 0841
+    base_code TEXT NOT NULL               -- e.g. '084' for 0841
+);
+
+-- Code -> id lookup, inserting unseen codes
+CREATE OR REPLACE FUNCTION actor_dim_id(code TEXT) RETURNS INT AS $$
+DECLARE
+  r INT;
+BEGIN
+  IF code IS NULL THEN
+    RETURN NULL;
+  END IF;
+  SELECT actor_id INTO r FROM actor_dim WHERE actor_code = code;
+  IF r IS NULL THEN
+    INSERT INTO actor_dim (actor_code, is_iso3) VALUES (code, char_length(code) = 3)
+    ON CONFLICT (actor_code) DO NOTHING
+    RETURNING actor_id INTO r;
+    -- lost a race with a concurrent insert
+    IF r IS NULL THEN
+      SELECT actor_id INTO r FROM actor_dim WHERE actor_code = code;
+    END IF;
+  END IF;
+  RETURN r;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION cameo_dim_id(code TEXT) RETURNS SMALLINT AS $$
+DECLARE
+  r SMALLINT;
+BEGIN
+  IF code IS NULL THEN
+    RETURN NULL;
+  END IF;
+  SELECT cameo_id INTO r FROM cameo_dim WHERE cameo_code = code;
+  IF r IS NULL THEN
+    INSERT INTO cameo_dim (cameo_code, root_code, base_code) VALUES (code, left(code, 2), left(code, 3))
+    ON CONFLICT (cameo_code) DO NOTHING
+    RETURNING cameo_id INTO r;
+    IF r IS NULL THEN
+      SELECT cameo_id INTO r FROM cameo_dim WHERE cameo_code = code;
+    END IF;
+  END IF;
+  RETURN r;
+END;
+$$ LANGUAGE plpgsql;
+
+GRANT ALL PRIVILEGES ON actor_dim, cameo_dim TO flink_user;
@@ -9,6 +9,11 @@ CREATE TABLE IF NOT EXISTS gdelt_events (
     target_actor TEXT NOT NULL,
     cameo_code TEXT NOT NULL,
 
+    -- filled by trg_gdelt_encode_dims
+    source_actor_id INT,
+    target_actor_id INT,
+    cameo_id SMALLINT,
+
     num_events INT NOT NULL,
     num_articles INT NOT NULL,           
     quad_class INT NOT NULL,
@@ -28,11 +33,108 @@ CREATE TABLE IF NOT EXISTS gdelt_events (
 );
 
 CREATE INDEX IF NOT EXISTS idx_gdelt_event_date ON gdelt_events(event_date);
-CREATE INDEX IF NOT EXISTS idx_gdelt_source_actor ON gdelt_events(source_actor);
-CREATE INDEX IF NOT EXISTS idx_gdelt_target_actor ON gdelt_events(target_actor);
-CREATE INDEX IF NOT EXISTS idx_gdelt_cameo_code ON gdelt_events(cameo_code);
+CREATE INDEX IF NOT EXISTS idx_gdelt_source_actor ON gdelt_events(source_actor_id);
+CREATE INDEX IF NOT EXISTS idx_gdelt_target_actor ON gdelt_events(target_actor_id);
+CREATE INDEX IF NOT EXISTS idx_gdelt_cameo_code ON gdelt_events(cameo_id);
 CREATE INDEX IF NOT EXISTS idx_gdelt_quad_class ON gdelt_events(quad_class);
 
+-- Encode codes of single-row writes (cdc tests, ad-hoc inserts) and code
+-- updates. Rows that arrive with their ids (bulk loads, below) skip the call
+CREATE OR REPLACE FUNCTION gdelt_encode_dims() RETURNS trigger AS $$
+BEGIN
+  NEW.source_actor_id := actor_dim_id(NEW.source_actor);
+  NEW.target_actor_id := actor_dim_id(NEW.target_actor);
+  NEW.cameo_id := cameo_dim_id(NEW.cameo_code);
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_gdelt_encode_dims ON gdelt_events;
+CREATE TRIGGER trg_gdelt_encode_dims
+BEFORE INSERT ON gdelt_events
+FOR EACH ROW
+WHEN (NEW.source_actor_id IS NULL OR NEW.target_actor_id IS NULL OR NEW.cameo_id IS NULL)
+EXECUTE FUNCTION gdelt_encode_dims();
+
+DROP TRIGGER IF EXISTS trg_gdelt_encode_dims_upd ON gdelt_events;
+CREATE TRIGGER trg_gdelt_encode_dims_upd
+BEFORE UPDATE OF source_actor, target_actor, cameo_code ON gdelt_events
+FOR EACH ROW EXECUTE FUNCTION gdelt_encode_dims();
+
+-- Bulk loads (scripts/load-gdelt.sh, generate_gdelt.py --copy): COPY the file
+-- columns into gdelt_staged, then gdelt_insert_staged() adds the batch's
+-- unseen codes to the dimensions in one statement each and inserts the rows
+-- with their ids joined in. The staging table goes away at commit
+CREATE OR REPLACE FUNCTION gdelt_create_staging() RETURNS VOID AS $$
+  CREATE TEMP TABLE IF NOT EXISTS gdelt_staged (
+    line BIGINT GENERATED ALWAYS AS IDENTITY,
+    event_date INT,
+    source_actor TEXT,
+    target_actor TEXT,
+    cameo_code TEXT,
+    num_events INT,
+    num_articles INT,
+    quad_class INT,
+    goldstein DOUBLE PRECISION,
+    source_geo_type INT,
+    source_geo_lat DOUBLE PRECISION,
+    source_geo_long DOUBLE PRECISION,
+    target_geo_type INT,
+    target_geo_lat DOUBLE PRECISION,
+    target_geo_long DOUBLE PRECISION,
+    action_geo_type INT,
+    action_geo_lat DOUBLE PRECISION,
+    action_geo_long DOUBLE PRECISION
+  ) ON COMMIT DROP;
+$$ LANGUAGE sql;
+
+-- returns the number of rows inserted
+CREATE OR REPLACE FUNCTION gdelt_insert_staged() RETURNS BIGINT AS $$
+DECLARE
+  n BIGINT;
+BEGIN
+  -- only codes not there yet: a conflicting insert still uses up an id
+  INSERT INTO actor_dim (actor_code, is_iso3)
+  SELECT code, char_length(code) = 3
+  FROM (SELECT source_actor FROM gdelt_staged UNION SELECT target_actor FROM gdelt_staged) s(code)
+  WHERE code IS NOT NULL
+    AND NOT EXISTS (SELECT 1 FROM actor_dim d WHERE d.actor_code = s.code)
+  ORDER BY code
+  ON CONFLICT (actor_code) DO NOTHING;
+
+  INSERT INTO cameo_dim (cameo_code, root_code, base_code)
+  SELECT code, left(code, 2), left(code, 3)
+  FROM (SELECT DISTINCT cameo_code FROM gdelt_staged) s(code)
+  WHERE code IS NOT NULL
+    AND NOT EXISTS (SELECT 1 FROM cameo_dim d WHERE d.cameo_code = s.code)
+  ORDER BY code
+  ON CONFLICT (cameo_code) DO NOTHING;
+
+  -- left joins: a row missing a code fails on NOT NULL as the COPY would have
+  INSERT INTO gdelt_events (
+    event_date, source_actor, target_actor, cameo_code,
+    source_actor_id, target_actor_id, cameo_id,
+    num_events, num_articles, quad_class, goldstein,
+    source_geo_type, source_geo_lat, source_geo_long,
+    target_geo_type, target_geo_lat, target_geo_long,
+    action_geo_type, action_geo_lat, action_geo_long
+  )
+  SELECT s.event_date, s.source_actor, s.target_actor, s.cameo_code,
+         sa.actor_id, ta.actor_id, c.cameo_id,
+         s.num_events, s.num_articles, s.quad_class, s.goldstein,
+         s.source_geo_type, s.source_geo_lat, s.source_geo_long,
+         s.target_geo_type, s.target_geo_lat, s.target_geo_long,
+         s.action_geo_type, s.action_geo_lat, s.action_geo_long
+  FROM gdelt_staged s
+  LEFT JOIN actor_dim sa ON sa.actor_code = s.source_actor
+  LEFT JOIN actor_dim ta ON ta.actor_code = s.target_actor
+  LEFT JOIN cameo_dim c ON c.cameo_code = s.cameo_code
+  ORDER BY s.line;
+  GET DIAGNOSTICS n = ROW_COUNT;
+  RETURN n;
+END;
+$$ LANGUAGE plpgsql;
+
 -- Sample rows for smoke testing
 INSERT INTO gdelt_events (
   globaleventid, event_date, source_actor, target_actor, cameo_code,
@@ -1,8 +1,11 @@
 -- Publication for GDELT events table
+-- publish_via_partition_root: if gdelt_events is later partitioned
+-- (scripts/partition_events.py), changes are still published as gdelt_events
 
 DO $$
 BEGIN
   IF NOT EXISTS (SELECT 1 FROM pg_publication WHERE pubname = 'gdelt_flink_pub') THEN
-    CREATE PUBLICATION gdelt_flink_pub FOR TABLE public.gdelt_events;
+    CREATE PUBLICATION gdelt_flink_pub FOR TABLE public.gdelt_events
+      WITH (publish_via_partition_root = true);
   END IF;
 END$$;
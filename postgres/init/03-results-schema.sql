@@ -6,40 +6,100 @@ CREATE TABLE IF NOT EXISTS daily_event_volume_by_quadclass (
   total_events BIGINT NOT NULL,
   total_articles BIGINT NOT NULL,
   avg_goldstein DOUBLE PRECISION,
+  row_count BIGINT NOT NULL DEFAULT 0,
+  goldstein_sum DOUBLE PRECISION,
+  goldstein_n BIGINT NOT NULL DEFAULT 0,
   last_updated TIMESTAMP NOT NULL DEFAULT NOW(),
   PRIMARY KEY (event_date, quad_class)
 );
 
+-- actor / cameo keys are ids from actor_dim / cameo_dim
 CREATE TABLE IF NOT EXISTS dyad_interactions (
   event_date INT NOT NULL,
-  source_actor TEXT NOT NULL,
-  target_actor TEXT NOT NULL,
+  source_actor_id INT NOT NULL,
+  target_actor_id INT NOT NULL,
   total_events BIGINT NOT NULL,
   avg_goldstein DOUBLE PRECISION,
+  row_count BIGINT NOT NULL DEFAULT 0,
+  goldstein_sum DOUBLE PRECISION,
+  goldstein_n BIGINT NOT NULL DEFAULT 0,
   last_updated TIMESTAMP NOT NULL DEFAULT NOW(),
-  PRIMARY KEY (event_date, source_actor, target_actor)
+  PRIMARY KEY (event_date, source_actor_id, target_actor_id)
 );
 
 CREATE TABLE IF NOT EXISTS top_actors (
   event_date INT NOT NULL,
-  source_actor TEXT NOT NULL,
+  source_actor_id INT NOT NULL,
   total_events BIGINT NOT NULL,
   total_articles BIGINT NOT NULL,
   avg_goldstein DOUBLE PRECISION,
+  conflict_events BIGINT NOT NULL DEFAULT 0,   -- quad classes 3 and 4
+  row_count BIGINT NOT NULL DEFAULT 0,
+  goldstein_sum DOUBLE PRECISION,
+  goldstein_n BIGINT NOT NULL DEFAULT 0,
   last_updated TIMESTAMP NOT NULL DEFAULT NOW(),
-  PRIMARY KEY (event_date, source_actor)
+  PRIMARY KEY (event_date, source_actor_id)
 );
+ALTER TABLE top_actors ADD COLUMN IF NOT EXISTS conflict_events BIGINT NOT NULL DEFAULT 0;
 
 -- Top-k cameo codes per day
 CREATE TABLE IF NOT EXISTS daily_cameo_metrics (
   event_date INT NOT NULL,
-  cameo_code TEXT NOT NULL,
+  cameo_id SMALLINT NOT NULL,
   total_events BIGINT NOT NULL,
   total_articles BIGINT NOT NULL,
   avg_goldstein DOUBLE PRECISION,
+  row_count BIGINT NOT NULL DEFAULT 0,
+  goldstein_sum DOUBLE PRECISION,
+  goldstein_n BIGINT NOT NULL DEFAULT 0,
   last_updated TIMESTAMP NOT NULL DEFAULT NOW(),
-  PRIMARY KEY (event_date, cameo_code)
+  PRIMARY KEY (event_date, cameo_id)
 );
 
+-- Goldstein histogram per day / quad class, one row per 0.1-wide bin;
+-- mergeable by summing n, so range quantiles are exact to 0.1
+CREATE TABLE IF NOT EXISTS daily_goldstein_histogram (
+  event_date INT NOT NULL,
+  quad_class INT NOT NULL,
+  bin SMALLINT NOT NULL,                -- round(goldstein * 10), -100..100
+  n BIGINT NOT NULL,
+  last_updated TIMESTAMP NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (event_date, quad_class, bin)
+);
+
+-- Event density pyramid over action_geo coordinates: fixed lat/long cells
+-- per zoom level (0 = 4 deg, 1 = 1 deg, 2 = 0.25 deg, see gcm/geogrid.py)
+CREATE TABLE IF NOT EXISTS geo_grid_daily (
+  zoom SMALLINT NOT NULL,
+  event_date INT NOT NULL,
+  cell_y INT NOT NULL,                  -- floor((lat + 90) / deg)
+  cell_x INT NOT NULL,                  -- floor((long + 180) / deg)
+  row_count BIGINT NOT NULL DEFAULT 0,
+  total_events BIGINT NOT NULL,
+  conflict_events BIGINT NOT NULL,
+  goldstein_sum DOUBLE PRECISION,
+  goldstein_n BIGINT NOT NULL,
+  last_updated TIMESTAMP NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (zoom, event_date, cell_y, cell_x)
+);
+
+-- row_count (raw rows in the group) and the goldstein sum and count behind
+-- avg_goldstein let the delta sinks (11-delta-sinks.sql) add and remove rows
+-- without re-reading gdelt_events. added here for databases created before them
+DO $$
+DECLARE
+  t TEXT;
+BEGIN
+  FOREACH t IN ARRAY ARRAY[
+    'daily_event_volume_by_quadclass', 'dyad_interactions', 'top_actors', 'daily_cameo_metrics', 'geo_grid_daily'
+  ] LOOP
+    EXECUTE format('ALTER TABLE public.%I ADD COLUMN IF NOT EXISTS row_count BIGINT NOT NULL DEFAULT 0', t);
+    IF t <> 'geo_grid_daily' THEN
+      EXECUTE format('ALTER TABLE public.%I ADD COLUMN IF NOT EXISTS goldstein_sum DOUBLE PRECISION', t);
+      EXECUTE format('ALTER TABLE public.%I ADD COLUMN IF NOT EXISTS goldstein_n BIGINT NOT NULL DEFAULT 0', t);
+    END IF;
+  END LOOP;
+END$$;
+
 -- Grant permissions to Flink user
 GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA public TO flink_user;
@@ -0,0 +1,14 @@
+-- CDC slot lag history (written by scripts/slot_monitor.py)
+
+CREATE TABLE IF NOT EXISTS cdc_slot_lag (
+  sample_ts TIMESTAMPTZ NOT NULL,
+  slot_name TEXT NOT NULL,
+  active BOOLEAN NOT NULL,
+  flush_lag_bytes BIGINT NOT NULL,
+  retained_wal_bytes BIGINT NOT NULL,
+  lag_seconds DOUBLE PRECISION,
+  alarm TEXT,
+  PRIMARY KEY (slot_name, sample_ts)
+);
+
+GRANT ALL PRIVILEGES ON cdc_slot_lag TO flink_user;
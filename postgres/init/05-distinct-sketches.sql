@@ -0,0 +1,159 @@
+-- HyperLogLog distinct-count sketches (refreshed by scripts/refresh_sketches.py)
+
+-- p = 12: 4096 registers, standard error 1.04 / sqrt(4096) ~ 1.6%
+-- sparse form: sorted register indexes + their max rho
+-- level d/m/y = one day (yyyymmdd), month (yyyymm) or year (yyyy)
+CREATE TABLE IF NOT EXISTS distinct_sketches (
+  level CHAR(1) NOT NULL,
+  period INT NOT NULL,
+  kind TEXT NOT NULL,                   -- 'actor' or 'dyad'
+  regs SMALLINT[] NOT NULL,
+  rhos SMALLINT[] NOT NULL,
+  PRIMARY KEY (level, period, kind)
+);
+
+-- table_versions counter (09-table-versions.sql) of dyad_interactions as of
+-- the last refresh
+CREATE TABLE IF NOT EXISTS distinct_sketch_state (
+  id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+  version BIGINT,
+  refreshed_at TIMESTAMPTZ
+);
+ALTER TABLE distinct_sketch_state ADD COLUMN IF NOT EXISTS version BIGINT;
+ALTER TABLE distinct_sketch_state DROP COLUMN IF EXISTS watermark;
+INSERT INTO distinct_sketch_state (id) VALUES (TRUE) ON CONFLICT DO NOTHING;
+
+-- days touched by deletes from dyad_interactions, drained by the refresh. the
+-- version log has them too, but it is pruned, and a day emptied while the
+-- log was out of reach would keep its stale sketch
+CREATE TABLE IF NOT EXISTS sketch_queue (
+  event_date INT NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION queue_sketch_deletes() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO sketch_queue (event_date)
+  SELECT DISTINCT event_date FROM old_rows;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_sketch_dyads_del ON public.dyad_interactions;
+CREATE TRIGGER trg_sketch_dyads_del
+AFTER DELETE ON public.dyad_interactions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION queue_sketch_deletes();
+
+-- top 12 bits of the 64-bit hash pick the register
+CREATE OR REPLACE FUNCTION hll_register(h BIGINT) RETURNS SMALLINT AS $$
+  SELECT ((h >> 52) & 4095)::smallint;
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+-- 1 + leading zeros of the remaining 52 bits
+CREATE OR REPLACE FUNCTION hll_rho(h BIGINT) RETURNS SMALLINT AS $$
+  SELECT (53 - length(ltrim(substring(h::bit(64)::text FROM 13), '0')))::smallint;
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+-- cardinality from a merged sketch: registers set + sum of 2^-rho over them
+CREATE OR REPLACE FUNCTION hll_estimate(nonzero BIGINT, rho_sum DOUBLE PRECISION) RETURNS DOUBLE PRECISION AS $$
+DECLARE
+  m CONSTANT DOUBLE PRECISION := 4096;
+  zeros DOUBLE PRECISION := m - coalesce(nonzero, 0);
+  raw DOUBLE PRECISION;
+BEGIN
+  raw := (0.7213 / (1 + 1.079 / m)) * m * m / (coalesce(rho_sum, 0) + zeros);
+  -- small-range correction (linear counting)
+  IF raw <= 2.5 * m AND zeros > 0 THEN
+    RETURN m * ln(m / zeros);
+  END IF;
+  RETURN raw;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- rebuild the day sketches for every day touched since the last refresh,
+-- then re-merge their months and years. returns the number of days rebuilt.
+-- changed days come from the version log of dyad_interactions plus
+-- sketch_queue; when the log can't say, every day is rebuilt
+CREATE OR REPLACE FUNCTION refresh_distinct_sketches(full_rebuild BOOLEAN DEFAULT FALSE) RETURNS INT AS $$
+DECLARE
+  seen BIGINT;
+  v BIGINT;
+  changed INT[];
+  days INT[];
+  months INT[];
+  years INT[];
+BEGIN
+  SELECT version INTO seen FROM distinct_sketch_state FOR UPDATE;
+  IF full_rebuild THEN
+    seen := NULL;
+    DELETE FROM distinct_sketches;
+  END IF;
+  SELECT c.version, c.days INTO v, changed FROM table_changes_since('dyad_interactions', seen) c;
+  IF changed IS NULL THEN
+    SELECT array_agg(DISTINCT event_date) INTO changed FROM dyad_interactions;
+  END IF;
+
+  -- a day left without rows loses its sketch below and drops out of its month
+  WITH q AS (DELETE FROM sketch_queue RETURNING event_date)
+  SELECT array_agg(DISTINCT d) INTO days
+  FROM (SELECT unnest(changed) UNION ALL SELECT event_date FROM q) x(d);
+  days := coalesce(days, '{}');
+
+  DELETE FROM distinct_sketches WHERE level = 'd' AND period = ANY(days);
+  INSERT INTO distinct_sketches (level, period, kind, regs, rhos)
+  SELECT 'd', event_date, kind, array_agg(reg ORDER BY reg), array_agg(rho ORDER BY reg)
+  FROM (
+    SELECT event_date, kind, hll_register(h) AS reg, MAX(hll_rho(h)) AS rho
+    FROM (
+      SELECT event_date, 'actor' AS kind, hashint4extended(source_actor_id, 0) AS h
+      FROM dyad_interactions WHERE event_date = ANY(days)
+      UNION ALL
+      SELECT event_date, 'actor', hashint4extended(target_actor_id, 0)
+      FROM dyad_interactions WHERE event_date = ANY(days)
+      UNION ALL
+      -- seeded with the source hash; packing both ids into one int8 collides
+      -- (hashint8 xors the two halves)
+      SELECT event_date, 'dyad', hashint4extended(target_actor_id, hashint4extended(source_actor_id, 0))
+      FROM dyad_interactions WHERE event_date = ANY(days)
+    ) x
+    GROUP BY 1,2,3
+  ) r
+  GROUP BY event_date, kind;
+
+  -- roll touched months up from days, then touched years up from months
+  SELECT array_agg(DISTINCT d / 100) INTO months FROM unnest(days) d;
+  months := coalesce(months, '{}');
+  DELETE FROM distinct_sketches WHERE level = 'm' AND period = ANY(months);
+  INSERT INTO distinct_sketches (level, period, kind, regs, rhos)
+  SELECT 'm', p, kind, array_agg(reg ORDER BY reg), array_agg(rho ORDER BY reg)
+  FROM (
+    SELECT s.period / 100 AS p, s.kind, u.reg, MAX(u.rho) AS rho
+    FROM distinct_sketches s, unnest(s.regs, s.rhos) AS u(reg, rho)
+    WHERE s.level = 'd' AND s.period / 100 = ANY(months)
+    GROUP BY 1,2,3
+  ) r
+  GROUP BY p, kind;
+
+  SELECT array_agg(DISTINCT m / 100) INTO years FROM unnest(months) m;
+  years := coalesce(years, '{}');
+  DELETE FROM distinct_sketches WHERE level = 'y' AND period = ANY(years);
+  INSERT INTO distinct_sketches (level, period, kind, regs, rhos)
+  SELECT 'y', p, kind, array_agg(reg ORDER BY reg), array_agg(rho ORDER BY reg)
+  FROM (
+    SELECT s.period / 100 AS p, s.kind, u.reg, MAX(u.rho) AS rho
+    FROM distinct_sketches s, unnest(s.regs, s.rhos) AS u(reg, rho)
+    WHERE s.level = 'm' AND s.period / 100 = ANY(years)
+    GROUP BY 1,2,3
+  ) r
+  GROUP BY p, kind;
+
+  UPDATE distinct_sketch_state SET version = v, refreshed_at = now();
+  IF cardinality(days) > 0 THEN
+    -- version bump and coalesced view_updated (09-table-versions.sql)
+    PERFORM notify_coalesced('distinct_sketches', days);
+  END IF;
+  RETURN cardinality(days);
+END;
+$$ LANGUAGE plpgsql;
+
+GRANT ALL PRIVILEGES ON distinct_sketches, distinct_sketch_state, sketch_queue TO flink_user;
@@ -0,0 +1,23 @@
+-- Spatial lookup over event locations (gcm/geogrid.py search_bbox / search_radius)
+
+-- 1-degree cell id of a point (geogrid zoom 1): row * 360 + col from the
+-- south-west corner; the 90 / 180 edges fold into the last row / col
+CREATE OR REPLACE FUNCTION geo_cell(lat DOUBLE PRECISION, lon DOUBLE PRECISION) RETURNS INT AS $$
+  SELECT LEAST(floor(lat + 90)::int, 179) * 360 + LEAST(floor(lon + 180)::int, 359);
+$$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE;
+
+-- haversine distance on a 6371 km sphere
+CREATE OR REPLACE FUNCTION great_circle_km(lat1 DOUBLE PRECISION, lon1 DOUBLE PRECISION,
+                                           lat2 DOUBLE PRECISION, lon2 DOUBLE PRECISION)
+RETURNS DOUBLE PRECISION AS $$
+  SELECT 2 * 6371.0 * asin(LEAST(1.0, sqrt(
+    power(sin(radians(lat2 - lat1) / 2), 2)
+    + cos(radians(lat1)) * cos(radians(lat2)) * power(sin(radians(lon2 - lon1) / 2), 2)
+  )));
+$$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE;
+
+-- queries probe the candidate cells, then filter exactly; (cell, day) keeps
+-- a date-bounded probe to one index range per cell
+CREATE INDEX IF NOT EXISTS idx_gdelt_geo_cell
+  ON gdelt_events (geo_cell(action_geo_lat, action_geo_long), event_date)
+  WHERE action_geo_lat IS NOT NULL AND action_geo_long IS NOT NULL;
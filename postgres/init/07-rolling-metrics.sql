@@ -0,0 +1,233 @@
+-- Rolling 7 / 30-day windows per quad class and per country actor
+-- (refreshed by scripts/refresh_rolling.py)
+
+-- one row per window end day; goldstein means are goldstein_sum / goldstein_n
+-- over the window, the same mean as avg_goldstein
+CREATE TABLE IF NOT EXISTS rolling_quadclass_metrics (
+  event_date INT NOT NULL,
+  quad_class INT NOT NULL,
+  events_7d BIGINT NOT NULL,
+  events_30d BIGINT NOT NULL,
+  goldstein_7d DOUBLE PRECISION,
+  goldstein_30d DOUBLE PRECISION,
+  PRIMARY KEY (event_date, quad_class)
+);
+
+-- iso-3 actors only, same set as the map
+CREATE TABLE IF NOT EXISTS rolling_actor_metrics (
+  source_actor_id INT NOT NULL,
+  event_date INT NOT NULL,
+  events_7d BIGINT NOT NULL,
+  conflict_7d BIGINT NOT NULL,
+  events_30d BIGINT NOT NULL,
+  conflict_30d BIGINT NOT NULL,
+  goldstein_7d DOUBLE PRECISION,
+  goldstein_30d DOUBLE PRECISION,
+  PRIMARY KEY (source_actor_id, event_date)
+);
+
+-- windows re-read one actor's days at a time
+CREATE INDEX IF NOT EXISTS idx_top_actors_actor_day ON top_actors(source_actor_id, event_date);
+
+-- table_versions counters (09-table-versions.sql) of the daily tables and
+-- the newest day windows were computed up to, as of the last refresh
+CREATE TABLE IF NOT EXISTS rolling_metrics_state (
+  id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+  quadclass_version BIGINT,
+  actors_version BIGINT,
+  last_window_day INT,
+  refreshed_at TIMESTAMPTZ
+);
+ALTER TABLE rolling_metrics_state ADD COLUMN IF NOT EXISTS quadclass_version BIGINT;
+ALTER TABLE rolling_metrics_state ADD COLUMN IF NOT EXISTS actors_version BIGINT;
+ALTER TABLE rolling_metrics_state ADD COLUMN IF NOT EXISTS last_window_day INT;
+ALTER TABLE rolling_metrics_state DROP COLUMN IF EXISTS watermark;
+INSERT INTO rolling_metrics_state (id) VALUES (TRUE) ON CONFLICT DO NOTHING;
+
+-- (kind, key, day) of deleted daily rows; the version log only has the day,
+-- and a deleted key can't be found by re-reading it. drained by the refresh
+CREATE TABLE IF NOT EXISTS rolling_queue (
+  kind CHAR(1) NOT NULL,
+  k INT NOT NULL,
+  event_date INT NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION queue_rolling_quadclass_deletes() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO rolling_queue (kind, k, event_date)
+  SELECT DISTINCT 'q', quad_class, event_date FROM old_rows;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION queue_rolling_actor_deletes() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO rolling_queue (kind, k, event_date)
+  SELECT DISTINCT 'a', source_actor_id, event_date FROM old_rows
+  WHERE source_actor_id IN (SELECT actor_id FROM actor_dim WHERE is_iso3);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_rolling_quadclass_del ON public.daily_event_volume_by_quadclass;
+CREATE TRIGGER trg_rolling_quadclass_del
+AFTER DELETE ON public.daily_event_volume_by_quadclass
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION queue_rolling_quadclass_deletes();
+
+DROP TRIGGER IF EXISTS trg_rolling_actors_del ON public.top_actors;
+CREATE TRIGGER trg_rolling_actors_del
+AFTER DELETE ON public.top_actors
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION queue_rolling_actor_deletes();
+
+-- a changed day d moves the windows ending on d .. d+29. those windows are
+-- recomputed from a gap-filled daily series of just the affected keys, so the
+-- work follows the change set. returns the number of windows rewritten.
+-- changed days come from the version log of the daily tables, deleted keys
+-- from rolling_queue; a table the log doesn't cover is read in full. when the
+-- newest day moves forward, keys with rows in the 30 days up to the old one
+-- get their windows past it too, changed or not
+CREATE OR REPLACE FUNCTION refresh_rolling_metrics(full_rebuild BOOLEAN DEFAULT FALSE) RETURNS INT AS $$
+DECLARE
+  seen_q BIGINT;
+  seen_a BIGINT;
+  qv BIGINT;
+  av BIGINT;
+  qdays INT[];
+  adays INT[];
+  last_day DATE;
+  prev_day DATE;
+  nq INT;
+  na INT;
+BEGIN
+  SELECT quadclass_version, actors_version, to_date(last_window_day::text, 'YYYYMMDD')
+  INTO seen_q, seen_a, prev_day
+  FROM rolling_metrics_state FOR UPDATE;
+  IF full_rebuild THEN
+    seen_q := NULL;
+    seen_a := NULL;
+    prev_day := NULL;
+    DELETE FROM rolling_quadclass_metrics;
+    DELETE FROM rolling_actor_metrics;
+  END IF;
+  -- days is null when the log can't say what changed
+  SELECT version, days INTO qv, qdays FROM table_changes_since('daily_event_volume_by_quadclass', seen_q);
+  SELECT version, days INTO av, adays FROM table_changes_since('top_actors', seen_a);
+
+  -- (kind, key, day) of every aggregate row on a changed day, and of every
+  -- deleted one. changes committed after the versions were read are picked
+  -- up now and again next time
+  CREATE TEMP TABLE rolling_changed ON COMMIT DROP AS
+  SELECT 'q'::char AS kind, quad_class AS k, event_date AS d
+  FROM daily_event_volume_by_quadclass
+  WHERE qdays IS NULL OR event_date = ANY(qdays)
+  UNION ALL
+  SELECT 'a', source_actor_id, event_date
+  FROM top_actors
+  WHERE (adays IS NULL OR event_date = ANY(adays))
+    AND source_actor_id IN (SELECT actor_id FROM actor_dim WHERE is_iso3);
+  WITH gone AS (DELETE FROM rolling_queue RETURNING kind, k, event_date)
+  INSERT INTO rolling_changed SELECT kind, k, event_date FROM gone;
+
+  -- windows are not extended past the newest day in the data
+  SELECT to_date(MAX(event_date)::text, 'YYYYMMDD') INTO last_day FROM daily_event_volume_by_quadclass;
+
+  -- windows of changed days, plus the ones in (prev_day, last_day] that still
+  -- reach a row on or before prev_day. a key quiet on the newest day has no
+  -- changed day there, but its trailing windows are new all the same
+  CREATE TEMP TABLE rolling_win ON COMMIT DROP AS
+  SELECT DISTINCT c.kind, c.k, c.d + i AS w
+  FROM (
+    SELECT kind, k, to_date(d::text, 'YYYYMMDD') AS d, NULL::date AS after FROM rolling_changed
+    UNION
+    SELECT 'q', quad_class, to_date(event_date::text, 'YYYYMMDD'), prev_day
+    FROM daily_event_volume_by_quadclass
+    WHERE prev_day < last_day
+      AND event_date BETWEEN to_char(prev_day - 29, 'YYYYMMDD')::int AND to_char(prev_day, 'YYYYMMDD')::int
+    UNION
+    SELECT 'a', source_actor_id, to_date(event_date::text, 'YYYYMMDD'), prev_day
+    FROM top_actors
+    WHERE prev_day < last_day
+      AND event_date BETWEEN to_char(prev_day - 29, 'YYYYMMDD')::int AND to_char(prev_day, 'YYYYMMDD')::int
+      AND source_actor_id IN (SELECT actor_id FROM actor_dim WHERE is_iso3)
+  ) c,
+       generate_series(0, 29) i
+  WHERE c.d + i <= last_day AND (c.after IS NULL OR c.d + i > c.after);
+
+  -- gap-filled daily series covering every affected window of a key
+  CREATE TEMP TABLE rolling_daily ON COMMIT DROP AS
+  WITH span AS (
+    SELECT kind, k, MIN(w) - 29 AS lo, MAX(w) AS hi FROM rolling_win GROUP BY 1,2
+  ), cal AS (
+    SELECT s.kind, s.k, g::date AS day, to_char(g, 'YYYYMMDD')::int AS day_i
+    FROM span s, generate_series(s.lo, s.hi, interval '1 day') g
+  )
+  SELECT c.kind, c.k, c.day,
+         COALESCE(v.total_events, 0) AS ev,
+         0::bigint AS cf,
+         COALESCE(v.goldstein_sum, 0) AS gs,
+         COALESCE(v.goldstein_n, 0) AS gn
+  FROM cal c
+  LEFT JOIN daily_event_volume_by_quadclass v ON v.quad_class = c.k AND v.event_date = c.day_i
+  WHERE c.kind = 'q'
+  UNION ALL
+  SELECT c.kind, c.k, c.day,
+         COALESCE(t.total_events, 0),
+         COALESCE(t.conflict_events, 0),
+         COALESCE(t.goldstein_sum, 0),
+         COALESCE(t.goldstein_n, 0)
+  FROM cal c
+  LEFT JOIN top_actors t ON t.source_actor_id = c.k AND t.event_date = c.day_i
+  WHERE c.kind = 'a';
+
+  CREATE TEMP TABLE rolling_out ON COMMIT DROP AS
+  SELECT r.*
+  FROM (
+    SELECT kind, k, day,
+           SUM(ev) OVER w7 AS events_7d,
+           SUM(cf) OVER w7 AS conflict_7d,
+           SUM(ev) OVER w30 AS events_30d,
+           SUM(cf) OVER w30 AS conflict_30d,
+           SUM(gs) OVER w7 / NULLIF(SUM(gn) OVER w7, 0) AS goldstein_7d,
+           SUM(gs) OVER w30 / NULLIF(SUM(gn) OVER w30, 0) AS goldstein_30d
+    FROM rolling_daily
+    WINDOW w7 AS (PARTITION BY kind, k ORDER BY day ROWS 6 PRECEDING),
+           w30 AS (PARTITION BY kind, k ORDER BY day ROWS 29 PRECEDING)
+  ) r
+  JOIN rolling_win w ON w.kind = r.kind AND w.k = r.k AND w.w = r.day;
+
+  -- replace the affected windows; windows with nothing left in 30 days go away
+  DELETE FROM rolling_quadclass_metrics m
+  USING rolling_win w
+  WHERE w.kind = 'q' AND m.quad_class = w.k AND m.event_date = to_char(w.w, 'YYYYMMDD')::int;
+  INSERT INTO rolling_quadclass_metrics
+  SELECT to_char(day, 'YYYYMMDD')::int, k, events_7d, events_30d, goldstein_7d, goldstein_30d
+  FROM rolling_out
+  WHERE kind = 'q' AND events_30d > 0;
+  GET DIAGNOSTICS nq = ROW_COUNT;
+
+  DELETE FROM rolling_actor_metrics m
+  USING rolling_win w
+  WHERE w.kind = 'a' AND m.source_actor_id = w.k AND m.event_date = to_char(w.w, 'YYYYMMDD')::int;
+  INSERT INTO rolling_actor_metrics
+  SELECT k, to_char(day, 'YYYYMMDD')::int, events_7d, conflict_7d, events_30d, conflict_30d,
+         goldstein_7d, goldstein_30d
+  FROM rolling_out
+  WHERE kind = 'a' AND events_30d > 0;
+  GET DIAGNOSTICS na = ROW_COUNT;
+
+  UPDATE rolling_metrics_state
+  SET quadclass_version = qv, actors_version = av,
+      last_window_day = to_char(last_day, 'YYYYMMDD')::int, refreshed_at = now();
+  -- version bump and coalesced view_updated (09-table-versions.sql), but
+  -- only when windows moved
+  IF EXISTS (SELECT 1 FROM rolling_win) THEN
+    PERFORM notify_coalesced('rolling_metrics',
+                             ARRAY(SELECT DISTINCT to_char(w, 'YYYYMMDD')::int FROM rolling_win));
+  END IF;
+  RETURN nq + na;
+END;
+$$ LANGUAGE plpgsql;
+
+GRANT ALL PRIVILEGES ON rolling_quadclass_metrics, rolling_actor_metrics, rolling_metrics_state, rolling_queue TO flink_user;
@@ -0,0 +1,81 @@
+-- Online conflict-rate anomaly detection (gcm/anomaly.py, scripts/detect_anomalies.py)
+-- series key is source_actor_id; 0 = all events (quad-class totals)
+
+-- (series, day) pairs whose aggregate changed, in arrival order; the
+-- detector drains it, so its work follows the change rate
+CREATE TABLE IF NOT EXISTS anomaly_queue (
+  id BIGSERIAL PRIMARY KEY,
+  source_actor_id INT NOT NULL,
+  event_date INT NOT NULL
+);
+
+-- ewma of the daily conflict rate up to (not including) pending_day, the
+-- newest day seen; it is folded in once a later day arrives
+CREATE TABLE IF NOT EXISTS anomaly_state (
+  source_actor_id INT PRIMARY KEY,
+  mean DOUBLE PRECISION NOT NULL DEFAULT 0,
+  var DOUBLE PRECISION NOT NULL DEFAULT 0,
+  n INT NOT NULL DEFAULT 0,                 -- days folded
+  pending_day INT,
+  pending_rate DOUBLE PRECISION,            -- null when the day had too few events
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS conflict_alerts (
+  source_actor_id INT NOT NULL,
+  event_date INT NOT NULL,
+  conflict_rate DOUBLE PRECISION NOT NULL,
+  baseline_rate DOUBLE PRECISION NOT NULL,
+  baseline_std DOUBLE PRECISION NOT NULL,
+  z_score DOUBLE PRECISION NOT NULL,
+  total_events BIGINT NOT NULL,
+  conflict_events BIGINT NOT NULL,
+  detected_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (source_actor_id, event_date)
+);
+CREATE INDEX IF NOT EXISTS idx_conflict_alerts_day ON conflict_alerts(event_date);
+
+CREATE OR REPLACE FUNCTION queue_actor_changes() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO anomaly_queue (source_actor_id, event_date)
+  SELECT DISTINCT source_actor_id, event_date FROM changed_rows
+  WHERE source_actor_id IN (SELECT actor_id FROM actor_dim WHERE is_iso3);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION queue_total_changes() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO anomaly_queue (source_actor_id, event_date)
+  SELECT DISTINCT 0, event_date FROM changed_rows;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- transition tables need one trigger per event; deletes never raise alerts
+DROP TRIGGER IF EXISTS trg_queue_top_actors_ins ON public.top_actors;
+CREATE TRIGGER trg_queue_top_actors_ins
+AFTER INSERT ON public.top_actors
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION queue_actor_changes();
+
+DROP TRIGGER IF EXISTS trg_queue_top_actors_upd ON public.top_actors;
+CREATE TRIGGER trg_queue_top_actors_upd
+AFTER UPDATE ON public.top_actors
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION queue_actor_changes();
+
+DROP TRIGGER IF EXISTS trg_queue_quadclass_ins ON public.daily_event_volume_by_quadclass;
+CREATE TRIGGER trg_queue_quadclass_ins
+AFTER INSERT ON public.daily_event_volume_by_quadclass
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION queue_total_changes();
+
+DROP TRIGGER IF EXISTS trg_queue_quadclass_upd ON public.daily_event_volume_by_quadclass;
+CREATE TRIGGER trg_queue_quadclass_upd
+AFTER UPDATE ON public.daily_event_volume_by_quadclass
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT EXECUTE FUNCTION queue_total_changes();
+
+GRANT ALL PRIVILEGES ON anomaly_queue, anomaly_state, conflict_alerts TO flink_user;
+GRANT ALL PRIVILEGES ON SEQUENCE anomaly_queue_id_seq TO flink_user;
@@ -0,0 +1,216 @@
+-- Change counters for the results tables: freshness checks read one row by
+-- primary key instead of scanning MAX(event_date) / MAX(last_updated)
+
+-- min/max_affected_date cover the rows of the last transaction only
+CREATE TABLE IF NOT EXISTS table_versions (
+  table_name TEXT PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0,
+  last_change_ts TIMESTAMPTZ,
+  min_affected_date INT,
+  max_affected_date INT,
+  notified_at TIMESTAMPTZ,                -- last view_updated sent for the table
+  notify_pending BOOLEAN NOT NULL DEFAULT FALSE
+) WITH (fillfactor = 50);                 -- room for HOT updates, it is rewritten per transaction
+ALTER TABLE table_versions ADD COLUMN IF NOT EXISTS notified_at TIMESTAMPTZ;
+ALTER TABLE table_versions ADD COLUMN IF NOT EXISTS notify_pending BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- every version's changed days (yyyymmdd; NULL = the whole table), so a
+-- reader can ask what changed since the version it last saw. entries older
+-- than gcm.version_log_keep (default 1 hour) are pruned; a reader that fell
+-- further behind starts over
+CREATE TABLE IF NOT EXISTS table_version_log (
+  table_name TEXT NOT NULL,
+  version BIGINT NOT NULL,
+  days INT[],
+  logged_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+  PRIMARY KEY (table_name, version)
+);
+
+-- view_updated coalescing: at most one notification per table per
+-- gcm.notify_interval_ms (default 1000, e.g. ALTER DATABASE gdelt SET
+-- gcm.notify_interval_ms = 2000). a change inside the interval only marks the
+-- table pending; flush_view_notifications() sends it once the interval is over
+CREATE OR REPLACE FUNCTION notify_gap() RETURNS INTERVAL AS $$
+  SELECT make_interval(secs => coalesce(nullif(current_setting('gcm.notify_interval_ms', true), ''), '1000')::int / 1000.0);
+$$ LANGUAGE sql STABLE;
+
+-- one version per transaction: bumps the counter, logs the days and sends
+-- the coalesced notification in a single row update. runs at commit (see
+-- table_change_commit), so the row is locked only while the writer commits
+DROP FUNCTION IF EXISTS bump_table_version(TEXT, INT, INT);
+CREATE OR REPLACE FUNCTION bump_table_version(t TEXT, changed_days INT[]) RETURNS BIGINT AS $$
+DECLARE
+  v BIGINT;
+  pending BOOLEAN;
+BEGIN
+  INSERT INTO table_versions AS tv
+    (table_name, version, last_change_ts, min_affected_date, max_affected_date, notified_at)
+  VALUES (t, 1, clock_timestamp(), changed_days[1], changed_days[cardinality(changed_days)], clock_timestamp())
+  ON CONFLICT (table_name) DO UPDATE SET
+    version = tv.version + 1,
+    last_change_ts = EXCLUDED.last_change_ts,
+    min_affected_date = EXCLUDED.min_affected_date,
+    max_affected_date = EXCLUDED.max_affected_date,
+    notify_pending = coalesce(tv.notified_at > clock_timestamp() - notify_gap(), FALSE),
+    notified_at = CASE WHEN tv.notified_at > clock_timestamp() - notify_gap()
+                       THEN tv.notified_at ELSE clock_timestamp() END
+  RETURNING version, notify_pending INTO v, pending;
+
+  INSERT INTO table_version_log (table_name, version, days) VALUES (t, v, changed_days);
+  IF v % 1000 = 0 THEN
+    DELETE FROM table_version_log
+    WHERE table_name = t
+      AND logged_at < clock_timestamp()
+          - coalesce(nullif(current_setting('gcm.version_log_keep', true), ''), '1 hour')::interval;
+  END IF;
+
+  IF NOT pending THEN
+    PERFORM pg_notify('view_updated', t);
+  END IF;
+  RETURN v;
+END;
+$$ LANGUAGE plpgsql;
+
+-- writers only note what they changed: the days so far live in a
+-- transaction-local setting (gcm.changed_<table>: '{...}' or 'all'), and the
+-- first note queues one deferred trigger event that bumps at commit.
+-- changed_days NULL means the whole table; '{}' only notifies
+CREATE UNLOGGED TABLE IF NOT EXISTS table_change_queue (
+  table_name TEXT NOT NULL,
+  xid XID8 NOT NULL DEFAULT pg_current_xact_id()
+);
+
+DROP FUNCTION IF EXISTS notify_coalesced(TEXT);
+CREATE OR REPLACE FUNCTION notify_coalesced(t TEXT, changed_days INT[] DEFAULT '{}') RETURNS VOID AS $$
+DECLARE
+  k TEXT := 'gcm.changed_' || t;
+  prev TEXT := coalesce(current_setting(k, true), '');
+  merged TEXT;
+BEGIN
+  IF prev = '' THEN
+    INSERT INTO table_change_queue (table_name) VALUES (t);
+  END IF;
+  IF prev = 'all' OR changed_days IS NULL THEN
+    merged := 'all';
+  ELSE
+    SELECT coalesce(array_agg(DISTINCT d ORDER BY d), '{}')::text INTO merged
+    FROM unnest(coalesce(nullif(prev, '')::int[], '{}') || changed_days) d
+    WHERE d IS NOT NULL;
+  END IF;
+  PERFORM set_config(k, merged, true);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION table_change_commit() RETURNS trigger AS $$
+DECLARE
+  k TEXT := 'gcm.changed_' || NEW.table_name;
+  changed TEXT := current_setting(k, true);
+BEGIN
+  PERFORM bump_table_version(NEW.table_name, CASE WHEN changed = 'all' THEN NULL ELSE changed::int[] END);
+  -- a later write in this commit queues a fresh event
+  PERFORM set_config(k, '', true);
+  DELETE FROM table_change_queue WHERE table_name = NEW.table_name AND xid = NEW.xid;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_table_change_commit ON table_change_queue;
+CREATE CONSTRAINT TRIGGER trg_table_change_commit
+AFTER INSERT ON table_change_queue
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW EXECUTE FUNCTION table_change_commit();
+
+-- days changed in t after version since, up to the current version. days is
+-- NULL when the log no longer covers that span or a version replaced the
+-- whole table: the reader reloads everything
+CREATE OR REPLACE FUNCTION table_changes_since(t TEXT, since BIGINT, OUT version BIGINT, OUT days INT[]) AS $$
+  SELECT v.version,
+         CASE
+           WHEN since IS NULL OR since > v.version THEN NULL
+           WHEN since = v.version THEN '{}'::int[]
+           WHEN (SELECT COUNT(l.days) FROM table_version_log l
+                 WHERE l.table_name = t AND l.version > since AND l.version <= v.version) = v.version - since
+           THEN (SELECT coalesce(array_agg(DISTINCT d ORDER BY d), '{}')
+                 FROM table_version_log l, unnest(l.days) d
+                 WHERE l.table_name = t AND l.version > since AND l.version <= v.version)
+         END
+  FROM table_versions v
+  WHERE v.table_name = t;
+$$ LANGUAGE sql STABLE;
+
+-- called by idle subscribers (gcm/notify.py); rows a writer holds are skipped
+-- and picked up on a later call
+CREATE OR REPLACE FUNCTION flush_view_notifications() RETURNS INT AS $$
+DECLARE
+  t TEXT;
+  n INT := 0;
+BEGIN
+  FOR t IN
+    UPDATE table_versions v SET notify_pending = FALSE, notified_at = clock_timestamp()
+    WHERE v.table_name IN (
+      SELECT table_name FROM table_versions
+      WHERE notify_pending AND notified_at <= clock_timestamp() - notify_gap()
+      FOR UPDATE SKIP LOCKED
+    )
+    RETURNING v.table_name
+  LOOP
+    PERFORM pg_notify('view_updated', t);
+    n := n + 1;
+  END LOOP;
+  RETURN n;
+END;
+$$ LANGUAGE plpgsql;
+
+-- statement triggers note the days they touched; the version moves once
+-- per transaction, at commit. an upsert fires both the insert and the update
+-- trigger, and both land in the same note
+CREATE OR REPLACE FUNCTION table_versions_bump() RETURNS trigger AS $$
+DECLARE
+  days INT[];
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    SELECT array_agg(DISTINCT event_date) INTO days FROM new_rows;
+  ELSIF TG_OP = 'DELETE' THEN
+    SELECT array_agg(DISTINCT event_date) INTO days FROM old_rows;
+  ELSE
+    SELECT array_agg(DISTINCT d) INTO days
+    FROM (SELECT event_date AS d FROM new_rows UNION ALL SELECT event_date FROM old_rows) x;
+  END IF;
+  IF days IS NOT NULL THEN
+    PERFORM notify_coalesced(TG_TABLE_NAME, days);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- transition tables allow one event per trigger, so three per table
+DO $$
+DECLARE
+  t TEXT;
+BEGIN
+  FOREACH t IN ARRAY ARRAY[
+    'daily_event_volume_by_quadclass', 'dyad_interactions', 'top_actors', 'daily_cameo_metrics',
+    'daily_goldstein_histogram', 'geo_grid_daily'
+  ] LOOP
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_version_ins ON public.%I', t);
+    EXECUTE format('CREATE TRIGGER trg_version_ins AFTER INSERT ON public.%I
+                    REFERENCING NEW TABLE AS new_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION table_versions_bump()', t);
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_version_upd ON public.%I', t);
+    EXECUTE format('CREATE TRIGGER trg_version_upd AFTER UPDATE ON public.%I
+                    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION table_versions_bump()', t);
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_version_del ON public.%I', t);
+    EXECUTE format('CREATE TRIGGER trg_version_del AFTER DELETE ON public.%I
+                    REFERENCING OLD TABLE AS old_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION table_versions_bump()', t);
+    INSERT INTO table_versions (table_name) VALUES (t) ON CONFLICT DO NOTHING;
+  END LOOP;
+END$$;
+
+-- derived tables, bumped by whatever rebuilds them (refresh functions, detector)
+INSERT INTO table_versions (table_name)
+VALUES ('distinct_sketches'), ('rolling_metrics'), ('conflict_alerts')
+ON CONFLICT DO NOTHING;
+
+GRANT ALL PRIVILEGES ON table_versions, table_version_log, table_change_queue TO flink_user;
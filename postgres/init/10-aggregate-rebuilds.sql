@@ -0,0 +1,20 @@
+-- Offline rebuilds of the results tables (scripts/rebuild_aggregates.py).
+-- The rebuild reads gdelt_events at the consistent point of a new CDC slot,
+-- so the swapped-in tables are exact up to resume_lsn and the streaming job
+-- picks up from that slot without a gap or a double count
+
+CREATE TABLE IF NOT EXISTS aggregate_rebuilds (
+  id BIGSERIAL PRIMARY KEY,
+  started_at TIMESTAMPTZ NOT NULL,
+  swapped_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  tables TEXT[] NOT NULL,
+  slot_name TEXT NOT NULL,
+  resume_lsn PG_LSN NOT NULL,           -- consistent point of slot_name
+  min_event_date INT,
+  max_event_date INT,
+  total_rows BIGINT NOT NULL,
+  seconds DOUBLE PRECISION NOT NULL      -- slot creation to swap
+);
+
+GRANT ALL PRIVILEGES ON aggregate_rebuilds TO flink_user;
+GRANT ALL PRIVILEGES ON SEQUENCE aggregate_rebuilds_id_seq TO flink_user;
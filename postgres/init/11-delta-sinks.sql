@@ -0,0 +1,268 @@
+-- Delta sinks: how the streaming job resumes after scripts/rebuild_aggregates.py.
+-- A job started at the rebuild's slot has empty GROUP BY state, so its
+-- upserts would replace rebuilt rows with aggregates of post-resume rows
+-- only. Instead, every change to gdelt_events is logged as signed rows (+1
+-- added, -1 removed); the delta job (flink/sql/run-deltas.sql) sums them per
+-- group into <table>_delta, and a trigger there adds each change of a delta
+-- row onto the results row. The results tables stay base + delta, exact.
+
+-- signed copies of changed gdelt_events rows. the rows only have to reach
+-- the wal: the delta job reads them from the slot, and they are deleted in
+-- the statement that wrote them
+CREATE TABLE IF NOT EXISTS gdelt_event_changes (
+  change_id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  sign SMALLINT NOT NULL CHECK (sign IN (-1, 1)),
+  event_date INT NOT NULL,
+  source_actor_id INT,
+  target_actor_id INT,
+  cameo_id SMALLINT,
+  num_events INT NOT NULL,
+  num_articles INT NOT NULL,
+  quad_class INT NOT NULL,
+  goldstein DOUBLE PRECISION,
+  action_geo_lat DOUBLE PRECISION,
+  action_geo_long DOUBLE PRECISION
+);
+
+-- inserts only, so the deletes below never reach the delta job
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM pg_publication WHERE pubname = 'gdelt_flink_delta_pub') THEN
+    CREATE PUBLICATION gdelt_flink_delta_pub FOR TABLE public.gdelt_event_changes
+      WITH (publish = 'insert');
+  END IF;
+END$$;
+
+CREATE OR REPLACE FUNCTION gdelt_capture_changes() RETURNS trigger AS $$
+DECLARE
+  lo BIGINT;
+  hi BIGINT;
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    WITH c AS (
+      INSERT INTO gdelt_event_changes (sign, event_date, source_actor_id, target_actor_id, cameo_id,
+        num_events, num_articles, quad_class, goldstein, action_geo_lat, action_geo_long)
+      SELECT 1, event_date, source_actor_id, target_actor_id, cameo_id,
+             num_events, num_articles, quad_class, goldstein, action_geo_lat, action_geo_long
+      FROM new_rows
+      RETURNING change_id
+    )
+    SELECT MIN(change_id), MAX(change_id) INTO lo, hi FROM c;
+  ELSIF TG_OP = 'DELETE' THEN
+    WITH c AS (
+      INSERT INTO gdelt_event_changes (sign, event_date, source_actor_id, target_actor_id, cameo_id,
+        num_events, num_articles, quad_class, goldstein, action_geo_lat, action_geo_long)
+      SELECT -1, event_date, source_actor_id, target_actor_id, cameo_id,
+             num_events, num_articles, quad_class, goldstein, action_geo_lat, action_geo_long
+      FROM old_rows
+      RETURNING change_id
+    )
+    SELECT MIN(change_id), MAX(change_id) INTO lo, hi FROM c;
+  ELSE
+    WITH c AS (
+      INSERT INTO gdelt_event_changes (sign, event_date, source_actor_id, target_actor_id, cameo_id,
+        num_events, num_articles, quad_class, goldstein, action_geo_lat, action_geo_long)
+      SELECT -1, event_date, source_actor_id, target_actor_id, cameo_id,
+             num_events, num_articles, quad_class, goldstein, action_geo_lat, action_geo_long
+      FROM old_rows
+      UNION ALL
+      SELECT 1, event_date, source_actor_id, target_actor_id, cameo_id,
+             num_events, num_articles, quad_class, goldstein, action_geo_lat, action_geo_long
+      FROM new_rows
+      RETURNING change_id
+    )
+    SELECT MIN(change_id), MAX(change_id) INTO lo, hi FROM c;
+  END IF;
+  -- other writers' ids in lo..hi are uncommitted, so not visible here
+  DELETE FROM gdelt_event_changes WHERE change_id BETWEEN lo AND hi;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- capture is on from a rebuild (gcm/rebuild.py, before it creates the slot)
+-- until reset-cdc.sh. creating the triggers waits for running writers, so
+-- every transaction committing after the slot's consistent point is logged
+CREATE OR REPLACE FUNCTION gdelt_change_log(enabled BOOLEAN) RETURNS VOID AS $$
+BEGIN
+  DROP TRIGGER IF EXISTS trg_gdelt_changes_ins ON gdelt_events;
+  DROP TRIGGER IF EXISTS trg_gdelt_changes_upd ON gdelt_events;
+  DROP TRIGGER IF EXISTS trg_gdelt_changes_del ON gdelt_events;
+  IF enabled THEN
+    CREATE TRIGGER trg_gdelt_changes_ins AFTER INSERT ON gdelt_events
+      REFERENCING NEW TABLE AS new_rows
+      FOR EACH STATEMENT EXECUTE FUNCTION gdelt_capture_changes();
+    CREATE TRIGGER trg_gdelt_changes_upd AFTER UPDATE ON gdelt_events
+      REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+      FOR EACH STATEMENT EXECUTE FUNCTION gdelt_capture_changes();
+    CREATE TRIGGER trg_gdelt_changes_del AFTER DELETE ON gdelt_events
+      REFERENCING OLD TABLE AS old_rows
+      FOR EACH STATEMENT EXECUTE FUNCTION gdelt_capture_changes();
+  END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION gdelt_change_log_enabled() RETURNS BOOLEAN AS $$
+  SELECT EXISTS (SELECT 1 FROM pg_trigger
+                 WHERE tgrelid = 'public.gdelt_events'::regclass AND tgname = 'trg_gdelt_changes_ins');
+$$ LANGUAGE sql STABLE;
+
+-- running totals of signed rows since the delta job started, written by its
+-- jdbc upserts. the rebuild empties them: a new job counts from zero
+CREATE TABLE IF NOT EXISTS daily_event_volume_by_quadclass_delta (
+  event_date INT NOT NULL,
+  quad_class INT NOT NULL,
+  row_count BIGINT NOT NULL,
+  total_events BIGINT NOT NULL,
+  total_articles BIGINT NOT NULL,
+  goldstein_sum DOUBLE PRECISION,
+  goldstein_n BIGINT NOT NULL,
+  last_updated TIMESTAMP NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (event_date, quad_class)
+);
+
+CREATE TABLE IF NOT EXISTS dyad_interactions_delta (
+  event_date INT NOT NULL,
+  source_actor_id INT NOT NULL,
+  target_actor_id INT NOT NULL,
+  row_count BIGINT NOT NULL,
+  total_events BIGINT NOT NULL,
+  goldstein_sum DOUBLE PRECISION,
+  goldstein_n BIGINT NOT NULL,
+  last_updated TIMESTAMP NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (event_date, source_actor_id, target_actor_id)
+);
+
+CREATE TABLE IF NOT EXISTS top_actors_delta (
+  event_date INT NOT NULL,
+  source_actor_id INT NOT NULL,
+  row_count BIGINT NOT NULL,
+  total_events BIGINT NOT NULL,
+  total_articles BIGINT NOT NULL,
+  conflict_events BIGINT NOT NULL,
+  goldstein_sum DOUBLE PRECISION,
+  goldstein_n BIGINT NOT NULL,
+  last_updated TIMESTAMP NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (event_date, source_actor_id)
+);
+
+CREATE TABLE IF NOT EXISTS daily_cameo_metrics_delta (
+  event_date INT NOT NULL,
+  cameo_id SMALLINT NOT NULL,
+  row_count BIGINT NOT NULL,
+  total_events BIGINT NOT NULL,
+  total_articles BIGINT NOT NULL,
+  goldstein_sum DOUBLE PRECISION,
+  goldstein_n BIGINT NOT NULL,
+  last_updated TIMESTAMP NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (event_date, cameo_id)
+);
+
+CREATE TABLE IF NOT EXISTS daily_goldstein_histogram_delta (
+  event_date INT NOT NULL,
+  quad_class INT NOT NULL,
+  bin SMALLINT NOT NULL,
+  n BIGINT NOT NULL,
+  last_updated TIMESTAMP NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (event_date, quad_class, bin)
+);
+
+CREATE TABLE IF NOT EXISTS geo_grid_daily_delta (
+  zoom SMALLINT NOT NULL,
+  event_date INT NOT NULL,
+  cell_y INT NOT NULL,
+  cell_x INT NOT NULL,
+  row_count BIGINT NOT NULL,
+  total_events BIGINT NOT NULL,
+  conflict_events BIGINT NOT NULL,
+  goldstein_sum DOUBLE PRECISION,
+  goldstein_n BIGINT NOT NULL,
+  last_updated TIMESTAMP NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (zoom, event_date, cell_y, cell_x)
+);
+
+-- one apply function per table: the difference between the new and the old
+-- running total goes onto the results row, which is deleted once its last
+-- raw row is gone. the sink upserts each key from one subtask, so a key has
+-- one writer. the trigger fires only when a total moved (replays rewrite
+-- the same values)
+DO $$
+DECLARE
+  r RECORD;
+  cols TEXT[];
+  keys TEXT;
+  diff TEXT;
+  upd TEXT;
+  ins_cols TEXT;
+  ins_vals TEXT;
+BEGIN
+  FOR r IN SELECT * FROM (VALUES
+    ('daily_event_volume_by_quadclass', '{event_date,quad_class}'::text[],
+     '{row_count,total_events,total_articles,goldstein_n}'::text[], 'row_count', TRUE, TRUE),
+    ('dyad_interactions', '{event_date,source_actor_id,target_actor_id}',
+     '{row_count,total_events,goldstein_n}', 'row_count', TRUE, TRUE),
+    ('top_actors', '{event_date,source_actor_id}',
+     '{row_count,total_events,total_articles,conflict_events,goldstein_n}', 'row_count', TRUE, TRUE),
+    ('daily_cameo_metrics', '{event_date,cameo_id}',
+     '{row_count,total_events,total_articles,goldstein_n}', 'row_count', TRUE, TRUE),
+    ('daily_goldstein_histogram', '{event_date,quad_class,bin}', '{n}', 'n', FALSE, FALSE),
+    ('geo_grid_daily', '{zoom,event_date,cell_y,cell_x}',
+     '{row_count,total_events,conflict_events,goldstein_n}', 'row_count', TRUE, FALSE)
+  ) v(t, key_cols, sum_cols, counter, has_sum, has_avg) LOOP
+    cols := r.sum_cols || CASE WHEN r.has_sum THEN '{goldstein_sum}'::text[] ELSE '{}' END;
+    keys := (SELECT string_agg(format('r.%1$I = NEW.%1$I', k), ' AND ') FROM unnest(r.key_cols) k);
+    diff := (SELECT string_agg(format('coalesce(NEW.%1$I, 0) - coalesce(OLD.%1$I, 0) AS %1$I', c), ', ')
+             FROM unnest(cols) c);
+    upd := (SELECT string_agg(format('%1$I = r.%1$I + d.%1$I', c), ', ') FROM unnest(r.sum_cols) c);
+    ins_cols := array_to_string(r.key_cols || r.sum_cols, ', ');
+    ins_vals := (SELECT string_agg(format('NEW.%I', k), ', ') FROM unnest(r.key_cols) k)
+             || ', ' || (SELECT string_agg(format('d.%I', c), ', ') FROM unnest(r.sum_cols) c);
+    IF r.has_sum THEN
+      -- sum(goldstein) over no values is null, as in the raw aggregate
+      upd := upd || ', goldstein_sum = CASE WHEN r.goldstein_n + d.goldstein_n > 0'
+                 || ' THEN coalesce(r.goldstein_sum, 0) + d.goldstein_sum END';
+      ins_cols := ins_cols || ', goldstein_sum';
+      ins_vals := ins_vals || ', CASE WHEN d.goldstein_n > 0 THEN d.goldstein_sum END';
+    END IF;
+    IF r.has_avg THEN
+      upd := upd || ', avg_goldstein = (coalesce(r.goldstein_sum, 0) + d.goldstein_sum)'
+                 || ' / NULLIF(r.goldstein_n + d.goldstein_n, 0)';
+      ins_cols := ins_cols || ', avg_goldstein';
+      ins_vals := ins_vals || ', d.goldstein_sum / NULLIF(d.goldstein_n, 0)';
+    END IF;
+
+    EXECUTE format($f$
+      CREATE OR REPLACE FUNCTION %1$I() RETURNS trigger AS $body$
+      DECLARE
+        d RECORD;
+        left_rows BIGINT;
+      BEGIN
+        SELECT %3$s INTO d;
+        UPDATE public.%2$I r SET %4$s, last_updated = NOW()
+        WHERE %5$s
+        RETURNING r.%8$I INTO left_rows;
+        IF NOT FOUND THEN
+          IF d.%8$I > 0 THEN
+            INSERT INTO public.%2$I (%6$s) VALUES (%7$s);
+          END IF;
+        ELSIF left_rows <= 0 THEN
+          DELETE FROM public.%2$I r WHERE %5$s;
+        END IF;
+        RETURN NULL;
+      END;
+      $body$ LANGUAGE plpgsql;
+    $f$, r.t || '_apply_delta', r.t, diff, upd, keys, ins_cols, ins_vals, r.counter);
+
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_apply_delta_ins ON public.%I', r.t || '_delta');
+    EXECUTE format('CREATE TRIGGER trg_apply_delta_ins AFTER INSERT ON public.%I
+                    FOR EACH ROW EXECUTE FUNCTION %I()', r.t || '_delta', r.t || '_apply_delta');
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_apply_delta_upd ON public.%I', r.t || '_delta');
+    EXECUTE format('CREATE TRIGGER trg_apply_delta_upd AFTER UPDATE ON public.%I
+                    FOR EACH ROW WHEN ((%s) IS DISTINCT FROM (%s))
+                    EXECUTE FUNCTION %I()', r.t || '_delta',
+                   (SELECT string_agg(format('OLD.%I', c), ', ') FROM unnest(cols) c),
+                   (SELECT string_agg(format('NEW.%I', c), ', ') FROM unnest(cols) c),
+                   r.t || '_apply_delta');
+  END LOOP;
+END$$;
+
+GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA public TO flink_user;
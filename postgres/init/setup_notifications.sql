@@ -1,26 +1,11 @@
-CREATE OR REPLACE FUNCTION notify_view_updated() RETURNS trigger AS $$
-BEGIN
-  PERFORM pg_notify('view_updated', TG_TABLE_NAME);
-  RETURN NULL;
-END;
-$$ LANGUAGE plpgsql;
-
+-- view_updated is sent at commit by the table_versions triggers
+-- (09-table-versions.sql), at most once per table per transaction and
+-- coalesced per notify interval. the per-statement triggers that used to
+-- send it are dropped here
 DROP TRIGGER IF EXISTS trg_notify_daily_event_volume ON public.daily_event_volume_by_quadclass;
-CREATE TRIGGER trg_notify_daily_event_volume
-AFTER INSERT OR UPDATE OR DELETE ON public.daily_event_volume_by_quadclass
-FOR EACH STATEMENT EXECUTE FUNCTION notify_view_updated();
-
 DROP TRIGGER IF EXISTS trg_notify_dyads ON public.dyad_interactions;
-CREATE TRIGGER trg_notify_dyads
-AFTER INSERT OR UPDATE OR DELETE ON public.dyad_interactions
-FOR EACH STATEMENT EXECUTE FUNCTION notify_view_updated();
-
 DROP TRIGGER IF EXISTS trg_notify_top_actors ON public.top_actors;
-CREATE TRIGGER trg_notify_top_actors
-AFTER INSERT OR UPDATE OR DELETE ON public.top_actors
-FOR EACH STATEMENT EXECUTE FUNCTION notify_view_updated();
-
 DROP TRIGGER IF EXISTS trg_notify_cameo ON public.daily_cameo_metrics;
-CREATE TRIGGER trg_notify_cameo
-AFTER INSERT OR UPDATE OR DELETE ON public.daily_cameo_metrics
-FOR EACH STATEMENT EXECUTE FUNCTION notify_view_updated();
\ No newline at end of file
+DROP TRIGGER IF EXISTS trg_notify_goldstein_hist ON public.daily_goldstein_histogram;
+DROP TRIGGER IF EXISTS trg_notify_geo_grid ON public.geo_grid_daily;
+DROP FUNCTION IF EXISTS notify_view_updated();
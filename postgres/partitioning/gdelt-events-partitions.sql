@@ -0,0 +1,56 @@
+-- Range partitioning helpers for gdelt_events (applied by scripts/partition_events.py)
+
+-- one-row config: partition granularity chosen at migration time
+CREATE TABLE IF NOT EXISTS gdelt_event_partitioning (
+  id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+  granularity TEXT NOT NULL CHECK (granularity IN ('year', 'month'))
+);
+
+-- partition name and [lo, hi) yyyymmdd bounds holding event_date d
+CREATE OR REPLACE FUNCTION gdelt_event_partition_bounds(d INT, granularity TEXT,
+  OUT part_name TEXT, OUT lo INT, OUT hi INT) AS $$
+DECLARE
+  y INT := d / 10000;
+  m INT := (d / 100) % 100;
+BEGIN
+  IF granularity = 'month' THEN
+    part_name := format('gdelt_events_m%s%s', y, lpad(m::text, 2, '0'));
+    lo := y * 10000 + m * 100;
+    hi := CASE WHEN m = 12 THEN (y + 1) * 10000 + 100 ELSE y * 10000 + (m + 1) * 100 END;
+  ELSE
+    part_name := format('gdelt_events_y%s', y);
+    lo := y * 10000;
+    hi := (y + 1) * 10000;
+  END IF;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- create any missing partitions of parent_table covering [start_date, end_date]
+CREATE OR REPLACE FUNCTION ensure_gdelt_event_partitions(start_date INT, end_date INT,
+  parent_table TEXT DEFAULT 'gdelt_events') RETURNS INT AS $$
+DECLARE
+  g TEXT;
+  b RECORD;
+  d INT := start_date;
+  created INT := 0;
+BEGIN
+  SELECT granularity INTO g FROM gdelt_event_partitioning;
+  IF g IS NULL THEN
+    RAISE EXCEPTION 'gdelt_event_partitioning is not configured';
+  END IF;
+
+  WHILE d <= end_date LOOP
+    SELECT * INTO b FROM gdelt_event_partition_bounds(d, g);
+    IF to_regclass('public.' || b.part_name) IS NULL THEN
+      EXECUTE format('CREATE TABLE public.%I PARTITION OF public.%I FOR VALUES FROM (%s) TO (%s)',
+                     b.part_name, parent_table, b.lo, b.hi);
+      -- cdc needs old row images on every partition
+      EXECUTE format('ALTER TABLE public.%I REPLICA IDENTITY FULL', b.part_name);
+      created := created + 1;
+    END IF;
+    d := b.hi;
+  END LOOP;
+
+  RETURN created;
+END;
+$$ LANGUAGE plpgsql;
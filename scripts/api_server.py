@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# read-only json api over the dashboard frames (see gcm/api.py)
+import os
+import sys
+import argparse
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
+
+from gcm import api
+
+
+def main():
+    ap = argparse.ArgumentParser(description="serve the dashboard aggregates as json")
+    ap.add_argument("--host", default=api.API_HOST)
+    ap.add_argument("--port", type=int, default=api.API_PORT)
+    args = ap.parse_args()
+
+    httpd = api.serve(args.host, args.port)
+    print(f"[api] listening on http://{args.host}:{args.port} (frames: {', '.join(api.FRAME_TABLES)})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
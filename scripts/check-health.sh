@@ -13,4 +13,12 @@ echo ""
 echo "4. Flink Web UI:"
 curl -s http://localhost:8081/overview | grep -o '"taskmanagers":[0-9]*' || echo "Flink not accessible"
 echo ""
+echo "5. CDC Slot Lag:"
+docker exec gdelt-postgres psql -U flink_user -d gdelt -t -c "
+SELECT slot_name,
+       active,
+       pg_size_pretty(pg_wal_lsn_diff(pg_current_wal_lsn(), confirmed_flush_lsn)) AS flush_lag,
+       pg_size_pretty(pg_wal_lsn_diff(pg_current_wal_lsn(), restart_lsn)) AS retained_wal
+FROM pg_replication_slots;" || echo "Slot query failed"
+echo ""
 echo "=== End Check ==="
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# drain the anomaly queue and flag conflict-rate spikes per country
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
+
+from gcm import anomaly
+from gcm.data import get_db_conn
+
+
+def main():
+    ap = argparse.ArgumentParser(description="online ewma anomaly detection on per-country conflict rates")
+    ap.add_argument("--interval", type=float, default=5.0, help="seconds between polls when the queue is empty")
+    ap.add_argument("--batch", type=int, default=anomaly.BATCH_SIZE, help="queue entries per transaction")
+    ap.add_argument("--once", action="store_true", help="drain the queue once and exit")
+    ap.add_argument("--reset", action="store_true",
+                    help="drop all baselines and alerts and replay the full history first")
+    args = ap.parse_args()
+
+    conn = get_db_conn()
+    try:
+        if args.reset:
+            n = anomaly.reset(conn)
+            print(f"[reset] queued {n:,} historical series-days")
+
+        while True:
+            t0 = time.perf_counter()
+            try:
+                stats = anomaly.process_batch(conn, args.batch)
+            except Exception as e:
+                conn.rollback()
+                if args.once:
+                    raise
+                print(f"[warn] batch failed: {e}", file=sys.stderr)
+                time.sleep(args.interval)
+                continue
+
+            if stats["queued"]:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] {stats['queued']:,} changes • "
+                      f"{stats['scored']:,} scored • {stats['alerts']:,} alerts • {stats['cleared']:,} cleared "
+                      f"in {(time.perf_counter() - t0) * 1000:.0f} ms")
+            # keep draining while the queue is full, otherwise wait
+            if stats["queued"] < args.batch:
+                if args.once:
+                    break
+                time.sleep(args.interval)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# stream an aggregate table or raw events for a date range to csv.gz / parquet
+import os
+import sys
+import argparse
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
+
+from gcm import export
+from gcm.slot_monitor import format_bytes
+
+
+def show(p: export.ExportProgress):
+    print(f"\r[export] {p.rows:>12,} rows {format_bytes(p.bytes):>9} "
+          f"{p.rows_per_sec:>10,.0f} rows/s {format_bytes(p.bytes_per_sec):>9}/s", end="", flush=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="bounded-memory export of aggregates or raw events")
+    ap.add_argument("name", choices=list(export.EXPORTS))
+    ap.add_argument("--format", choices=export.FORMATS, default="csv.gz")
+    ap.add_argument("--start", type=int, default=19000101, help="first event_date (yyyymmdd)")
+    ap.add_argument("--end", type=int, default=99991231, help="last event_date (yyyymmdd)")
+    ap.add_argument("--out", default=None, help="output file (default: EXPORT_DIR/<name>_<start>_<end>.<format>)")
+    args = ap.parse_args()
+
+    p = export.export_file(args.name, args.format, args.start, args.end, path=args.out, progress=show)
+    print(f"\n[export] {p.path}: {p.rows:,} rows, {format_bytes(p.bytes)} in {p.seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
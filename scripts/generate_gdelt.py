@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# synthetic gdelt in the reduced file format, for scaling tests without the
+# real dataset: to a file load-gdelt.sh reads, to stdout, or straight into
+# gdelt_events with a staged COPY (gcm/synth.py)
+import io
+import os
+import sys
+import gzip
+import time
+import argparse
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
+
+import numpy as np
+
+from gcm import synth, workload
+from gcm.db import connect as get_conn
+
+
+def copy_chunks(chunks, args, report):
+    conn = get_conn()
+    cur = conn.cursor()
+    cols = ",".join(c for _, c in synth.FILE_COLUMNS[args.columns])
+    try:
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('public.gdelt_events')")
+        if cur.fetchone()[0] == "p":
+            cur.execute("SELECT ensure_gdelt_event_partitions(%s, %s);", (args.start, args.end))
+            report(f"[copy] ensured {cur.fetchone()[0]} partitions for {args.start}..{args.end}")
+        conn.commit()
+        # one transaction per chunk: an interrupted load keeps whole chunks.
+        # staged like load-gdelt.sh, so codes are encoded once per chunk
+        for rows, data in synth.generate(chunks, args.profile, args.columns, args.jobs):
+            cur.execute("SELECT gdelt_create_staging();")
+            cur.copy_expert(f"COPY gdelt_staged({cols}) FROM STDIN "
+                            "WITH (FORMAT text, DELIMITER E'\\t', NULL '')", io.BytesIO(data))
+            cur.execute("SELECT gdelt_insert_staged();")
+            conn.commit()
+            yield rows, len(data)
+    finally:
+        cur.close()
+        conn.close()
+
+
+def write_chunks(chunks, args):
+    if args.out == "-":
+        out = sys.stdout.buffer
+    elif args.out.endswith(".gz"):
+        out = gzip.open(args.out, "wb", compresslevel=1)
+    else:
+        out = open(args.out, "wb")
+    try:
+        out.write(synth.header(args.columns))
+        for rows, data in synth.generate(chunks, args.profile, args.columns, args.jobs):
+            out.write(data)
+            yield rows, len(data)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+        else:
+            out.flush()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="generate synthetic gdelt events (reduced file format)")
+    ap.add_argument("--rows", type=int, required=True, help="events to generate")
+    ap.add_argument("--start", type=int, default=19790101, help="first event_date, yyyymmdd")
+    ap.add_argument("--end", type=int, default=20241231, help="last event_date, yyyymmdd")
+    ap.add_argument("--columns", type=int, choices=sorted(synth.FILE_COLUMNS), default=17,
+                    help="17 (source, target and action locations) or 11 (action only)")
+    target = ap.add_mutually_exclusive_group(required=True)
+    target.add_argument("--out", help="output file ('-' for stdout, '.gz' to compress)")
+    target.add_argument("--copy", action="store_true", help="COPY straight into gdelt_events")
+    ap.add_argument("--profile", choices=list(workload.PROFILES), default="gdelt",
+                    help="actor, dyad and cameo skew (dates are spread over --start..--end)")
+    ap.add_argument("--growth", type=float, default=0.1, help="yearly growth of events per day")
+    ap.add_argument("--seed", type=int, help="seed; same seed and chunk size give the same rows")
+    ap.add_argument("--chunk-rows", type=int, default=synth.SYNTH_CHUNK_ROWS, help="rows per chunk")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="processes rendering chunks")
+    args = ap.parse_args()
+
+    def report(msg):
+        # stdout may be the data
+        print(msg, file=sys.stderr if args.out == "-" else sys.stdout, flush=True)
+
+    if args.seed is None:
+        args.seed = int(np.random.SeedSequence().entropy % 2**32)
+    chunks = synth.plan(args.rows, args.start, args.end, args.chunk_rows, args.growth, args.seed)
+    report(f"[plan] {args.rows:,} rows, {args.start}..{args.end}, {len(chunks)} chunks, "
+           f"{args.columns} columns, profile {args.profile}, seed {args.seed}, {args.jobs} jobs")
+
+    t0 = last = time.perf_counter()
+    done = size = 0
+    stream = copy_chunks(chunks, args, report) if args.copy else write_chunks(chunks, args)
+    for rows, n in stream:
+        done += rows
+        size += n
+        now = time.perf_counter()
+        if now - last >= 2.0 or done == args.rows:
+            last = now
+            report(f"[gen] {done:,}/{args.rows:,} rows, {done / (now - t0):,.0f} rows/s, "
+                   f"{size / (now - t0) / 2**20:.1f} MB/s")
+    report(f"[done] {done:,} rows, {size / 2**20:,.1f} MB in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -123,12 +123,32 @@ else
   '"
 fi
 
-# bulk load via stdin
-echo "[append] streaming sanitized rows into \\copy FROM STDIN..."
+# partitioned layout: create partitions for the slice's date range up front
+# (rows outside every partition would land in gdelt_events_default)
+is_partitioned="$(docker exec -i "$POSTGRES_CONTAINER" psql -U "$USER" -d "$DB" -t -A -c \
+  "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('public.gdelt_events');")"
+if [[ "${is_partitioned//[[:space:]]/}" == "t" ]]; then
+  date_range="$(docker exec -i "$POSTGRES_CONTAINER" bash -lc "tail -n +${start_line} \"$container_file\" | head -n ${SMALL_LOAD_LINES} \
+    | awk -F \"\t\" '\$1 ~ /^[0-9]+\$/ && length(\$1) == 8 { d = \$1 + 0; if (min == \"\" || d < min) min = d; if (d > max) max = d } END { print min, max }'")"
+  read -r range_lo range_hi <<<"$date_range"
+  if [[ -n "${range_lo:-}" && -n "${range_hi:-}" ]]; then
+    echo "[append] ensuring partitions for ${range_lo}..${range_hi}"
+    docker exec -i "$POSTGRES_CONTAINER" psql -U "$USER" -d "$DB" -v ON_ERROR_STOP=1 -t -A -c \
+      "SELECT ensure_gdelt_event_partitions(${range_lo}, ${range_hi});" >/dev/null
+  fi
+fi
+
+# bulk load via stdin into a staging table; the batch's new codes go into the
+# dimensions once and rows are inserted with their ids (gdelt_insert_staged in
+# 01-init-schema.sql), instead of a per-row trigger lookup
+echo "[append] streaming sanitized rows into \\copy FROM STDIN (staged)..."
 docker exec -i "$POSTGRES_CONTAINER" bash -lc "$STREAM_CMD" \
-  | docker exec -i "$POSTGRES_CONTAINER" psql -U "$USER" -d "$DB" -v ON_ERROR_STOP=1 -c "\
-\\copy public.gdelt_events($cols_clause) \
-FROM STDIN WITH (FORMAT text, DELIMITER E'\\t', NULL '', ENCODING 'UTF8');"
+  | docker exec -i "$POSTGRES_CONTAINER" psql -U "$USER" -d "$DB" -v ON_ERROR_STOP=1 -t -A \
+    -c "BEGIN;" \
+    -c "SELECT gdelt_create_staging();" \
+    -c "\\copy gdelt_staged($cols_clause) FROM STDIN WITH (FORMAT text, DELIMITER E'\\t', NULL '', ENCODING 'UTF8')" \
+    -c "SELECT 'inserted ' || gdelt_insert_staged();" \
+    -c "COMMIT;"
 
 # quick sanity count
 echo "[append] done. row count now:"
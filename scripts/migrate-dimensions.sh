@@ -0,0 +1,34 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# move an existing database to actor_dim / cameo_dim integer keys
+# flink must be stopped: the backfill rewrites every row of gdelt_events
+
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+ROOT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+
+POSTGRES_CONTAINER="${POSTGRES_CONTAINER:-gdelt-postgres}"
+POSTGRES_DB="${POSTGRES_DB:-gdelt}"
+POSTGRES_USER="${POSTGRES_USER:-flink_user}"
+POSTGRES_PASSWORD="${POSTGRES_PASSWORD:-flink_pass}"
+
+# sql file
+pg_file() {
+  echo "[migrate] applying $1"
+  docker exec -i -e PGPASSWORD="$POSTGRES_PASSWORD" "$POSTGRES_CONTAINER" \
+    psql -U "$POSTGRES_USER" -d "$POSTGRES_DB" -v ON_ERROR_STOP=1 -q < "$1"
+}
+
+# drop slot + publication so the backfill isn't replicated
+STOP_FLINK=1 "$SCRIPT_DIR/reset-cdc.sh"
+
+pg_file "$ROOT_DIR/postgres/init/00-dimensions.sql"
+pg_file "$ROOT_DIR/postgres/migrations/encode-dimensions.sql"
+pg_file "$ROOT_DIR/postgres/init/02-publication.sql"
+pg_file "$ROOT_DIR/postgres/init/03-results-schema.sql"
+pg_file "$ROOT_DIR/postgres/init/09-table-versions.sql"
+pg_file "$ROOT_DIR/postgres/init/setup_notifications.sql"
+
+echo "[ok] dimensions migrated"
+echo "next: restart flink and the pipeline (initial snapshot rebuilds the results tables)"
+echo "  docker compose up -d && ./scripts/start-flink-aggregations.sh"
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# migrate gdelt_events to range partitions on event_date, manage partitions
+#
+# stop loaders / workload before `migrate`; flink can keep running, the
+# publication is pointed at the new root with publish_via_partition_root
+import os
+import sys
+import time
+import argparse
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
+
+from gcm.db import connect as get_conn
+
+PARTITION_SQL = os.path.join(ROOT_DIR, "postgres", "partitioning", "gdelt-events-partitions.sql")
+
+PUBLICATION_NAME = os.getenv("PUBLICATION_NAME", "gdelt_flink_pub")
+
+COLUMNS = [
+    "globaleventid", "event_date", "source_actor", "target_actor", "cameo_code",
+    "source_actor_id", "target_actor_id", "cameo_id",
+    "num_events", "num_articles", "quad_class", "goldstein",
+    "source_geo_type", "source_geo_lat", "source_geo_long",
+    "target_geo_type", "target_geo_lat", "target_geo_long",
+    "action_geo_type", "action_geo_lat", "action_geo_long",
+]
+
+PARTITIONED_DDL = """
+CREATE TABLE gdelt_events_part (
+    globaleventid BIGINT GENERATED BY DEFAULT AS IDENTITY,
+
+    event_date INT NOT NULL,
+    source_actor TEXT NOT NULL,
+    target_actor TEXT NOT NULL,
+    cameo_code TEXT NOT NULL,
+
+    source_actor_id INT,
+    target_actor_id INT,
+    cameo_id SMALLINT,
+
+    num_events INT NOT NULL,
+    num_articles INT NOT NULL,
+    quad_class INT NOT NULL,
+    goldstein DOUBLE PRECISION,
+
+    source_geo_type INT,
+    source_geo_lat DOUBLE PRECISION,
+    source_geo_long DOUBLE PRECISION,
+
+    target_geo_type INT,
+    target_geo_lat DOUBLE PRECISION,
+    target_geo_long DOUBLE PRECISION,
+
+    action_geo_type INT,
+    action_geo_lat DOUBLE PRECISION,
+    action_geo_long DOUBLE PRECISION,
+
+    -- partition key must be part of the primary key
+    PRIMARY KEY (globaleventid, event_date)
+) PARTITION BY RANGE (event_date);
+"""
+
+# built after the copy, partitioned indexes cascade to every partition
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_gdelt_p_event_date ON gdelt_events_part(event_date);",
+    "CREATE INDEX IF NOT EXISTS idx_gdelt_p_source_actor ON gdelt_events_part(source_actor_id);",
+    "CREATE INDEX IF NOT EXISTS idx_gdelt_p_target_actor ON gdelt_events_part(target_actor_id);",
+    "CREATE INDEX IF NOT EXISTS idx_gdelt_p_cameo_code ON gdelt_events_part(cameo_id);",
+    "CREATE INDEX IF NOT EXISTS idx_gdelt_p_quad_class ON gdelt_events_part(quad_class);",
+    # needs geo_cell() from postgres/init/06-geo-search.sql
+    "CREATE INDEX IF NOT EXISTS idx_gdelt_p_geo_cell ON gdelt_events_part(geo_cell(action_geo_lat, action_geo_long), event_date) "
+    "WHERE action_geo_lat IS NOT NULL AND action_geo_long IS NOT NULL;",
+]
+
+
+def is_partitioned(cur, table="gdelt_events"):
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (f"public.{table}",))
+    row = cur.fetchone()
+    return row is not None and row[0] == "p"
+
+
+def list_partitions(cur):
+    cur.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint,
+               pg_total_relation_size(c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'public.gdelt_events'::regclass
+        ORDER BY c.relname;
+    """)
+    return cur.fetchall()
+
+
+def apply_helpers(cur, granularity):
+    with open(PARTITION_SQL) as f:
+        cur.execute(f.read())
+    cur.execute("""
+        INSERT INTO gdelt_event_partitioning (id, granularity) VALUES (TRUE, %s)
+        ON CONFLICT (id) DO UPDATE SET granularity = EXCLUDED.granularity;
+    """, (granularity,))
+
+
+def migrate(granularity, drop_old):
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        if is_partitioned(cur):
+            print("[migrate] gdelt_events is already partitioned, nothing to do")
+            return
+
+        print(f"[migrate] granularity={granularity}")
+        apply_helpers(cur, granularity)
+
+        cur.execute("SELECT MIN(event_date), MAX(event_date), COUNT(*) FROM gdelt_events;")
+        min_d, max_d, total = cur.fetchone()
+        print(f"[migrate] source rows={total:,} dates={min_d}..{max_d}")
+
+        cur.execute("DROP TABLE IF EXISTS gdelt_events_part CASCADE;")
+        cur.execute(PARTITIONED_DDL)
+        cur.execute("CREATE TABLE gdelt_events_default PARTITION OF gdelt_events_part DEFAULT;")
+        cur.execute("ALTER TABLE gdelt_events_default REPLICA IDENTITY FULL;")
+        if min_d is not None:
+            cur.execute("SELECT ensure_gdelt_event_partitions(%s, %s, 'gdelt_events_part');", (min_d, max_d))
+            print(f"[migrate] created {cur.fetchone()[0]} partitions")
+        conn.commit()
+
+        # copy one partition range at a time, commit per chunk
+        cur.execute("""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'public.gdelt_events_part'::regclass AND c.relname <> 'gdelt_events_default'
+            ORDER BY c.relname;
+        """)
+        parts = cur.fetchall()
+        cols = ", ".join(COLUMNS)
+        copied = 0
+        t0 = time.time()
+        for name, bound in parts:
+            # FOR VALUES FROM (19790000) TO (19800000)
+            lo, hi = [int(x) for x in bound.replace("FOR VALUES FROM (", "").replace(")", "").split(" TO (")]
+            cur.execute(f"""
+                INSERT INTO gdelt_events_part ({cols})
+                SELECT {cols} FROM gdelt_events
+                WHERE event_date >= %s AND event_date < %s;
+            """, (lo, hi))
+            copied += cur.rowcount
+            conn.commit()
+            rate = copied / max(time.time() - t0, 1e-6)
+            print(f"[migrate] {name}: {cur.rowcount:,} rows ({copied:,}/{total:,}, {rate:,.0f} rows/sec)")
+
+        print("[migrate] building indexes...")
+        for stmt in INDEXES:
+            cur.execute(stmt)
+        conn.commit()
+
+        # swap under lock, verify nothing changed during the copy
+        print("[migrate] swapping tables...")
+        cur.execute("LOCK TABLE gdelt_events IN EXCLUSIVE MODE;")
+        cur.execute("SELECT COUNT(*), COALESCE(SUM(num_events), 0) FROM gdelt_events;")
+        src = cur.fetchone()
+        cur.execute("SELECT COUNT(*), COALESCE(SUM(num_events), 0) FROM gdelt_events_part;")
+        dst = cur.fetchone()
+        if src != dst:
+            conn.rollback()
+            raise SystemExit(f"error: source changed during copy (src={src} dst={dst}); stop writers and re-run")
+
+        # the delta job's change log (11-delta-sinks.sql) moves to the new root if it was on
+        cur.execute("SELECT to_regprocedure('gdelt_change_log(boolean)') IS NOT NULL;")
+        change_log = cur.fetchone()[0]
+        if change_log:
+            cur.execute("SELECT gdelt_change_log_enabled();")
+            change_log = cur.fetchone()[0]
+
+        cur.execute("ALTER TABLE gdelt_events RENAME TO gdelt_events_old;")
+        cur.execute("ALTER TABLE gdelt_events_old RENAME CONSTRAINT gdelt_events_pkey TO gdelt_events_old_pkey;")
+        cur.execute("ALTER SEQUENCE IF EXISTS gdelt_events_globaleventid_seq RENAME TO gdelt_events_old_globaleventid_seq;")
+        for stmt in INDEXES:
+            name = stmt.split(" ON ")[0].split()[-1].replace("idx_gdelt_p_", "idx_gdelt_")
+            cur.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name.replace('idx_gdelt_', 'idx_gdelt_old_')};")
+
+        cur.execute("ALTER TABLE gdelt_events_part RENAME TO gdelt_events;")
+        cur.execute("ALTER TABLE gdelt_events RENAME CONSTRAINT gdelt_events_part_pkey TO gdelt_events_pkey;")
+        cur.execute("ALTER SEQUENCE gdelt_events_part_globaleventid_seq RENAME TO gdelt_events_globaleventid_seq;")
+        for stmt in INDEXES:
+            name = stmt.split(" ON ")[0].split()[-1]
+            cur.execute(f"ALTER INDEX {name} RENAME TO {name.replace('idx_gdelt_p_', 'idx_gdelt_')};")
+        cur.execute("""
+            SELECT setval('gdelt_events_globaleventid_seq',
+                          GREATEST((SELECT COALESCE(MAX(globaleventid), 1) FROM gdelt_events), 1), true);
+        """)
+
+        # row triggers on a partitioned root cascade to its partitions; bulk
+        # loads arrive with their ids (01-init-schema.sql)
+        cur.execute("""
+            CREATE TRIGGER trg_gdelt_encode_dims
+            BEFORE INSERT ON gdelt_events
+            FOR EACH ROW
+            WHEN (NEW.source_actor_id IS NULL OR NEW.target_actor_id IS NULL OR NEW.cameo_id IS NULL)
+            EXECUTE FUNCTION gdelt_encode_dims();
+        """)
+        cur.execute("""
+            CREATE TRIGGER trg_gdelt_encode_dims_upd
+            BEFORE UPDATE OF source_actor, target_actor, cameo_code ON gdelt_events
+            FOR EACH ROW EXECUTE FUNCTION gdelt_encode_dims();
+        """)
+        if change_log:
+            cur.execute("SELECT gdelt_change_log(true);")
+
+        # publication follows the root, changes are published under gdelt_events
+        cur.execute("SELECT 1 FROM pg_publication WHERE pubname = %s;", (PUBLICATION_NAME,))
+        if cur.fetchone():
+            cur.execute(f"ALTER PUBLICATION {PUBLICATION_NAME} SET TABLE public.gdelt_events;")
+            cur.execute(f"ALTER PUBLICATION {PUBLICATION_NAME} SET (publish_via_partition_root = true);")
+        else:
+            cur.execute(f"CREATE PUBLICATION {PUBLICATION_NAME} FOR TABLE public.gdelt_events "
+                        "WITH (publish_via_partition_root = true);")
+        cur.execute("GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA public TO flink_user;")
+        conn.commit()
+        print("[migrate] swap done, old table kept as gdelt_events_old")
+
+        if drop_old:
+            cur.execute("DROP TABLE gdelt_events_old;")
+            conn.commit()
+            print("[migrate] dropped gdelt_events_old")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+def ensure(start_date, end_date):
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        if not is_partitioned(cur):
+            print("[ensure] gdelt_events is not partitioned, skipping")
+            return
+        cur.execute("SELECT ensure_gdelt_event_partitions(%s, %s);", (start_date, end_date))
+        n = cur.fetchone()[0]
+        conn.commit()
+        print(f"[ensure] created {n} partitions for {start_date}..{end_date}")
+    finally:
+        cur.close()
+        conn.close()
+
+
+def detach(before, drop):
+    # detached rows are not emitted as cdc deletes, aggregates keep their history
+    conn = get_conn()
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        n = 0
+        for name, bound, _, _ in list_partitions(cur):
+            if bound == "DEFAULT":
+                continue
+            hi = int(bound.split(" TO (")[1].rstrip(")"))
+            if hi > before:
+                continue
+            print(f"[detach] {name} ({bound})")
+            # plain detach: CONCURRENTLY is not allowed while a default partition exists
+            cur.execute(f"ALTER TABLE gdelt_events DETACH PARTITION {name};")
+            if drop:
+                cur.execute(f"DROP TABLE {name};")
+                print(f"[detach] dropped {name}")
+            n += 1
+        print(f"[detach] {n} partitions detached")
+    finally:
+        cur.close()
+        conn.close()
+
+
+def status():
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        if not is_partitioned(cur):
+            print("gdelt_events is not partitioned (run: partition_events.py migrate)")
+            return
+        for name, bound, rows, size in list_partitions(cur):
+            print(f"{name:<24} {bound:<45} ~{max(rows, 0):>12,} rows {size / 1024 / 1024:>10.1f} MB")
+    finally:
+        cur.close()
+        conn.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="range partitioning of gdelt_events by event_date")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    m = sub.add_parser("migrate", help="copy gdelt_events into a partitioned table and swap it in")
+    m.add_argument("--granularity", choices=["year", "month"], default="year")
+    m.add_argument("--drop-old", action="store_true", help="drop the old heap after the swap")
+
+    e = sub.add_parser("ensure", help="create missing partitions for a yyyymmdd range")
+    e.add_argument("start_date", type=int)
+    e.add_argument("end_date", type=int)
+
+    d = sub.add_parser("detach", help="detach partitions that end on or before a yyyymmdd date")
+    d.add_argument("--before", type=int, required=True)
+    d.add_argument("--drop", action="store_true", help="drop detached partitions")
+
+    sub.add_parser("status", help="list partitions")
+
+    args = ap.parse_args()
+    if args.cmd == "migrate":
+        migrate(args.granularity, args.drop_old)
+    elif args.cmd == "ensure":
+        ensure(args.start_date, args.end_date)
+    elif args.cmd == "detach":
+        detach(args.before, args.drop)
+    else:
+        status()
+
+
+if __name__ == "__main__":
+    main()
@@ -80,7 +80,12 @@ ok "wal_level=logical"
 # emit old row values
 info "checking replica identity"
 replica_identity="$(pg_exec "select relreplident from pg_class where relname='gdelt_events';")"
-if [[ "$replica_identity" != "f" ]]; then
+relkind="$(pg_exec "select relkind from pg_class where relname='gdelt_events';")"
+if [[ "$relkind" == "p" ]]; then
+  # partitioned: every partition needs full identity
+  missing_ri="$(pg_exec "select count(*) from pg_inherits i join pg_class c on c.oid = i.inhrelid where i.inhparent = 'public.gdelt_events'::regclass and c.relreplident <> 'f';")"
+  [[ "$missing_ri" == "0" ]] || die "$missing_ri partitions of gdelt_events lack replica identity full"
+elif [[ "$replica_identity" != "f" ]]; then
   info "setting replica identity full on public.gdelt_events"
   pg_exec "alter table public.gdelt_events replica identity full;"
 fi
@@ -90,7 +95,7 @@ ok "replica identity full"
 info "ensuring publication exists"
 pub_exists="$(pg_exec "select 1 from pg_publication where pubname='${PUBLICATION_NAME}' limit 1;")"
 if [[ -z "$pub_exists" ]]; then
-  pg_exec "create publication ${PUBLICATION_NAME} for table public.gdelt_events;"
+  pg_exec "create publication ${PUBLICATION_NAME} for table public.gdelt_events with (publish_via_partition_root = true);"
   ok "publication created: $PUBLICATION_NAME"
 else
   ok "publication exists: $PUBLICATION_NAME"
@@ -115,7 +120,7 @@ ok "flink ddl applied"
 
 # write smoke
 info "smoke write: insert/update/delete on public.gdelt_events"
-pg_exec "insert into public.gdelt_events (globaleventid, event_date, source_actor, target_actor, cameo_code, num_events, num_articles, quad_class, goldstein) values (${SMOKE_EVENT_ID}, to_char(current_date, 'YYYYMMDD')::int, 'USA', 'CHN', '043', 1, 4, 1, 2.8) on conflict (globaleventid) do update set goldstein = excluded.goldstein, num_events = excluded.num_events, num_articles = excluded.num_articles;"
+pg_exec "insert into public.gdelt_events (globaleventid, event_date, source_actor, target_actor, cameo_code, num_events, num_articles, quad_class, goldstein) values (${SMOKE_EVENT_ID}, to_char(current_date, 'YYYYMMDD')::int, 'USA', 'CHN', '043', 1, 4, 1, 2.8) on conflict do nothing;"
 pg_exec "update public.gdelt_events set goldstein = coalesce(goldstein, 0) + 1.0 where globaleventid = ${SMOKE_EVENT_ID};"
 pg_exec "delete from public.gdelt_events where globaleventid=${SMOKE_EVENT_ID};"
 ok "smoke write ok"
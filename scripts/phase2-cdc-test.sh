@@ -98,7 +98,7 @@ wait_for_container_healthy "$POSTGRES_CONTAINER" 90
 # sinks exist
 info "checking postgres sink tables"
 missing=()
-for t in daily_event_volume_by_quadclass dyad_interactions top_actors daily_cameo_metrics; do
+for t in daily_event_volume_by_quadclass dyad_interactions top_actors daily_cameo_metrics daily_goldstein_histogram geo_grid_daily; do
   exists="$(pg_exec "select to_regclass('public.${t}') is not null;")"
   [[ "$exists" == "t" ]] || missing+=("$t")
 done
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# verify the flink results tables against gdelt_events, down to the bad groups
+import os
+import sys
+import time
+import argparse
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
+
+import pandas as pd
+
+from gcm import reconcile
+from gcm.aggregates import AGGREGATES
+
+
+def main():
+    ap = argparse.ArgumentParser(description="parallel chunked checksums of the results tables vs gdelt_events")
+    ap.add_argument("--tables", nargs="+", choices=list(AGGREGATES), help="results tables (default: all)")
+    ap.add_argument("--start", type=int, help="first event_date, yyyymmdd (default: earliest)")
+    ap.add_argument("--end", type=int, help="last event_date, yyyymmdd (default: latest)")
+    ap.add_argument("--chunk-days", type=int, default=reconcile.RECONCILE_CHUNK_DAYS, help="days per checksum query")
+    ap.add_argument("--workers", type=int, default=reconcile.RECONCILE_WORKERS, help="parallel connections")
+    ap.add_argument("--max-groups", type=int, default=reconcile.MAX_GROUPS, help="differing groups shown per day")
+    ap.add_argument("--settle", type=float, default=0.0,
+                    help="wait this long and re-diff bad days, to rule out changes still in flight in flink")
+    args = ap.parse_args()
+
+    last = [0.0]
+
+    def progress(done: int, total: int):
+        now = time.perf_counter()
+        if now - last[0] >= 2.0 or done == total:
+            last[0] = now
+            print(f"[check] {done:,}/{total:,} table-chunks", flush=True)
+
+    report = reconcile.reconcile(args.tables, args.start, args.end, chunk_days=args.chunk_days,
+                                 workers=args.workers, max_groups=args.max_groups, progress=progress)
+    if report.start is None:
+        print("[done] no data")
+        return
+    if not report.ok and args.settle > 0:
+        print(f"[settle] {sum(len(t.bad_days) for t in report.tables.values()):,} bad days, "
+              f"re-checking in {args.settle:g}s")
+        time.sleep(args.settle)
+        reconcile.recheck(report, workers=args.workers, max_groups=args.max_groups)
+
+    print(f"[range] {report.start}..{report.end} in {report.seconds:.1f}s")
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        for t in report.tables.values():
+            state = "ok" if t.ok else f"{len(t.bad_days):,} bad days"
+            print(f"[{t.table}] {t.days:,} days, {t.raw_groups:,} groups from raw, "
+                  f"{t.table_groups:,} in table: {state}")
+            for day, (n, df) in t.diffs.items():
+                print(f"  {day}: {n:,} differing groups")
+                print(df.to_string(index=False))
+    sys.exit(0 if report.ok else 1)
+
+
+if __name__ == "__main__":
+    main()
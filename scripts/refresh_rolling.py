@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# keep the rolling 7 / 30-day window tables in step with the daily aggregates
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
+
+from gcm.data import get_db_conn
+
+
+def refresh(full_rebuild: bool) -> int:
+    conn = get_db_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT refresh_rolling_metrics(%s);", (full_rebuild,))
+            n = cur.fetchone()[0]
+        conn.commit()
+        return n
+    finally:
+        conn.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="refresh rolling 7 / 30-day metrics per quad class and country actor")
+    ap.add_argument("--interval", type=float, default=30.0, help="seconds between refreshes")
+    ap.add_argument("--once", action="store_true", help="refresh once and exit")
+    ap.add_argument("--rebuild", action="store_true", help="drop all windows and rebuild from scratch first")
+    args = ap.parse_args()
+
+    full = args.rebuild
+    while True:
+        t0 = time.perf_counter()
+        try:
+            n = refresh(full)
+            full = False
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] rewrote {n:,} windows "
+                  f"in {time.perf_counter() - t0:.2f}s")
+        except Exception as e:
+            if args.once:
+                raise
+            print(f"[warn] refresh failed: {e}", file=sys.stderr)
+
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
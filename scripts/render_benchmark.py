@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# headless profile of one dashboard refresh: queries, pivots, figures, json
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import statistics
+from datetime import timedelta
+from typing import Callable, Dict, List, Any, Optional
+
+import pandas as pd
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
+
+from gcm import anomaly, charts, downsample, geogrid
+from gcm.figcache import FigureCache
+from gcm.data import QUERIES, int_yyyymmdd, load_meta, load_frame
+
+
+# range presets, in days back from the latest date (None = all dates)
+RANGES = {
+    "all": None,
+    "365d": 365,
+    "90d": 90,
+    "30d": 30,
+    "7d": 7,
+}
+
+
+def format_time(seconds):
+    if seconds >= 1.0:
+        return f"{seconds:.3f}s"
+    elif seconds >= 0.001:
+        return f"{seconds * 1000:.2f}ms"
+    else:
+        return f"{seconds * 1_000_000:.2f}µs"
+
+
+def format_bytes(n):
+    if n >= 1024 * 1024:
+        return f"{n / (1024 * 1024):.1f}MB"
+    elif n >= 1024:
+        return f"{n / 1024:.1f}KB"
+    return f"{n}B"
+
+
+class StageTimer:
+    # wall time + peak python allocations per stage
+    def __init__(self):
+        self.samples: Dict[str, List[Dict[str, float]]] = {}
+
+    def run(self, stage: str, fn: Callable[[], Any]) -> Any:
+        tracemalloc.reset_peak()
+        mem_before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] - mem_before
+        self.samples.setdefault(stage, []).append({"time": elapsed, "peak": max(peak, 0)})
+        return out
+
+
+def _build(memo: Optional[FigureCache], name: str, build: Callable[..., Any], *args, **opts) -> Any:
+    return memo.get(name, build, *args, **opts) if memo is not None else build(*args, **opts)
+
+
+def render_once(timer: StageTimer, start_i: int, end_i: int, top_n: int, map_metric: str,
+                max_points: int = downsample.MAX_POINTS, memo: Optional[FigureCache] = None,
+                zoom: int = 1) -> Dict[str, int]:
+    frames: Dict[str, pd.DataFrame] = {}
+    for name in QUERIES:
+        frames[name] = timer.run(f"query:{name}", lambda n=name: load_frame(n, start_i, end_i, top_n, max_points=max_points))
+    # the density and alerts tabs read their own tables
+    frames["geo_grid"] = timer.run("query:geo_grid", lambda: geogrid.load_grid(start_i, end_i, zoom))
+    frames["alerts"] = timer.run("query:alerts", lambda: anomaly.load_alerts(start_i, end_i))
+
+    figs = {}
+    if not frames["actors"].empty:
+        figs["map"] = timer.run("figure:map", lambda: _build(memo, "map", charts.build_map, frames["actors"], map_metric=map_metric))
+    if not frames["trend"].empty:
+        figs["trend"] = timer.run("figure:trend", lambda: _build(memo, "trend", charts.build_trend, frames["trend"], frames["goldstein_bands"]))
+    if not frames["dyads"].empty:
+        pivot = timer.run("pivot:dyads", lambda: _build(memo, "dyad_pivot", charts.dyad_pivot, frames["dyads"]))
+        if not pivot.empty:
+            figs["heatmap"] = timer.run("figure:heatmap", lambda: _build(memo, "heatmap", charts.build_heatmap, pivot))
+    if not frames["quad_dist"].empty:
+        figs["quad_bar"] = timer.run("figure:quad_bar", lambda: _build(memo, "quad_bar", charts.build_quad_bar, frames["quad_dist"]))
+    if not frames["quad_time"].empty:
+        figs["quad_area"] = timer.run("figure:quad_area", lambda: _build(memo, "quad_area", charts.build_quad_area, frames["quad_time"]))
+    if not frames["cameo"].empty:
+        figs["cameo_bar"] = timer.run("figure:cameo_bar", lambda: _build(memo, "cameo_bar", charts.build_cameo_bar, frames["cameo"], top_n=top_n))
+    if not frames["rolling"].empty:
+        figs["rolling"] = timer.run("figure:rolling", lambda: _build(memo, "rolling", charts.build_rolling, frames["rolling"]))
+    if not frames["geo_grid"].empty:
+        figs["density"] = timer.run("figure:density", lambda: _build(memo, "density", charts.build_density, frames["geo_grid"], map_metric=map_metric))
+    if not frames["alerts"].empty:
+        figs["alerts"] = timer.run("figure:alerts", lambda: _build(memo, "alerts", charts.build_alerts, frames["alerts"]))
+
+    # streamlit serializes every figure to json on each rerun
+    sizes = {}
+    for name, fig in figs.items():
+        payload = timer.run(f"json:{name}", fig.to_json)
+        sizes[name] = len(payload)
+
+    return {
+        "rows": sum(len(df) for df in frames.values()),
+        "frame_bytes": sum(int(df.memory_usage(deep=True).sum()) for df in frames.values()),
+        "json_bytes": sum(sizes.values()),
+    }
+
+
+def print_stage_table(timer: StageTimer, slowest: int):
+    rows = []
+    for stage, samples in timer.samples.items():
+        times = [s["time"] for s in samples]
+        peaks = [s["peak"] for s in samples]
+        rows.append((stage, statistics.mean(times), statistics.median(times), max(times), max(peaks), len(samples)))
+
+    total = sum(r[1] * r[5] for r in rows) or 1.0
+    flagged = {r[0] for r in sorted(rows, key=lambda r: r[1], reverse=True)[:slowest]}
+
+    print(f"\n{'Stage':<22} {'Mean':>10} {'Median':>10} {'Max':>10} {'Peak mem':>10} {'Share':>7}  ")
+    print("-" * 80)
+    for stage, mean_t, med_t, max_t, peak, n in sorted(rows, key=lambda r: r[0]):
+        share = mean_t * n / total * 100.0
+        flag = "  <-- slow" if stage in flagged else ""
+        print(f"{stage:<22} {format_time(mean_t):>10} {format_time(med_t):>10} {format_time(max_t):>10} "
+              f"{format_bytes(peak):>10} {share:>6.1f}%{flag}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="headless benchmark of the dashboard render path")
+    ap.add_argument("--ranges", default="all,365d,30d", help=f"comma list of {', '.join(RANGES)}")
+    ap.add_argument("--top-n", default="10,20,50", help="comma list of top_n values")
+    ap.add_argument("--map-metric", default="Total Events", choices=["Total Events", "Avg Goldstein"])
+    ap.add_argument("--iterations", type=int, default=3)
+    ap.add_argument("--max-points", type=int, default=downsample.MAX_POINTS,
+                    help="time series point budget (downsampling)")
+    ap.add_argument("--zoom", type=int, choices=range(len(geogrid.ZOOM_DEG)), default=1,
+                    help=f"density grid level ({', '.join(geogrid.zoom_label(z) for z in range(len(geogrid.ZOOM_DEG)))})")
+    ap.add_argument("--memo", action="store_true",
+                    help="build figures through a FigureCache, as the dashboard does (reruns after the first hit)")
+    ap.add_argument("--slowest", type=int, default=3, help="number of stages to flag as slow")
+    args = ap.parse_args()
+
+    range_names = [r.strip() for r in args.ranges.split(",") if r.strip()]
+    for r in range_names:
+        if r not in RANGES:
+            raise SystemExit(f"error: unknown range '{r}' (use {', '.join(RANGES)})")
+    top_ns = [int(x) for x in args.top_n.split(",") if x.strip()]
+
+    tracemalloc.start()
+    overall = StageTimer()
+    memo = FigureCache() if args.memo else None
+
+    meta = overall.run("query:meta", load_meta)
+    if meta.empty or pd.isna(meta.loc[0, "max_event_date"]):
+        raise SystemExit("error: daily_event_volume_by_quadclass is empty")
+    min_date = pd.to_datetime(str(int(meta.loc[0, "min_event_date"])), format="%Y%m%d").date()
+    max_date = pd.to_datetime(str(int(meta.loc[0, "max_event_date"])), format="%Y%m%d").date()
+
+    print("=" * 80)
+    print(" DASHBOARD RENDER PATH BENCHMARK")
+    print("=" * 80)
+    print(f"  data range: {min_date} -> {max_date}")
+    print(f"  iterations per case: {args.iterations}")
+    if memo is not None:
+        print("  figure cache: on")
+
+    summary = []
+    for range_name in range_names:
+        days = RANGES[range_name]
+        start_d = min_date if days is None else max(min_date, max_date - timedelta(days=days))
+        for top_n in top_ns:
+            timer = StageTimer()
+            walls = []
+            info: Dict[str, int] = {}
+            for _ in range(args.iterations):
+                t0 = time.perf_counter()
+                info = render_once(timer, int_yyyymmdd(start_d), int_yyyymmdd(max_date), top_n, args.map_metric,
+                                   args.max_points, memo, args.zoom)
+                walls.append(time.perf_counter() - t0)
+
+            print(f"\n{'#' * 80}")
+            print(f"range={range_name} ({start_d} -> {max_date})  top_n={top_n}")
+            print(f"  render wall: mean {format_time(statistics.mean(walls))}  max {format_time(max(walls))}")
+            print(f"  rows: {info['rows']:,}  frames: {format_bytes(info['frame_bytes'])}  "
+                  f"figure json: {format_bytes(info['json_bytes'])}")
+            print_stage_table(timer, args.slowest)
+
+            for stage, samples in timer.samples.items():
+                overall.samples.setdefault(stage, []).extend(samples)
+            summary.append((range_name, top_n, statistics.mean(walls), info["json_bytes"]))
+
+    print(f"\n{'=' * 80}")
+    print(" SUMMARY (all cases)")
+    print("=" * 80)
+    print(f"\n{'Range':<8} {'Top N':>6} {'Render':>10} {'JSON':>10}")
+    for range_name, top_n, wall, json_bytes in summary:
+        print(f"{range_name:<8} {top_n:>6} {format_time(wall):>10} {format_bytes(json_bytes):>10}")
+    print_stage_table(overall, args.slowest)
+
+
+if __name__ == "__main__":
+    main()
@@ -52,6 +52,10 @@ pg_exec "select pg_drop_replication_slot('${SLOT_NAME}') where exists (select 1
 echo "[reset] dropping publication if exists"
 pg_exec "drop publication if exists ${PUBLICATION_NAME};" >/dev/null || true
 
+# stop logging signed changes for the delta job (rebuild_aggregates.py turns it back on)
+echo "[reset] turning off the delta change log"
+pg_exec "select gdelt_change_log(false);" >/dev/null || true
+
 echo "[ok] cdc reset complete"
 echo "note: if you stopped flink, restart with:"
 echo "  $COMPOSE_CMD -f \"$COMPOSE_FILE\" up -d"
\ No newline at end of file
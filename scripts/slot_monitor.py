@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# sample cdc slot lag into cdc_slot_lag and alarm on thresholds
+import os
+import sys
+import time
+import argparse
+import subprocess
+from datetime import datetime
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
+
+from gcm import slot_monitor
+from gcm.slot_monitor import SlotMonitor, format_bytes
+
+
+def main():
+    ap = argparse.ArgumentParser(description="monitor replication slot lag and wal retention")
+    ap.add_argument("--slot", default=slot_monitor.SLOT_NAME)
+    ap.add_argument("--interval", type=float, default=10.0, help="seconds between samples")
+    ap.add_argument("--once", action="store_true", help="take one sample and exit (exit 2 on alarm)")
+    ap.add_argument("--no-persist", action="store_true", help="do not write samples to cdc_slot_lag")
+    ap.add_argument("--lag-bytes", type=int, default=slot_monitor.LAG_ALARM_BYTES)
+    ap.add_argument("--lag-seconds", type=float, default=slot_monitor.LAG_ALARM_SECONDS)
+    ap.add_argument("--wal-bytes", type=int, default=slot_monitor.WAL_ALARM_BYTES)
+    ap.add_argument("--on-alarm", default=os.getenv("SLOT_ALARM_CMD"),
+                    help="shell command run when an alarm starts (SLOT_ALARM env var is set)")
+    args = ap.parse_args()
+
+    mon = SlotMonitor(args.slot, lag_alarm_bytes=args.lag_bytes,
+                      lag_alarm_seconds=args.lag_seconds, wal_alarm_bytes=args.wal_bytes)
+    alarmed = False
+
+    while True:
+        s = mon.sample()
+        lag_txt = f"{s.lag_seconds:,.1f}s" if s.lag_seconds is not None else "—"
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] slot={s.slot_name} active={s.active} "
+              f"flush_lag={format_bytes(s.flush_lag_bytes)} lag={lag_txt} "
+              f"retained_wal={format_bytes(s.retained_wal_bytes)}")
+
+        if not args.no_persist and s.exists:
+            try:
+                mon.persist(s)
+            except Exception as e:
+                print(f"[warn] could not write cdc_slot_lag: {e}", file=sys.stderr)
+
+        if s.alarm:
+            print(f"[alarm] {s.alarm}", file=sys.stderr)
+            if not alarmed and args.on_alarm:
+                env = os.environ.copy()
+                env["SLOT_ALARM"] = s.alarm
+                subprocess.run(["bash", "-lc", args.on_alarm], env=env, check=False)
+        elif alarmed:
+            print("[ok] alarm cleared")
+        alarmed = s.alarm is not None
+
+        if args.once:
+            sys.exit(2 if s.alarm else 0)
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,16 @@
 #!/usr/bin/env bash
 set -euo pipefail
 
+# DELTAS=1 after scripts/rebuild_aggregates.py: resume from the rebuild's
+# slot and add signed changes onto the rebuilt tables (run-deltas.sql)
+if [[ "${DELTAS:-0}" == "1" ]]; then
+  echo "[run] starting delta pipeline in single sql-client session"
+  docker exec -it flink-jobmanager bash -lc \
+    "/opt/flink/bin/sql-client.sh \
+       -f /opt/flink/sql/run-deltas.sql"
+  exit 0
+fi
+
 echo "[run] starting pipeline in single sql-client session"
 docker exec -it flink-jobmanager bash -lc \
   "/opt/flink/bin/sql-client.sh \
@@ -1,24 +1,44 @@
 #!/usr/bin/env python3
 #compare batch processing time for postgresql aggregation vs flink incremental updates
 
-import psycopg2
+import os
 import time
 import sys
-from typing import List, Dict
+import argparse
+from typing import List, Dict, Optional
 
-# db connection parameters
-DB_HOST = "localhost"
-DB_NAME = "gdelt"
-DB_USER = "flink_user"
-DB_PASS = "flink_pass"
+from psycopg2.extras import execute_values
 
-def get_connection():
-    return psycopg2.connect(
-        host=DB_HOST,
-        database=DB_NAME,
-        user=DB_USER,
-        password=DB_PASS
-    )
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
+
+from gcm import workload
+from gcm.db import connect as get_connection
+
+def get_versions(cur, tables):
+    cur.execute("SELECT table_name, version FROM table_versions WHERE table_name = ANY(%s);", (list(tables),))
+    return dict(cur.fetchall())
+
+def insert_batch(cur, batch_size, columns_str, first_id, w: Optional[workload.Workload]):
+    # without a workload: copies of random existing rows (the original benchmark)
+    if w is None:
+        cur.execute(f"""
+            INSERT INTO gdelt_events (globaleventid, {columns_str})
+            SELECT 
+                globaleventid + {first_id},
+                {columns_str}
+            FROM gdelt_events 
+            ORDER BY RANDOM() 
+            LIMIT {batch_size};
+        """)
+        return
+    # generated events: skewed keys and late arrivals from the profile
+    rows = [(first_id + i,) + row for i, row in enumerate(workload.as_rows(w.events(batch_size)))]
+    execute_values(cur, f"""
+        INSERT INTO gdelt_events (globaleventid, {', '.join(workload.EVENT_COLUMNS)})
+        VALUES %s
+    """, rows, page_size=1000)
+    w.advance()
 
 def get_table_columns(table_name):
     conn = get_connection()
@@ -38,7 +58,7 @@ def get_table_columns(table_name):
     
     return columns
 
-def measure_postgres_aggregation(batch_size, columns):
+def measure_postgres_aggregation(batch_size, columns, w=None):
     print(f"\n{'='*70}")
     print(f"BASELINE: PostgreSQL Full Aggregation ({batch_size:,} rows)")
     print(f"{'='*70}")
@@ -59,15 +79,7 @@ def measure_postgres_aggregation(batch_size, columns):
     print(f"Inserting {batch_size:,} rows into source table...")
     insert_start = time.time()
     
-    cur.execute(f"""
-        INSERT INTO gdelt_events (globaleventid, {columns_str})
-        SELECT 
-            globaleventid + {max_id + 1000000},
-            {columns_str}
-        FROM gdelt_events 
-        ORDER BY RANDOM() 
-        LIMIT {batch_size};
-    """)
+    insert_batch(cur, batch_size, columns_str, max_id + 1000000, w)
     
     insert_time = time.time() - insert_start
     print(f"Insert completed in {insert_time:.2f}s")
@@ -150,7 +162,7 @@ def measure_postgres_aggregation(batch_size, columns):
         'throughput': batch_size / total_time
     }
 
-def measure_flink_incremental(batch_size, columns):
+def measure_flink_incremental(batch_size, columns, w=None):
     print(f"\n{'='*70}")
     print(f"INCREMENTAL: Flink CDC Processing ({batch_size:,} rows)")
     print(f"{'='*70}")
@@ -159,7 +171,8 @@ def measure_flink_incremental(batch_size, columns):
     conn.autocommit = True
     cur = conn.cursor()
     
-    # record last_updated timestamps before insert from all 4 aggregate tables
+    # record change versions before insert for all 4 aggregate tables
+    # (table_versions, bumped by statement triggers: one pk row each)
     aggregate_tables = [
         'daily_event_volume_by_quadclass',
         'dyad_interactions',
@@ -167,14 +180,7 @@ def measure_flink_incremental(batch_size, columns):
         'daily_cameo_metrics'
     ]
     
-    baseline_timestamps = {}
-    for table in aggregate_tables:
-        try:
-            cur.execute(f"SELECT MAX(last_updated) FROM {table};")
-            baseline_timestamps[table] = cur.fetchone()[0]
-        except Exception as e:
-            print(f"  Warning: Could not query {table}: {e}")
-            baseline_timestamps[table] = None
+    baseline_versions = get_versions(cur, aggregate_tables)
     
     # get max id to avoid duplicates
     cur.execute("SELECT COALESCE(MAX(globaleventid), 0) FROM gdelt_events;")
@@ -188,15 +194,7 @@ def measure_flink_incremental(batch_size, columns):
     print(f"Inserting {batch_size:,} rows into source table...")
     insert_start = time.time()
     
-    cur.execute(f"""
-        INSERT INTO gdelt_events (globaleventid, {columns_str})
-        SELECT 
-            globaleventid + {max_id + 2000000},
-            {columns_str}
-        FROM gdelt_events 
-        ORDER BY RANDOM() 
-        LIMIT {batch_size};
-    """)
+    insert_batch(cur, batch_size, columns_str, max_id + 2000000, w)
     
     insert_time = time.time() - insert_start
     print(f"Insert completed in {insert_time:.2f}s")
@@ -211,20 +209,16 @@ def measure_flink_incremental(batch_size, columns):
     updated_tables = set()
     
     while (time.time() - propagation_start) < max_wait:
+        try:
+            current_versions = get_versions(cur, aggregate_tables)
+        except Exception:
+            current_versions = {}
         for table in aggregate_tables:
             if table in updated_tables:
                 continue
-                
-            try:
-                cur.execute(f"SELECT MAX(last_updated) FROM {table};")
-                current_timestamp = cur.fetchone()[0]
-                
-                if (baseline_timestamps[table] and current_timestamp and 
-                    current_timestamp > baseline_timestamps[table]):
-                    updated_tables.add(table)
-                    print(f"  {table} updated")
-            except Exception:
-                pass
+            if current_versions.get(table, 0) > baseline_versions.get(table, 0):
+                updated_tables.add(table)
+                print(f"  {table} updated")
         
         if len(updated_tables) == len(aggregate_tables):
             propagation_time = time.time() - propagation_start
@@ -294,7 +288,7 @@ def print_results_table(results: List[Dict]):
     print(f"  Throughput improvement:          {((avg_flink_tput/avg_baseline_tput - 1) * 100):>10.1f}%")
     print("="*100 + "\n")
 
-def compare_throughput(batch_sizes=[1000, 5000, 10000]):
+def compare_throughput(batch_sizes=[1000, 5000, 10000], profile=None, seed=None):
     print("\n" + "="*70)
     print("THROUGHPUT BENCHMARK: PostgreSQL Aggregation vs Flink CDC")
     print("="*70)
@@ -309,6 +303,15 @@ def compare_throughput(batch_sizes=[1000, 5000, 10000]):
     print("  INCREMENTAL:  INSERT + Flink CDC propagation to 4 aggregate tables")
     print("="*70)
     
+    w = None
+    if profile is not None:
+        conn = get_connection()
+        try:
+            w = workload.from_db(conn, workload.get_profile(profile), seed=seed)
+        finally:
+            conn.close()
+        print(f"Inserts: generated events, workload profile '{profile}'")
+    
     results = []
     
     for batch_size in batch_sizes:
@@ -318,14 +321,14 @@ def compare_throughput(batch_sizes=[1000, 5000, 10000]):
         
         try:
             # baseline approach
-            baseline = measure_postgres_aggregation(batch_size, columns)
+            baseline = measure_postgres_aggregation(batch_size, columns, w)
             
             # wait between tests
             print("\nWaiting 5 seconds before next test...")
             time.sleep(5)
             
             # incremental approach  
-            incremental = measure_flink_incremental(batch_size, columns)
+            incremental = measure_flink_incremental(batch_size, columns, w)
             
             # calculate speedup
             speedup = baseline['total_time'] / incremental['total_time']
@@ -361,18 +364,20 @@ def compare_throughput(batch_sizes=[1000, 5000, 10000]):
     return results
 
 if __name__ == "__main__":
-    # default test sizes
-    batch_sizes = [1000, 5000, 10000]
-    
-    if len(sys.argv) > 1:
-        # allow custom batch sizes from command line
-        batch_sizes = [int(x) for x in sys.argv[1:]]
+    ap = argparse.ArgumentParser(description="batch time of full aggregation vs flink cdc propagation")
+    ap.add_argument("batch_sizes", nargs="*", type=int, default=[1000, 5000, 10000], help="rows per batch")
+    ap.add_argument("--profile", choices=list(workload.PROFILES),
+                    default=os.getenv("WORKLOAD_PROFILE"),
+                    help="insert generated events with this workload profile instead of copying random rows")
+    ap.add_argument("--seed", type=int, help="seed for repeatable generated batches")
+    args = ap.parse_args()
+    batch_sizes = args.batch_sizes
     
     print("\nStarting throughput benchmark...")
     print(f"   Test batch sizes: {', '.join(str(x) for x in batch_sizes)}")
     print(f"   Note: Dynamically detects table schema to avoid column errors\n")
     
-    results = compare_throughput(batch_sizes)
+    results = compare_throughput(batch_sizes, args.profile, args.seed)
     
     if results:
         print("Benchmark complete!")
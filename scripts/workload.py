@@ -1,31 +1,60 @@
 #!/usr/bin/env python3
-# UPDATE and DELETE operations on real events
+# INSERT, UPDATE and DELETE operations on real events, shaped by a workload
+# profile (gcm/workload.py)
 import os
 import sys
+import time
 import random
-import psycopg2
-from psycopg2.extras import execute_batch
+import argparse
+from psycopg2.extras import execute_batch, execute_values
 
-# db config
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = os.getenv("DB_PORT", "5432")
-DB_NAME = os.getenv("DB_NAME", "gdelt")
-DB_USER = os.getenv("DB_USER", "flink_user")
-DB_PASS = os.getenv("DB_PASS", "flink_pass")
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
 
+from gcm import workload
+from gcm.db import connect as get_conn
 
-def get_conn():
-    return psycopg2.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        dbname=DB_NAME,
-        user=DB_USER,
-        password=DB_PASS
-    )
 
+def describe(picked, label):
+    # how concentrated a batch is: days and share of the newest day
+    days = sorted({row[1] for row in picked})
+    if days:
+        newest = sum(1 for row in picked if row[1] == days[-1])
+        print(f"[{label}] {len(picked)} rows over {len(days)} days "
+              f"({days[0]}..{days[-1]}), {newest / len(picked):.0%} on the newest")
 
-def update_real_events(num_rows):
-    print(f"[update] updating {num_rows} real events")
+
+def insert_events(num_rows, w):
+    print(f"[insert] inserting {num_rows} {w.profile.name} events")
+
+    conn = get_conn()
+    cur = conn.cursor()
+
+    try:
+        ev = workload.as_rows(w.events(num_rows))
+        execute_values(cur, """
+            INSERT INTO public.gdelt_events
+              (event_date, source_actor, target_actor, cameo_code, num_events, num_articles, quad_class, goldstein)
+            VALUES %s
+        """, ev, page_size=1000)
+        conn.commit()
+        describe([(None, row[0]) for row in ev], "insert")
+        dyads = {(row[1], row[2]) for row in ev}
+        print(f"[insert] done: {len(ev)} events, {len(dyads)} distinct dyads")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        cur.close()
+        conn.close()
+
+
+def update_real_events(num_rows, w):
+    print(f"[update] updating {num_rows} real events ({w.profile.name})")
     
     conn = get_conn()
     cur = conn.cursor()
@@ -43,36 +72,42 @@ def update_real_events(num_rows):
             num_rows = total
             print(f"[update] adjusting to {num_rows} (table size)")
         
-        # grab random event IDs
-        print(f"[update] selecting {num_rows} random event IDs...")
-        cur.execute("""
-            SELECT globaleventid 
-            FROM public.gdelt_events 
-            ORDER BY RANDOM()
-            LIMIT %s
-        """, (num_rows,))
-        
-        event_ids = [row[0] for row in cur.fetchall()]
+        # pick event IDs by the profile's date ages and hot dyads
+        print(f"[update] selecting {num_rows} event IDs...")
+        picked = workload.pick_rows(cur.connection, w, num_rows)
+        event_ids = [row[0] for row in picked]
         
         if not event_ids:
             print("[update] no events found to update")
             return
         
+        describe(picked, "update")
         print(f"[update] updating {len(event_ids)} events...")
         
-        # build update batch
+        # build update batch; rekeyed events move to a dyad drawn from the profile
         updates = []
-        for event_id in event_ids:
+        rekeys = []
+        src, tgt = w.dyads(len(picked))
+        for i, (event_id, event_date) in enumerate(picked):
             new_goldstein = round(random.uniform(-10, 10), 2)
             new_num_events = random.randint(1, 3)
-            updates.append((new_goldstein, new_num_events, event_id))
+            updates.append((new_goldstein, new_num_events, event_id, event_date))
+            if random.random() < w.profile.rekey_fraction:
+                rekeys.append((src[i], tgt[i], event_id, event_date))
         
-        # batch update
+        # batch update (event_date lets a partitioned table prune to one partition)
         execute_batch(cur, """
             UPDATE public.gdelt_events 
             SET goldstein = %s, num_events = %s 
-            WHERE globaleventid = %s
+            WHERE globaleventid = %s AND event_date = %s
         """, updates, page_size=1000)
+        if rekeys:
+            execute_batch(cur, """
+                UPDATE public.gdelt_events
+                SET source_actor = %s, target_actor = %s
+                WHERE globaleventid = %s AND event_date = %s
+            """, rekeys, page_size=1000)
+            print(f"[update] {len(rekeys)} events moved to another dyad")
         
         conn.commit()
         print(f"[update] done: {len(event_ids)} events updated")
@@ -92,8 +127,8 @@ def update_real_events(num_rows):
         conn.close()
 
 
-def delete_real_events(num_rows):
-    print(f"[delete] deleting {num_rows} real events")
+def delete_real_events(num_rows, w):
+    print(f"[delete] deleting {num_rows} real events ({w.profile.name})")
     
     conn = get_conn()
     cur = conn.cursor()
@@ -111,21 +146,17 @@ def delete_real_events(num_rows):
             num_rows = total
             print(f"[delete] adjusting to {num_rows} (table size)")
         
-        # grab random event IDs
-        print(f"[delete] selecting {num_rows} random event IDs to delete...")
-        cur.execute("""
-            SELECT globaleventid 
-            FROM public.gdelt_events 
-            ORDER BY RANDOM()
-            LIMIT %s
-        """, (num_rows,))
-        
-        event_ids = [row[0] for row in cur.fetchall()]
+        # pick event IDs by the profile's date ages and hot dyads
+        print(f"[delete] selecting {num_rows} event IDs to delete...")
+        picked = workload.pick_rows(cur.connection, w, num_rows)
+        event_ids = [row[0] for row in picked]
+        event_dates = sorted({row[1] for row in picked})
         
         if not event_ids:
             print("[delete] no events found to delete")
             return
         
+        describe(picked, "delete")
         print(f"[delete] deleting {len(event_ids)} events...")
         print(f"[delete] sample event IDs: {event_ids[:5]}")
         
@@ -133,7 +164,8 @@ def delete_real_events(num_rows):
         cur.execute("""
             DELETE FROM public.gdelt_events 
             WHERE globaleventid = ANY(%s)
-        """, (event_ids,))
+              AND event_date = ANY(%s)
+        """, (event_ids, event_dates))
         
         deleted = cur.rowcount
         conn.commit()
@@ -152,57 +184,38 @@ def delete_real_events(num_rows):
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage:")
-        print("  python workload.py update --rows N")
-        print("  python workload.py delete --rows N")
-        print("")
-        print("For INSERT: Use the bash script - it's much faster!")
-        print("  SMALL_LOAD_LINES=20000 ./scripts/load-gdelt-copy.sh data/file.txt")
-        sys.exit(1)
-    
-    cmd = sys.argv[1]
-    
-    if cmd == "update":
-        rows = None
-        
-        i = 2
-        while i < len(sys.argv):
-            if sys.argv[i] == "--rows":
-                rows = int(sys.argv[i+1])
-                i += 2
-            else:
-                i += 1
-        
-        if rows is None:
-            print("ERROR: --rows required")
-            sys.exit(1)
-        
-        update_real_events(rows)
-    
-    elif cmd == "delete":
-        rows = None
-        
-        i = 2
-        while i < len(sys.argv):
-            if sys.argv[i] == "--rows":
-                rows = int(sys.argv[i+1])
-                i += 2
-            else:
-                i += 1
-        
-        if rows is None:
-            print("ERROR: --rows required")
-            sys.exit(1)
-        
-        delete_real_events(rows)
-    
-    else:
-        print(f"ERROR: unknown command: {cmd}")
-        print("Use 'update' or 'delete'")
-        print("For INSERT, use the bash script instead - it's faster!")
-        sys.exit(1)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--rows", type=int, required=True, help="rows per batch")
+    common.add_argument("--profile", choices=list(workload.PROFILES), default=workload.WORKLOAD_PROFILE,
+                        help="key skew / late-arrival profile (default: $WORKLOAD_PROFILE or uniform)")
+    common.add_argument("--batches", type=int, default=1, help="batches to run; the hot set churns between them")
+    common.add_argument("--interval", type=float, default=0.0, help="seconds between batches")
+    common.add_argument("--seed", type=int, help="seed for repeatable runs")
+
+    ap = argparse.ArgumentParser(
+        description="change real events; for bulk INSERT of a real file use "
+                    "SMALL_LOAD_LINES=20000 ./scripts/load-gdelt-copy.sh data/file.txt")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("insert", parents=[common], help="insert generated events")
+    sub.add_parser("update", parents=[common], help="update existing events")
+    sub.add_parser("delete", parents=[common], help="delete existing events")
+    args = ap.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    conn = get_conn()
+    try:
+        w = workload.from_db(conn, workload.get_profile(args.profile), seed=args.seed)
+    finally:
+        conn.close()
+
+    run = {"insert": insert_events, "update": update_real_events, "delete": delete_real_events}[args.cmd]
+    for i in range(args.batches):
+        if i:
+            w.advance()
+            time.sleep(args.interval)
+        run(args.rows, w)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()